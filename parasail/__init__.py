@@ -1,4 +1,5 @@
 import ctypes
+import json
 import platform
 import os
 import re
@@ -39,31 +40,92 @@ if not _lib:
     except:
         if _verbose: print("failed to open '{}' using ctypes.CDLL defaults".format(_libname))
 
-def _lib_search():
+# Directories named by the environment variables below are searched along
+# with these subdirectories.  The search is deliberately not recursive;
+# walking a large PATH entry on a network filesystem can take seconds.
+_lib_subdirs = ["", "lib", "lib64", ".libs", "bin"]
+
+def _lib_cache_filename():
+    filename = os.environ.get("PARASAIL_LIBPATH_CACHE")
+    if filename:
+        return filename
+    host = platform.node() or "localhost"
+    return os.path.join(os.path.expanduser("~"), ".cache", "parasail",
+            "libpath-{}.json".format(host))
+
+def _lib_stat(path):
+    stat = os.stat(path)
+    return {"path": path, "mtime": stat.st_mtime, "size": stat.st_size}
+
+def _lib_cached():
+    # the path found by an earlier search, if the file is unchanged
+    global _lib
+    global _libpath
+    try:
+        with open(_lib_cache_filename()) as fp:
+            cached = json.load(fp)
+        if _lib_stat(cached["path"]) != cached:
+            if _verbose: print("cached '{}' has changed".format(cached["path"]))
+            return
+        _lib = ctypes.CDLL(cached["path"])
+        _libpath = cached["path"]
+        if _verbose: print("found cached '{}'".format(_libpath))
+    except Exception:
+        if _verbose: print("no usable cached library path")
+
+def _lib_cache_write():
+    filename = _lib_cache_filename()
+    try:
+        with open(filename) as fp:
+            if json.load(fp) == _lib_stat(_libpath):
+                return
+    except Exception:
+        pass
+    try:
+        directory = os.path.dirname(filename)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(filename + ".tmp", "w") as fp:
+            json.dump(_lib_stat(_libpath), fp)
+        getattr(os, "replace", os.rename)(filename + ".tmp", filename)
+    except (IOError, OSError):
+        # the cache is an optimization; read-only homes still work
+        if _verbose: print("failed to write '{}'".format(filename))
+
+def _lib_search(env_vars):
     global _lib
     global _libpath
     _libpath = None
-    for env_var in ["PARASAIL_LIBPATH", "LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH", "PATH"]:
+    for env_var in env_vars:
         if env_var in os.environ:
             if _verbose: print("searching {} for {}".format(env_var,_libname))
             for path in re.split("[:;]", os.environ[env_var]):
+                if not path:
+                    continue
                 if _verbose: print("searching {}".format(path))
-                for attempt in [os.path.join(root,_libname) for root,dirs,files in os.walk(path) if _libname in files]:
+                for subdir in _lib_subdirs:
+                    attempt = os.path.join(path, subdir, _libname)
+                    if not os.path.isfile(attempt):
+                        continue
                     try:
                         _lib = ctypes.CDLL(attempt)
-                        _libpath = attempt
-                        # shortcut the search during bindings import
-                        os.environ["PARASAIL_LIBPATH"] = os.path.dirname(attempt)
+                        _libpath = os.path.abspath(attempt)
                         if _verbose: print("found '{}'".format(attempt))
+                        _lib_cache_write()
                         return
                     except:
                         if _verbose: print("attempted but failed to load '{}'".format(attempt))
         else:
             if _verbose: print("env var {} not set".format(env_var))
 
-# if library load failed, search for it
+# if library load failed, search for it; an explicit PARASAIL_LIBPATH
+# takes precedence over the path cached by an earlier search
+if not _lib:
+    _lib_search(["PARASAIL_LIBPATH"])
 if not _lib:
-    _lib_search()
+    _lib_cached()
+if not _lib:
+    _lib_search(["LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH", "PATH"])
 
 # library load still failed, hard error
 if not _lib:
@@ -91,4 +153,25 @@ if major == 1:
     from parasail.bindings_v1 import *
 else:
     from parasail.bindings_v2 import *
-
+    from parasail import bindings_v2 as _bindings
+
+    # the alignment functions and built-in matrices are created on first
+    # use, see bindings_v2
+    if sys.version_info >= (3, 7):
+        def __getattr__(name):
+            if name in _bindings._binders or name in _bindings._builtin_matrices:
+                value = getattr(_bindings, name)
+                globals()[name] = value
+                return value
+            raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+        def __dir__():
+            return sorted(set(globals()) | set(_bindings.__dir__()))
+
+    # these build on bindings_v2
+    from parasail.search import align_bucketed, length_buckets, top_hits, Hit, score_then_trace, TracedHit
+    from parasail.dispatch import tune, tuned_table, align
+    from parasail.linear import nw_trace_linear, sg_trace_linear, sw_trace_linear, LinearResult
+
+from parasail.seqio import SequenceFile, SequenceRecord, SequenceBatch, iter_sequences
+from parasail.database import Database
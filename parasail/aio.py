@@ -0,0 +1,134 @@
+# Coroutines that run alignments on a bounded thread pool, for asyncio
+# programs.  The C functions release the GIL, so alignments run in
+# parallel with each other and with the event loop.  Python 3.7+ only;
+# import it as 'from parasail import aio'.
+#
+#     result = await aio.sw_trace_striped_16(s1, s2, 10, 1, parasail.blosum62)
+#     batch = await aio.align_many(query, targets, 10, 1, parasail.blosum62)
+
+import asyncio
+import concurrent.futures
+import functools
+import os
+import weakref
+
+from parasail import bindings_v2 as _bindings
+
+def _with_settings(overrides, func, *args):
+    with _bindings.settings(**overrides):
+        return func(*args)
+
+class Pool:
+    # A thread pool with at most max_pending alignments queued or running.
+    # Coroutines wait for a free slot before submitting, so a burst of
+    # requests queues in the event loop instead of growing the pool's
+    # queue without bound.  Cancelling a coroutine withdraws its alignment
+    # if it has not started; one already in the C library runs to the
+    # end and keeps its slot until then.
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 4 * self.max_workers
+        if self.max_pending < self.max_workers:
+            raise ValueError("max_pending must be at least max_workers")
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="parasail")
+        # asyncio primitives belong to one event loop
+        self._slots = weakref.WeakKeyDictionary()
+    def _loop_slots(self, loop):
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_pending)
+        return slots
+    async def run(self, func, *args):
+        # Call func(*args) on the pool and return its result.  The worker
+        # uses the settings() in effect for the caller.
+        overrides = getattr(_bindings._local, "overrides", None)
+        if overrides:
+            func = functools.partial(_with_settings, overrides, func)
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots(loop)
+        await slots.acquire()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        def done(finished):
+            try:
+                loop.call_soon_threadsafe(slots.release)
+            except RuntimeError:
+                # the loop has closed
+                pass
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait)
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.shutdown()
+
+_pool = None
+def set_pool(pool):
+    # Make pool the default for calls without one.  The previous default
+    # is returned and not shut down.
+    global _pool
+    previous, _pool = _pool, pool
+    return previous
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = Pool()
+    return _pool
+
+async def align(func, s1, s2, open, extend, matrix, pool=None):
+    # Await an alignment by any function name, e.g. "sw_trace_striped_16",
+    # or a function taking the same arguments.
+    if not callable(func):
+        func = getattr(_bindings, func)
+    return await (pool or get_pool()).run(func, s1, s2, open, extend, matrix)
+
+async def align_many(query, targets, open, extend, matrix, func="sw_striped_16",
+        chunk_size=1000, pool=None):
+    # align_many split into chunks of targets, which run in parallel on
+    # the pool.  Cancelling it withdraws the chunks not yet started.
+    pool = pool or get_pool()
+    name = _bindings._batch_name(func)
+    targets = list(targets)
+    chunks = [targets[i:i+chunk_size] for i in range(0, len(targets), chunk_size)]
+    parts = await asyncio.gather(*[pool.run(_bindings.align_many,
+            query, chunk, open, extend, matrix, name) for chunk in chunks])
+    batch = _bindings.ResultBatch.empty(len(targets), "_stats" in name)
+    start = 0
+    for part in parts:
+        stop = start + len(part)
+        batch.score[start:stop] = part.score
+        batch.end_query[start:stop] = part.end_query
+        batch.end_ref[start:stop] = part.end_ref
+        batch.flag[start:stop] = part.flag
+        if batch.stats:
+            batch._matches[start:stop] = part.matches
+            batch._similar[start:stop] = part.similar
+            batch._length[start:stop] = part.length
+        for width, count in part.escalated.items():
+            batch.escalated[width] = batch.escalated.get(width, 0) + count
+        start = stop
+    return batch
+
+def _coroutine(name):
+    func = getattr(_bindings, name)
+    async def coroutine(*args, pool=None):
+        return await (pool or get_pool()).run(func, *args)
+    coroutine.__name__ = name
+    return coroutine
+
+def __getattr__(name):
+    # every alignment function of the bindings, as a coroutine
+    if name in _bindings._binders:
+        value = globals()[name] = _coroutine(name)
+        return value
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(_bindings._binders))
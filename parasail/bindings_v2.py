@@ -4,59 +4,19 @@ import platform
 import os
 import re
 import sys
+import collections
+import contextlib
+import threading
+from multiprocessing.pool import ThreadPool
 
 import numpy
 
-_libname = "libparasail.so"
-if platform.system() == 'Darwin':
-    _libname = "libparasail.dylib"
-elif platform.system() == 'Windows':
-    _libname = "parasail.dll"
-_libpath = os.path.join(os.path.dirname(__file__), _libname)
-
-_verbose = os.environ.get("PARASAIL_VERBOSE", False)
-
-# attempt to load library from package location
-_lib = None
-try:
-    _lib = ctypes.CDLL(_libpath)
-except:
-    if _verbose: print("failed to open '{}' in package location".format(_libname))
-
-if not _lib:
-    try:
-        _lib = ctypes.CDLL(_libname)
-    except:
-        if _verbose: print("failed to open '{}' using ctypes.CDLL defaults".format(_libname))
-
-def _lib_search():
-    global _lib
-    global _libpath
-    _libpath = None
-    for env_var in ["PARASAIL_LIBPATH", "LD_LIBRARY_PATH", "DYLD_LIBRARY_PATH", "PATH"]:
-        if env_var in os.environ:
-            if _verbose: print("searching {} for {}".format(env_var,_libname))
-            for path in re.split("[:;]", os.environ[env_var]):
-                if _verbose: print("searching {}".format(path))
-                for attempt in [os.path.join(root,_libname) for root,dirs,files in os.walk(path) if _libname in files]:
-                    try:
-                        _lib = ctypes.CDLL(attempt)
-                        _libpath = attempt
-                        if _verbose: print("found '{}'".format(attempt))
-                        return
-                    except:
-                        if _verbose: print("attempted but failed to load '{}'".format(attempt))
-        else:
-            if _verbose: print("env var {} not set".format(env_var))
-
-# if library load failed, search for it
-if not _lib:
-    _lib_search()
-
-# library load still failed, hard error
-if not _lib:
-    raise Exception("failed to locate and open '{}'".format(_libname))
+# the package __init__ has already located and opened the library
+from parasail import _lib, _libname, _libpath
 
+# Process-wide defaults, changed by the set_ functions.  Within a
+# settings() block they are overridden for the current thread only, so
+# threads can align with different settings at the same time.
 _case_sensitive = False
 def set_case_sensitive(case):
     global _case_sensitive
@@ -67,15 +27,53 @@ def set_alphabet_aliases(alias):
     global _alphabet_aliases
     _alphabet_aliases = alias
 
-_encoding = 'latin_1'
-def set_encoding(encoding):
-    global _encoding
+def _check_encoding(encoding):
     try:
         (' '.encode(encoding)).decode(encoding)
     except LookupError:
         raise Exception("Encoding '{}' not supported".format(encoding))
+
+_encoding = 'latin_1'
+def set_encoding(encoding):
+    global _encoding
+    _check_encoding(encoding)
     _encoding = encoding
 
+_settings = ("case_sensitive", "alphabet_aliases", "encoding", "profile_cache")
+_local = threading.local()
+
+def _setting(name):
+    # the current thread's value of a setting, else the process default
+    overrides = getattr(_local, "overrides", None)
+    if overrides and name in overrides:
+        return overrides[name]
+    return globals()["_" + name]
+
+def _option(value, name):
+    # a per-call argument, or the setting when it is None
+    if value is None:
+        return _setting(name)
+    return value
+
+@contextlib.contextmanager
+def settings(**kwargs):
+    # Override case_sensitive, alphabet_aliases, encoding or profile_cache
+    # for the current thread until the block exits.  Threads started in
+    # the block use the process defaults.
+    for name in kwargs:
+        if name not in _settings:
+            raise TypeError("unknown setting '{}'".format(name))
+    if "encoding" in kwargs:
+        _check_encoding(kwargs["encoding"])
+    previous = getattr(_local, "overrides", None)
+    overrides = dict(previous or {})
+    overrides.update(kwargs)
+    _local.overrides = overrides
+    try:
+        yield
+    finally:
+        _local.overrides = previous
+
 if sys.version_info.major < 3:
     def b(x):
         if x is None:
@@ -86,6 +84,9 @@ if sys.version_info.major < 3:
         return str(x)
     def isstr(s):
         return isinstance(s, basestring)
+    def _buffer(x):
+        x = b(x)
+        return x, len(x)
 else:
     def isstr(s):
         return isinstance(s, str)
@@ -93,14 +94,33 @@ else:
         return isinstance(s, (bytes, bytearray))
     def b(x):
         if isstr(x):
-            return x.encode(_encoding)
+            return x.encode(_setting("encoding"))
         else:
             return x
     def s(x):
         if isbytes(x):
-            return x.decode(_encoding)
+            return x.decode(_setting("encoding"))
         else:
             return x
+    def _buffer(x):
+        # Return a (pointer, length) pair for a sequence.  str is encoded;
+        # bytes are passed as-is; any other buffer such as bytearray,
+        # memoryview, mmap or a numpy array is passed by address without
+        # copying.  The pointer keeps the buffer alive.
+        if isstr(x):
+            x = x.encode(_setting("encoding"))
+        if isinstance(x, bytes):
+            return x, len(x)
+        if isinstance(x, Sequence):
+            seq = x.pointer[0].seq
+            return ctypes.c_char_p.from_buffer(seq, pstring_t.s.offset), int(seq.l)
+        if isinstance(x, numpy.ndarray):
+            x = numpy.ascontiguousarray(x, numpy.uint8)
+        try:
+            array = numpy.frombuffer(x, numpy.uint8)
+        except (TypeError, ValueError):
+            return x, len(x)
+        return array.ctypes.data_as(ctypes.c_char_p), len(array)
 
 def _make_nd_array(c_pointer, shape, dtype=numpy.intc, order='C', own_data=True):
     arr_size = numpy.prod(shape[:]) * numpy.dtype(dtype).itemsize
@@ -192,7 +212,13 @@ class sequences_t(ctypes.Structure):
 
 c_sequences_p = ctypes.POINTER(sequences_t)
 
-class Traceback:
+# The wrappers below declare __slots__, so a Result is a few pointers
+# rather than a pointer to its own __dict__, and free their C memory in
+# __del__, which costs less per object than a weakref.finalize and,
+# since Python 3.4, does not keep cycles from being collected.
+
+class Traceback(object):
+    __slots__ = ("pointer", "__weakref__")
     def __init__(self, pointer):
         self.pointer = pointer
     def __del__(self):
@@ -208,7 +234,35 @@ class Traceback:
     def ref(self):
         return s(self.pointer[0].ref)
 
-class Cigar:
+# BAM op letters indexed by the low four bits of a cigar int; codes
+# past B decode as M, as in the C library
+_cigar_letters = numpy.frombuffer(b'MIDNSHP=XB' + b'M' * 6, 'S1')
+# the ops that consume a query residue, and those that consume a
+# reference residue, indexed the same way
+_cigar_query = numpy.array([1,1,0,0,1,0,0,1,1,0] + [1] * 6, bool)
+_cigar_ref = numpy.array([1,0,1,1,0,0,0,1,1,0] + [1] * 6, bool)
+
+def _cigar_string(seq):
+    # the SAM string for an array of cigar ints
+    seq = numpy.asarray(seq, numpy.uint32)
+    lengths = (seq >> 4).astype(str)
+    letters = _cigar_letters[seq & 0xf].astype(str)
+    return ''.join(numpy.char.add(lengths, letters).tolist())
+
+def _cigar_create(text, beg_query, beg_ref):
+    # a Cigar from a SAM string, which the library cannot encode when empty
+    pointer = _lib.parasail_cigar_encode_string(b(text or "1M"))
+    pointer[0].beg_query = beg_query
+    pointer[0].beg_ref = beg_ref
+    if not text:
+        pointer[0].len = 0
+    return Cigar(pointer)
+
+def _unpickle_cigar(seq, beg_query, beg_ref):
+    return _cigar_create(_cigar_string(numpy.frombuffer(seq, numpy.uint32)), beg_query, beg_ref)
+
+class Cigar(object):
+    __slots__ = ("pointer", "__weakref__")
     __BAM_CIGAR_STR = 'MIDNSHP=X8'
     def __init__(self, pointer):
         self.pointer = pointer
@@ -231,34 +285,127 @@ class Cigar:
     def beg_ref(self):
         return self.pointer[0].beg_ref
     @property
+    def ops(self):
+        # BAM op codes, 0 for M through 8 for X, as a numpy array
+        return (self.seq & 0xf).astype(numpy.uint8)
+    @property
+    def lengths(self):
+        return self.seq >> 4
+    @property
     def decode(self):
         # The C interface allocates unaligned memory but does not provide a
         # means of deallocating it.  The parasail_free() is for aligned
         # memory only.  On Windows, this is an error.  On OSX/Linux, free()
         # is the same for aligned and unaligned.
         if platform.system() == 'Windows':
-            def _decode(x):
-                l = str(x>>4)
-                try:
-                    c = self.__BAM_CIGAR_STR[x&0xf]
-                except:
-                    c = 'M'
-                return l+c
-            return ''.join([_decode(self.pointer[0].seq[i]) for i in range(self.pointer[0].len)])
+            return _cigar_string(self.seq)
         else:
             # this allocates a char array, and we must free it
             voidp = _lib.parasail_cigar_decode(self.pointer)
             as_str = ctypes.string_at(voidp)
             _lib.parasail_free(voidp)
             return as_str
+    @property
+    def sam(self):
+        # the SAM cigar string as str on every platform
+        return s(self.decode)
+    def __reduce__(self):
+        return (_unpickle_cigar, (self.seq.tobytes(), self.beg_query, self.beg_ref))
+    def aligned_pairs(self, matches_only=False):
+        # Arrays of the query and reference position of every alignment
+        # column, -1 where the column is a gap in that sequence.  With
+        # matches_only, only columns aligning two residues are returned.
+        seq = self.seq
+        columns = numpy.repeat(seq & 0xf, seq >> 4)
+        in_query = _cigar_query[columns]
+        in_ref = _cigar_ref[columns]
+        keep = in_query | in_ref
+        in_query, in_ref = in_query[keep], in_ref[keep]
+        query = self.beg_query + numpy.cumsum(in_query, dtype=numpy.int64) - 1
+        ref = self.beg_ref + numpy.cumsum(in_ref, dtype=numpy.int64) - 1
+        if matches_only:
+            keep = in_query & in_ref
+            return query[keep], ref[keep]
+        query[~in_query] = -1
+        ref[~in_ref] = -1
+        return query, ref
     @staticmethod
     def decode_op(cigar_int):
+        # a numpy array of cigar ints decodes to an array of op letters
+        if isinstance(cigar_int, numpy.ndarray):
+            return _cigar_letters[cigar_int & 0xf]
         return _lib.parasail_cigar_decode_op(cigar_int)
     @staticmethod
     def decode_len(cigar_int):
+        if isinstance(cigar_int, numpy.ndarray):
+            return cigar_int >> 4
         return _lib.parasail_cigar_decode_len(cigar_int)
 
-class Result:
+CigarStats = collections.namedtuple("CigarStats", ["matches", "mismatches",
+        "insertions", "deletions", "length", "query_span", "ref_span",
+        "identity", "query_coverage", "ref_coverage"])
+
+def cigar_stats(cigars, len_query=None, len_ref=None):
+    # Per-alignment statistics for a sequence of Cigars, or of results
+    # with a cigar, as numpy arrays in a CigarStats.  matches and
+    # mismatches count = and X columns, insertions and deletions count
+    # I and D columns, and length counts every column.  identity is
+    # matches / length.  The coverages are the query and reference spans
+    # divided by len_query and len_ref, which default to those of the
+    # results; they are None for bare Cigars without lengths.  All ops
+    # are counted with one numpy pass over the concatenated cigars.
+    cigars = list(cigars)
+    if len_query is None and cigars and hasattr(cigars[0], "len_query"):
+        len_query = [x.len_query for x in cigars]
+    if len_ref is None and cigars and hasattr(cigars[0], "len_ref"):
+        len_ref = [x.len_ref for x in cigars]
+    seqs = [getattr(x, "cigar", x).seq for x in cigars]
+    count = len(seqs)
+    owner = numpy.repeat(numpy.arange(count), [len(x) for x in seqs])
+    seq = numpy.concatenate(seqs) if seqs else numpy.zeros(0, numpy.uint32)
+    ops = seq & 0xf
+    lengths = (seq >> 4).astype(numpy.int64)
+    def total(mask):
+        return numpy.bincount(owner[mask], lengths[mask], count).astype(numpy.int64)
+    matches = total(ops == 7)
+    mismatches = total(ops == 8)
+    insertions = total(ops == 1)
+    deletions = total(ops == 2)
+    length = total(_cigar_query[ops] | _cigar_ref[ops])
+    query_span = total(_cigar_query[ops])
+    ref_span = total(_cigar_ref[ops])
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        identity = matches / length.astype(float)
+        query_coverage = ref_coverage = None
+        if len_query is not None:
+            query_coverage = query_span / numpy.asarray(len_query, float)
+        if len_ref is not None:
+            ref_coverage = ref_span / numpy.asarray(len_ref, float)
+    return CigarStats(matches, mismatches, insertions, deletions, length,
+            query_span, ref_span, identity, query_coverage, ref_coverage)
+
+_FLAG_SW = 1 << 2
+_FLAG_STATS = 1 << 16
+_FLAG_TABLE = 1 << 17
+_FLAG_ROWCOL = 1 << 18
+_FLAG_TRACE = 1 << 19
+_FLAG_EXTRA = _FLAG_STATS | _FLAG_TABLE | _FLAG_ROWCOL | _FLAG_TRACE
+
+def _result_arrays(flag):
+    # the names of the table or row and column arrays a result has
+    prefixes = ["score"]
+    if flag & _FLAG_STATS:
+        prefixes += ["matches", "similar", "length"]
+    if flag & _FLAG_TABLE:
+        return [x + "_table" for x in prefixes]
+    if flag & _FLAG_ROWCOL:
+        return [x + y for x in prefixes for y in ("_row", "_col")]
+    return []
+
+class Result(object):
+    # _cigar and _traceback are (arguments, value) once computed
+    __slots__ = ("pointer", "len_query", "len_ref", "query", "ref", "matrix",
+            "_cigar", "_traceback", "__weakref__")
     def __init__(self, pointer, len_query, len_ref, query=None, ref=None, matrix=None):
         self.pointer = pointer
         self.len_query = len_query
@@ -266,14 +413,28 @@ class Result:
         self.query = query
         self.ref = ref
         self.matrix = matrix
-        self._as_parameter_ = pointer
         self._cigar = None
         self._traceback = None
-        self._traceback_args = None
     def __del__(self):
         if _lib:
             _lib.parasail_result_free(self.pointer)
     @property
+    def _as_parameter_(self):
+        return self.pointer
+    def __reduce__(self):
+        # The scores, stats, tables, rows and columns, and the cigar of a
+        # traceback result, restored as a StoredResult.  The traceback
+        # table is not kept; the traceback is rebuilt from the cigar.
+        flag = self.pointer[0].flag
+        stats = None
+        if flag & _FLAG_STATS:
+            stats = (self.matches, self.similar, self.length)
+        arrays = dict((name, numpy.array(getattr(self, name))) for name in _result_arrays(flag))
+        cigar = self.cigar if flag & _FLAG_TRACE else None
+        return (StoredResult, (self.score, self.end_query, self.end_ref, flag,
+                self.len_query, self.len_ref, stats, arrays, cigar,
+                self.query, self.ref, self.matrix))
+    @property
     def saturated(self):
         return _lib.parasail_result_is_saturated(self.pointer) != 0
     @property
@@ -388,39 +549,115 @@ class Result:
     def get_cigar(self, case_sensitive=None, alphabet_aliases=None):
         if 0 == _lib.parasail_result_is_trace(self.pointer):
             raise AttributeError("'Result' object has no traceback")
-        case = case_sensitive or _case_sensitive
-        alias = alphabet_aliases or _alphabet_aliases
-        if self._cigar is None:
-            self._cigar = Cigar(_lib.parasail_result_get_cigar_extra(
+        case = _option(case_sensitive, "case_sensitive")
+        alias = _option(alphabet_aliases, "alphabet_aliases")
+        args = (case, alias)
+        if self._cigar is None or self._cigar[0] != args:
+            self._cigar = (args, Cigar(_lib.parasail_result_get_cigar_extra(
                 self.pointer,
-                b(self.query), self.len_query,
-                b(self.ref), self.len_ref,
+                _buffer(self.query)[0], self.len_query,
+                _buffer(self.ref)[0], self.len_ref,
                 self.matrix,
-                case, b(alias)))
-        return self._cigar
+                case, b(alias))))
+        return self._cigar[1]
     @property
     def cigar(self):
         return self.get_cigar()
     def get_traceback(self, mch='|', sim=':', neg='.', case_sensitive=None, alphabet_aliases=None):
         if 0 == _lib.parasail_result_is_trace(self.pointer):
             raise AttributeError("'Result' object has no traceback")
-        case = case_sensitive or _case_sensitive
-        alias = alphabet_aliases or _alphabet_aliases
+        case = _option(case_sensitive, "case_sensitive")
+        alias = _option(alphabet_aliases, "alphabet_aliases")
         args = ''.join([mch,sim,neg,str(case),str(alias)])
-        if self._traceback is None or self._traceback_args != args:
-            self._traceback_args = args
-            self._traceback = Traceback(_lib.parasail_result_get_traceback_extra(
+        if self._traceback is None or self._traceback[0] != args:
+            self._traceback = (args, Traceback(_lib.parasail_result_get_traceback_extra(
                 self.pointer,
-                b(self.query), self.len_query,
-                b(self.ref), self.len_ref,
+                _buffer(self.query)[0], self.len_query,
+                _buffer(self.ref)[0], self.len_ref,
                 self.matrix,
                 b(mch)[0], b(sim)[0], b(neg)[0],
-                case, b(alias)))
-        return self._traceback
+                case, b(alias))))
+        return self._traceback[1]
     @property
     def traceback(self):
         return self.get_traceback()
 
+def _result_new():
+    _lib.parasail_result_new.argtypes = []
+    _lib.parasail_result_new.restype = c_result_p
+    return _lib.parasail_result_new()
+
+class StoredResult(Result):
+    # A Result restored by unpickling.  Its C result holds only the score,
+    # end positions and flags; the stats, arrays and cigar are kept here.
+    __slots__ = ("_flag", "_stats", "_arrays", "_stored_cigar", "_linear")
+    def __init__(self, score, end_query, end_ref, flag, len_query, len_ref,
+            stats=None, arrays=None, cigar=None, query=None, ref=None, matrix=None):
+        pointer = _result_new()
+        pointer[0].score = score
+        pointer[0].end_query = end_query
+        pointer[0].end_ref = end_ref
+        # without these bits the library never looks for the extra data
+        pointer[0].flag = flag & ~_FLAG_EXTRA
+        Result.__init__(self, pointer, len_query, len_ref, query, ref, matrix)
+        self._flag = flag
+        self._stats = stats
+        self._arrays = arrays or {}
+        self._stored_cigar = cigar
+        self._linear = None
+    def __reduce__(self):
+        return (StoredResult, (self.score, self.end_query, self.end_ref, self._flag,
+                self.len_query, self.len_ref, self._stats, self._arrays,
+                self._stored_cigar, self.query, self.ref, self.matrix))
+    def _stat(self, i):
+        if self._stats is None:
+            raise AttributeError("'Result' object has no stats")
+        return self._stats[i]
+    matches = property(lambda self: self._stat(0))
+    similar = property(lambda self: self._stat(1))
+    length = property(lambda self: self._stat(2))
+    def _trace(self):
+        # the cigar as a LinearResult, which builds cigars and tracebacks
+        # for other settings
+        if self._stored_cigar is None:
+            raise AttributeError("'Result' object has no traceback")
+        if self._linear is None:
+            from parasail.linear import LinearResult
+            from parasail.search import _residues
+            cigar = self._stored_cigar
+            runs = [[op, int(length)] for op, length in zip(
+                    s(cigar.decode_op(cigar.seq).tobytes()).replace("=", "M").replace("X", "M"),
+                    cigar.lengths)]
+            beg_query, beg_ref = cigar.beg_query, cigar.beg_ref
+            if self._flag & _FLAG_SW:
+                # local cigars may keep gaps the traceback leaves out
+                for i in (0, -1):
+                    while runs and runs[i][0] != "M":
+                        if i == 0:
+                            beg_query += runs[i][1] if runs[i][0] == "I" else 0
+                            beg_ref += runs[i][1] if runs[i][0] == "D" else 0
+                        del runs[i]
+            self._linear = LinearResult(self.score, _residues(self.query), _residues(self.ref),
+                    self.matrix, runs, beg_query, beg_ref, self.end_query, self.end_ref)
+        return self._linear
+    def get_cigar(self, case_sensitive=None, alphabet_aliases=None):
+        if case_sensitive is None and alphabet_aliases is None and self._stored_cigar is not None:
+            return self._stored_cigar
+        return self._trace().get_cigar(case_sensitive, alphabet_aliases)
+    def get_traceback(self, mch='|', sim=':', neg='.', case_sensitive=None, alphabet_aliases=None):
+        return self._trace().get_traceback(mch, sim, neg, case_sensitive, alphabet_aliases)
+
+def _stored_array(name):
+    def get(self):
+        if name not in self._arrays:
+            raise AttributeError("'Result' object has no {}".format(name))
+        return self._arrays[name]
+    return property(get)
+
+for _name in ("score", "matches", "similar", "length"):
+    for _suffix in ("_table", "_row", "_col"):
+        setattr(StoredResult, _name + _suffix, _stored_array(_name + _suffix))
+
 class matrix_t(ctypes.Structure):
     _fields_ = [
         ("name",        ctypes.c_char_p),
@@ -440,7 +677,7 @@ class Matrix:
         if isstr(pointer_or_string):
             pointer = _lib.parasail_matrix_lookup(b(pointer_or_string))
             if not pointer:
-                case = case_sensitive or _case_sensitive
+                case = _option(case_sensitive, "case_sensitive")
                 # matrix_from_file calls exit if file doesn't exist
                 # so check now to avoid python exiting
                 if os.path.isfile(pointer_or_string):
@@ -462,6 +699,11 @@ class Matrix:
     def __del__(self):
         if self.pointer[0].user_matrix and _lib:
             _lib.parasail_matrix_free(self.pointer)
+    def __reduce__(self):
+        # built-in matrices by name, others by their scores and mapper
+        if not self.pointer[0].user_matrix:
+            return (_unpickle_builtin_matrix, (s(self.name),))
+        return (_unpickle_matrix, (numpy.array(self.matrix), numpy.array(self.mapper)))
     @property
     def name(self):
         return self.pointer[0].name
@@ -486,33 +728,60 @@ class Matrix:
         _lib.parasail_matrix_set_value(self.pointer, row, col, value)
     def copy(self):
         return Matrix(_lib.parasail_matrix_copy(self.pointer))
+    def _values(self):
+        # writable view of a user matrix's scores
+        return numpy.ctypeslib.as_array(self.pointer[0].user_matrix, (self.size, self.size))
+    def _update_range(self, block):
+        # like parasail_matrix_set_value, max and min only ever widen
+        if block.size:
+            self.pointer[0].max = max(self.pointer[0].max, int(block.max()))
+            self.pointer[0].min = min(self.pointer[0].min, int(block.min()))
     def __setitem__(self, key, value):
         if type(key) is list or type(key) is tuple:
             if len(key) < 2:
                 raise IndexError('too few keys in setitem')
             if len(key) > 2:
                 raise IndexError('too many keys in setitem')
-            if isinstance(key[0], slice) and isinstance(key[1], slice):
-                for r in range(key[0].start, key[0].stop, key[0].step or 1):
-                    for c in range(key[1].start, key[1].stop, key[1].step or 1):
-                        _lib.parasail_matrix_set_value(self.pointer, r, c, value)
-            elif isinstance(key[0], slice):
-                for r in range(key[0].start, key[0].stop, key[0].step or 1):
-                    _lib.parasail_matrix_set_value(self.pointer, r, key[1], value)
-
-            elif isinstance(key[1], slice):
-                for c in range(key[1].start, key[1].stop, key[1].step or 1):
-                    _lib.parasail_matrix_set_value(self.pointer, key[0], c, value)
-            else:
-                _lib.parasail_matrix_set_value(self.pointer, key[0], key[1], value)
-        elif isinstance(key, slice):
-            for r in range(key[0].start, key[0].stop, key[0].step or 1):
-                for c in range(self.size):
-                    _lib.parasail_matrix_set_value(self.pointer, r, c, value)
-        else:
-            # assume int, do what numpy does
-            for c in range(self.size):
-                _lib.parasail_matrix_set_value(self.pointer, key, c, value)
+            key = tuple(key)
+        if not self.pointer[0].user_matrix:
+            # built-in matrices are read-only; let the C library report it
+            _lib.parasail_matrix_set_value(self.pointer, 0, 0, 0)
+            return
+        values = self._values()
+        values[key] = value
+        self._update_range(numpy.asarray(values[key]))
+    @staticmethod
+    def from_numpy(alphabet, array, case_sensitive=None):
+        # array is either len(alphabet) square, in which case the scores
+        # for characters not in the alphabet are 0, or one larger, in
+        # which case its last row and column score those characters
+        array = numpy.asarray(array)
+        if not numpy.issubdtype(array.dtype, numpy.integer):
+            raise TypeError('matrix values must be integers, not {}'.format(array.dtype))
+        n = len(alphabet)
+        if array.ndim != 2 or array.shape[0] != array.shape[1] or array.shape[0] not in (n, n+1):
+            raise ValueError('array of shape {} does not match alphabet of length {}'.format(
+                array.shape, n))
+        matrix = matrix_create(alphabet, 0, 0, case_sensitive)
+        values = matrix._values()
+        values[:array.shape[0], :array.shape[1]] = array
+        matrix.pointer[0].max = int(values.max())
+        matrix.pointer[0].min = int(values.min())
+        return matrix
+    @staticmethod
+    def _from_arrays(values, mapper):
+        # A user matrix with the given square scores and 256-entry mapper,
+        # which together describe any matrix exactly.  The alphabet only
+        # sizes the matrix; the mapper then replaces the one it implies.
+        values = numpy.asarray(values)
+        size = len(values)
+        alphabet = ''.join(chr(i) for i in range(1, size))
+        matrix = matrix_create(alphabet, 0, 0, True)
+        matrix._values()[:] = values
+        numpy.ctypeslib.as_array(matrix.pointer[0].mapper, (256,))[:] = mapper
+        matrix.pointer[0].max = int(values.max())
+        matrix.pointer[0].min = int(values.min())
+        return matrix
 
 class profile_data_t(ctypes.Structure):
     _fields_ = [
@@ -536,18 +805,37 @@ class profile_t(ctypes.Structure):
 
 c_profile_p = ctypes.POINTER(profile_t)
 
-class Profile:
-    def __init__(self, pointer, matrix, s1b):
+class Profile(object):
+    # width and stats are those given to profile_create; profiles from
+    # ssw_init have no width and keep their score_size instead
+    __slots__ = ("pointer", "matrix_", "s1b", "width", "stats", "_score_size", "__weakref__")
+    def __init__(self, pointer, matrix, s1b, width=None, stats=False):
         self.pointer = pointer
         self.matrix_ = matrix
-        self._as_parameter_ = pointer
         self.s1b = s1b
+        self.width = width
+        self.stats = stats
+        self._score_size = None
     def __del__(self):
         if _lib:
             _lib.parasail_profile_free(self.pointer)
     @property
+    def _as_parameter_(self):
+        return self.pointer
+    def __reduce__(self):
+        # the query, matrix and how it was created, from which the profile
+        # is rebuilt
+        address = ctypes.cast(self.pointer, ctypes.POINTER(ctypes.c_void_p))[0]
+        s1 = ctypes.string_at(address, self.s1Len)
+        if self._score_size is not None:
+            return (ssw_init, (s1, self.matrix, self._score_size))
+        return (_unpickle_profile, (s1, self.matrix, self.width, self.stats))
+    @property
     def s1(self):
-        return s(self.pointer[0].s1)
+        # s1 is the first field of profile_t; read exactly s1Len bytes
+        # since buffer inputs are not NUL-terminated
+        address = ctypes.cast(self.pointer, ctypes.POINTER(ctypes.c_void_p))[0]
+        return s(ctypes.string_at(address, self.s1Len))
     @property
     def s1Len(self):
         return self.pointer[0].s1Len
@@ -555,6 +843,9 @@ class Profile:
     def matrix(self):
         return self.matrix_
 
+def _unpickle_profile(s1, matrix, width, stats):
+    return globals()["profile_create"+("_stats" if stats else "")+"_"+width](s1, matrix)
+
 _profile_create_argtypes = [ctypes.c_char_p, ctypes.c_int, c_matrix_p]
 
 _lib.parasail_profile_create_8.argtypes = _profile_create_argtypes
@@ -588,44 +879,104 @@ _lib.parasail_profile_create_stats_sat.argtypes = _profile_create_argtypes
 _lib.parasail_profile_create_stats_sat.restype = c_profile_p
 
 def profile_create_8(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_8(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_8(s1b, s1Len, matrix), matrix, s1b, "8", False)
 
 def profile_create_16(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_16(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_16(s1b, s1Len, matrix), matrix, s1b, "16", False)
 
 def profile_create_32(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_32(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_32(s1b, s1Len, matrix), matrix, s1b, "32", False)
 
 def profile_create_64(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_64(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_64(s1b, s1Len, matrix), matrix, s1b, "64", False)
 
 def profile_create_sat(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_sat(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_sat(s1b, s1Len, matrix), matrix, s1b, "sat", False)
 
 def profile_create_stats_8(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_stats_8(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_stats_8(s1b, s1Len, matrix), matrix, s1b, "8", True)
 
 def profile_create_stats_16(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_stats_16(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_stats_16(s1b, s1Len, matrix), matrix, s1b, "16", True)
 
 def profile_create_stats_32(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_stats_32(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_stats_32(s1b, s1Len, matrix), matrix, s1b, "32", True)
 
 def profile_create_stats_64(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_stats_64(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_stats_64(s1b, s1Len, matrix), matrix, s1b, "64", True)
 
 def profile_create_stats_sat(s1, matrix):
-    s1b = b(s1)
-    return Profile(_lib.parasail_profile_create_stats_sat(s1b, len(s1), matrix), matrix, s1b)
+    s1b, s1Len = _buffer(s1)
+    return Profile(_lib.parasail_profile_create_stats_sat(s1b, s1Len, matrix), matrix, s1b, "sat", True)
+
+# bytes per profile element for each width; 'sat' holds 8, 16 and 32 bits
+_profile_width_bytes = {"8": 1, "16": 2, "32": 4, "64": 8, "sat": 7}
+
+class ProfileCache:
+    # Least-recently-used cache of query profiles keyed by the query, the
+    # address of the C matrix, the solution width, and whether the profile
+    # holds stats.  Cached profiles keep their Matrix alive, so a matrix
+    # address cannot be reused while it is still a key.  Modifying a
+    # matrix after its profiles are cached is not detected; clear() first.
+    def __init__(self, max_bytes=256*1024*1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._profiles = collections.OrderedDict()
+        self._lock = threading.Lock()
+    def __len__(self):
+        return len(self._profiles)
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self.nbytes = 0
+    def get(self, s1, matrix, width="16", stats=False):
+        s1b = b(s1)
+        if not isinstance(s1b, bytes):
+            s1b = bytes(s1b)
+        width = str(width)
+        key = (s1b, ctypes.addressof(matrix.pointer[0]), width, bool(stats))
+        with self._lock:
+            if key in self._profiles:
+                self.hits += 1
+                profile, nbytes = self._profiles.pop(key)
+                self._profiles[key] = (profile, nbytes)
+                return profile
+            self.misses += 1
+        create = globals()["profile_create"+("_stats" if stats else "")+"_"+width]
+        profile = create(s1b, matrix)
+        nbytes = len(s1b) * matrix.size * _profile_width_bytes[width] * (3 if stats else 1)
+        if nbytes > self.max_bytes:
+            return profile
+        with self._lock:
+            if key not in self._profiles:
+                self._profiles[key] = (profile, nbytes)
+                self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                evicted, evicted_nbytes = self._profiles.popitem(last=False)[1]
+                self.nbytes -= evicted_nbytes
+        return profile
+
+_profile_cache = None
+def set_profile_cache(cache):
+    global _profile_cache
+    _profile_cache = cache
+
+def _profile_create(s1, matrix, width, stats=False):
+    cache = _setting("profile_cache")
+    if cache is not None:
+        return cache.get(s1, matrix, width, stats)
+    return globals()["profile_create"+("_stats" if stats else "")+"_"+str(width)](s1, matrix)
 
 def can_use_avx2():
     return bool(_lib.parasail_can_use_avx2())
@@ -675,73 +1026,32 @@ _lib.parasail_matrix_from_file_case_sensitive
 _lib.parasail_matrix_from_file_case_sensitive.argtypes = [ctypes.c_char_p]
 _lib.parasail_matrix_from_file_case_sensitive.restype = c_matrix_p
 
-blosum100 = Matrix(_lib.parasail_matrix_lookup(b("blosum100")))
-blosum30 = Matrix(_lib.parasail_matrix_lookup(b("blosum30")))
-blosum35 = Matrix(_lib.parasail_matrix_lookup(b("blosum35")))
-blosum40 = Matrix(_lib.parasail_matrix_lookup(b("blosum40")))
-blosum45 = Matrix(_lib.parasail_matrix_lookup(b("blosum45")))
-blosum50 = Matrix(_lib.parasail_matrix_lookup(b("blosum50")))
-blosum55 = Matrix(_lib.parasail_matrix_lookup(b("blosum55")))
-blosum60 = Matrix(_lib.parasail_matrix_lookup(b("blosum60")))
-blosum62 = Matrix(_lib.parasail_matrix_lookup(b("blosum62")))
-blosum65 = Matrix(_lib.parasail_matrix_lookup(b("blosum65")))
-blosum70 = Matrix(_lib.parasail_matrix_lookup(b("blosum70")))
-blosum75 = Matrix(_lib.parasail_matrix_lookup(b("blosum75")))
-blosum80 = Matrix(_lib.parasail_matrix_lookup(b("blosum80")))
-blosum85 = Matrix(_lib.parasail_matrix_lookup(b("blosum85")))
-blosum90 = Matrix(_lib.parasail_matrix_lookup(b("blosum90")))
-pam10 = Matrix(_lib.parasail_matrix_lookup(b("pam10")))
-pam100 = Matrix(_lib.parasail_matrix_lookup(b("pam100")))
-pam110 = Matrix(_lib.parasail_matrix_lookup(b("pam110")))
-pam120 = Matrix(_lib.parasail_matrix_lookup(b("pam120")))
-pam130 = Matrix(_lib.parasail_matrix_lookup(b("pam130")))
-pam140 = Matrix(_lib.parasail_matrix_lookup(b("pam140")))
-pam150 = Matrix(_lib.parasail_matrix_lookup(b("pam150")))
-pam160 = Matrix(_lib.parasail_matrix_lookup(b("pam160")))
-pam170 = Matrix(_lib.parasail_matrix_lookup(b("pam170")))
-pam180 = Matrix(_lib.parasail_matrix_lookup(b("pam180")))
-pam190 = Matrix(_lib.parasail_matrix_lookup(b("pam190")))
-pam20 = Matrix(_lib.parasail_matrix_lookup(b("pam20")))
-pam200 = Matrix(_lib.parasail_matrix_lookup(b("pam200")))
-pam210 = Matrix(_lib.parasail_matrix_lookup(b("pam210")))
-pam220 = Matrix(_lib.parasail_matrix_lookup(b("pam220")))
-pam230 = Matrix(_lib.parasail_matrix_lookup(b("pam230")))
-pam240 = Matrix(_lib.parasail_matrix_lookup(b("pam240")))
-pam250 = Matrix(_lib.parasail_matrix_lookup(b("pam250")))
-pam260 = Matrix(_lib.parasail_matrix_lookup(b("pam260")))
-pam270 = Matrix(_lib.parasail_matrix_lookup(b("pam270")))
-pam280 = Matrix(_lib.parasail_matrix_lookup(b("pam280")))
-pam290 = Matrix(_lib.parasail_matrix_lookup(b("pam290")))
-pam30 = Matrix(_lib.parasail_matrix_lookup(b("pam30")))
-pam300 = Matrix(_lib.parasail_matrix_lookup(b("pam300")))
-pam310 = Matrix(_lib.parasail_matrix_lookup(b("pam310")))
-pam320 = Matrix(_lib.parasail_matrix_lookup(b("pam320")))
-pam330 = Matrix(_lib.parasail_matrix_lookup(b("pam330")))
-pam340 = Matrix(_lib.parasail_matrix_lookup(b("pam340")))
-pam350 = Matrix(_lib.parasail_matrix_lookup(b("pam350")))
-pam360 = Matrix(_lib.parasail_matrix_lookup(b("pam360")))
-pam370 = Matrix(_lib.parasail_matrix_lookup(b("pam370")))
-pam380 = Matrix(_lib.parasail_matrix_lookup(b("pam380")))
-pam390 = Matrix(_lib.parasail_matrix_lookup(b("pam390")))
-pam40 = Matrix(_lib.parasail_matrix_lookup(b("pam40")))
-pam400 = Matrix(_lib.parasail_matrix_lookup(b("pam400")))
-pam410 = Matrix(_lib.parasail_matrix_lookup(b("pam410")))
-pam420 = Matrix(_lib.parasail_matrix_lookup(b("pam420")))
-pam430 = Matrix(_lib.parasail_matrix_lookup(b("pam430")))
-pam440 = Matrix(_lib.parasail_matrix_lookup(b("pam440")))
-pam450 = Matrix(_lib.parasail_matrix_lookup(b("pam450")))
-pam460 = Matrix(_lib.parasail_matrix_lookup(b("pam460")))
-pam470 = Matrix(_lib.parasail_matrix_lookup(b("pam470")))
-pam480 = Matrix(_lib.parasail_matrix_lookup(b("pam480")))
-pam490 = Matrix(_lib.parasail_matrix_lookup(b("pam490")))
-pam50 = Matrix(_lib.parasail_matrix_lookup(b("pam50")))
-pam500 = Matrix(_lib.parasail_matrix_lookup(b("pam500")))
-pam60 = Matrix(_lib.parasail_matrix_lookup(b("pam60")))
-pam70 = Matrix(_lib.parasail_matrix_lookup(b("pam70")))
-pam80 = Matrix(_lib.parasail_matrix_lookup(b("pam80")))
-pam90 = Matrix(_lib.parasail_matrix_lookup(b("pam90")))
-dnafull = Matrix(_lib.parasail_matrix_lookup(b("dnafull")))
-nuc44 = Matrix(_lib.parasail_matrix_lookup(b("nuc44")))
+# The built-in matrices are looked up the first time they are accessed
+# through the module __getattr__ and then kept as module attributes.
+_builtin_matrices = frozenset('''
+blosum100 blosum30 blosum35 blosum40 blosum45 blosum50 blosum55 blosum60
+blosum62 blosum65 blosum70 blosum75 blosum80 blosum85 blosum90 pam10
+pam100 pam110 pam120 pam130 pam140 pam150 pam160 pam170
+pam180 pam190 pam20 pam200 pam210 pam220 pam230 pam240
+pam250 pam260 pam270 pam280 pam290 pam30 pam300 pam310
+pam320 pam330 pam340 pam350 pam360 pam370 pam380 pam390
+pam40 pam400 pam410 pam420 pam430 pam440 pam450 pam460
+pam470 pam480 pam490 pam50 pam500 pam60 pam70 pam80
+pam90 dnafull nuc44
+'''.split())
+
+def _unpickle_builtin_matrix(name):
+    if name in _builtin_matrices:
+        return globals().get(name) or _builtin_matrix(name)
+    return Matrix(name)
+
+def _unpickle_matrix(values, mapper):
+    return Matrix._from_arrays(values, mapper)
+
+def _builtin_matrix(name):
+    matrix = Matrix(_lib.parasail_matrix_lookup(b(name)))
+    globals()[name] = matrix
+    return matrix
 
 _lib.parasail_matrix_create.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int]
 _lib.parasail_matrix_create.restype = c_matrix_p
@@ -750,7 +1060,7 @@ _lib.parasail_matrix_create_case_sensitive.argtypes = [ctypes.c_char_p, ctypes.c
 _lib.parasail_matrix_create_case_sensitive.restype = c_matrix_p
 
 def matrix_create(alphabet, match, mismatch, case_sensitive=None):
-    case = case_sensitive or _case_sensitive
+    case = _option(case_sensitive, "case_sensitive")
     if case:
         return Matrix(_lib.parasail_matrix_create_case_sensitive(b(alphabet), match, mismatch))
     else:
@@ -771,7 +1081,9 @@ _lib.parasail_nw_banded.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char
 _lib.parasail_nw_banded.restype = c_result_p
 
 def nw_banded(s1, s2, open, extend, k, matrix):
-    return Result(_lib.parasail_nw_banded(b(s1), len(s1), b(s2), len(s2), open, extend, k, matrix), len(s1), len(s2))
+    s1b, s1Len = _buffer(s1)
+    s2b, s2Len = _buffer(s2)
+    return Result(_lib.parasail_nw_banded(s1b, s1Len, s2b, s2Len, open, extend, k, matrix), s1Len, s2Len)
 
 _lib.parasail_result_get_traceback.argtypes = [c_result_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, c_matrix_p, ctypes.c_char, ctypes.c_char, ctypes.c_char]
 _lib.parasail_result_get_traceback.restype = c_traceback_p
@@ -914,14 +1226,17 @@ _lib.parasail_result_get_trace_ins_table.restype = c_int_p
 _lib.parasail_result_get_trace_del_table.argtypes = [c_result_p]
 _lib.parasail_result_get_trace_del_table.restype = c_int_p
 
-class SSWResult:
+class SSWResult(object):
+    __slots__ = ("pointer", "__weakref__")
     def __init__(self, pointer):
         self.pointer = pointer
-        self._as_parameter_ = pointer
     def __del__(self):
         if _lib:
             _lib.parasail_result_ssw_free(self.pointer)
     @property
+    def _as_parameter_(self):
+        return self.pointer
+    @property
     def score1(self):
         return self.pointer[0].score1
     @property
@@ -959,28 +1274,37 @@ _lib.parasail_result_ssw_free.argtype = [c_result_ssw_p]
 _lib.parasail_result_ssw_free.restype = None
 
 def ssw(s1, s2, open, extend, matrix):
-    pointer = _lib.parasail_ssw(b(s1), len(s1), b(s2), len(s2), open, extend, matrix)
+    s1b, s1Len = _buffer(s1)
+    s2b, s2Len = _buffer(s2)
+    pointer = _lib.parasail_ssw(s1b, s1Len, s2b, s2Len, open, extend, matrix)
     if pointer:
         return SSWResult(pointer)
     else:
         return None
 
 def ssw_profile(profile, s2, open, extend):
-    pointer = _lib.parasail_ssw_profile(profile, b(s2), len(s2), open, extend)
+    s2b, s2Len = _buffer(s2)
+    pointer = _lib.parasail_ssw_profile(profile, s2b, s2Len, open, extend)
     if pointer:
         return SSWResult(pointer)
     else:
         return None
 
 def ssw_init(s1, matrix, score_size):
-    return Profile(_lib.parasail_ssw_init(b(s1), len(s1), matrix, score_size), matrix)
+    s1b, s1Len = _buffer(s1)
+    profile = Profile(_lib.parasail_ssw_init(s1b, s1Len, matrix, score_size), matrix, s1b)
+    profile._score_size = score_size
+    return profile
 
 _lib.parasail_sequences_from_file.argtype = [ctypes.c_char_p]
 _lib.parasail_sequences_from_file.restype = c_sequences_p
 
-class Sequence:
-    def __init__(self, pointer):
+class Sequence(object):
+    # a view into Sequences, which it keeps alive as its owner
+    __slots__ = ("pointer", "_owner", "__weakref__")
+    def __init__(self, pointer, owner=None):
         self.pointer = pointer
+        self._owner = owner
     def __len__(self):
         return int(self.pointer[0].seq.l)
     def __getitem__(self, key):
@@ -993,7 +1317,7 @@ class Sequence:
         else:
             raise TypeError('Index must be int, not {}'.format(type(key).__name__))
     def __str__(self):
-        return self.pointer[0].seq.s
+        return s(self.seq)
     @property
     def name(self):
         return self.pointer[0].name.s
@@ -1019,6 +1343,7 @@ class Sequence:
 class Sequences:
     def __init__(self, pointer):
         self.pointer = pointer
+        self._residues = None
     def __del__(self):
         if _lib:
             _lib.parasail_sequences_free(self.pointer)
@@ -1030,7 +1355,7 @@ class Sequences:
                 key = key + self.pointer[0].l
             if key < 0 or key > self.pointer[0].l:
                 raise IndexError('Index out of range')
-            return Sequence(ctypes.pointer(self.pointer[0].seqs[key]))
+            return Sequence(ctypes.pointer(self.pointer[0].seqs[key]), self)
         else:
             raise TypeError('Index must be int, not {}'.format(type(key).__name__))
     @property
@@ -1048,14567 +1373,725 @@ class Sequences:
     @property
     def stddev(self):
         return float(self.pointer[0].stddev)
+    def _column(self, field):
+        # one size_t-sized field of every sequence_t in the C array, copied
+        # so that it outlives this object
+        word = ctypes.sizeof(ctypes.c_size_t)
+        if len(self) == 0:
+            return numpy.zeros(0, numpy.uintp)
+        words = _make_nd_array(self.pointer[0].seqs,
+                (len(self), ctypes.sizeof(sequence_t) // word), numpy.uintp)
+        return words[:, (sequence_t.seq.offset + field.offset) // word].copy()
+    @property
+    def lengths(self):
+        return self._column(pstring_t.l)
+    @property
+    def offsets(self):
+        offsets = numpy.zeros(len(self)+1, numpy.int64)
+        numpy.cumsum(self.lengths, out=offsets[1:])
+        return offsets
+    @property
+    def residues(self):
+        # The C library allocates every sequence separately, so the
+        # residues are packed once into a single array and cached.
+        if self._residues is None:
+            offsets = self.offsets
+            residues = numpy.zeros(offsets[-1], numpy.uint8)
+            base = residues.ctypes.data
+            for i, (address, length) in enumerate(zip(self._column(pstring_t.s), self.lengths)):
+                ctypes.memmove(base + int(offsets[i]), int(address), int(length))
+            self._residues = residues
+        return self._residues
 
 def sequences_from_file(filename):
     return Sequences(_lib.parasail_sequences_from_file(b(filename)))
 
+# Batch alignment.
+# The per-pair wrappers below build a Result for every call.  The batch
+# functions instead look up the C function once, build one query Profile
+# for striped and scan kernels, and copy the scalar results into numpy
+# arrays before freeing each native result.  ctypes.CDLL releases the GIL
+# for the duration of every C call.
+
+_profile_func_re = re.compile("^(.+)_(striped|scan)_(8|16|32|64|sat)$")
+
+def _batch_name(func):
+    name = func if isstr(func) else func.__name__
+    if "_trace" in name or "_table" in name or "_rowcol" in name:
+        raise ValueError("'{}' is not a score-only alignment function".format(name))
+    return name
+
+def _batch_kernel(func, query, matrix, open, extend):
+    name = _batch_name(func)
+    match = _profile_func_re.match(name)
+    if match:
+        alg, par, width = match.groups()
+        profile = _profile_create(query, matrix, width, "_stats" in alg)
+        c_func = _c_function("{}_{}_profile_{}".format(alg, par, width))
+        return c_func, (profile,), (open, extend)
+    if name not in _binders:
+        raise ValueError("unknown alignment function '{}'".format(name))
+    return _c_function(name), _buffer(query), (open, extend, matrix)
+
+_FLAG_SATURATED = 1 << 6
+
+class ResultRow:
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+    @property
+    def saturated(self):
+        return bool(self.batch.flag[self.index] & _FLAG_SATURATED)
+    @property
+    def score(self):
+        return int(self.batch.score[self.index])
+    @property
+    def end_query(self):
+        return int(self.batch.end_query[self.index])
+    @property
+    def end_ref(self):
+        return int(self.batch.end_ref[self.index])
+    @property
+    def flag(self):
+        return int(self.batch.flag[self.index])
+    @property
+    def matches(self):
+        return int(self.batch.matches[self.index])
+    @property
+    def similar(self):
+        return int(self.batch.similar[self.index])
+    @property
+    def length(self):
+        return int(self.batch.length[self.index])
+
+class ResultBatch:
+    def __init__(self, score, end_query, end_ref, flag, matches=None, similar=None, length=None):
+        self.score = score
+        self.end_query = end_query
+        self.end_ref = end_ref
+        self.flag = flag
+        self._matches = matches
+        self._similar = similar
+        self._length = length
+        self.escalated = {}
+    @staticmethod
+    def empty(count, stats=False):
+        arrays = [numpy.zeros(count, numpy.intc) for i in range(7 if stats else 4)]
+        return ResultBatch(*arrays)
+    def __len__(self):
+        return len(self.score)
+    def __iter__(self):
+        for i in range(len(self)):
+            yield ResultRow(self, i)
+    def __getitem__(self, key):
+        if isinstance(key, (int, numpy.integer)):
+            if key < 0:
+                key = key + len(self)
+            if key < 0 or key >= len(self):
+                raise IndexError('Index out of range')
+            return ResultRow(self, key)
+        arrays = [self.score, self.end_query, self.end_ref, self.flag,
+                  self._matches, self._similar, self._length]
+        return ResultBatch(*[None if a is None else a[key] for a in arrays])
+    @property
+    def stats(self):
+        return self._matches is not None
+    @property
+    def saturated(self):
+        return (self.flag & _FLAG_SATURATED) != 0
+    @property
+    def matches(self):
+        if self._matches is None:
+            raise AttributeError("'ResultBatch' object has no stats")
+        return self._matches
+    @property
+    def similar(self):
+        if self._similar is None:
+            raise AttributeError("'ResultBatch' object has no stats")
+        return self._similar
+    @property
+    def length(self):
+        if self._length is None:
+            raise AttributeError("'ResultBatch' object has no stats")
+        return self._length
+
+def _align_loop(c_func, head, tail, targets, score, batch=None, indices=None):
+    stats = batch is not None and batch.stats
+    if indices is None:
+        indices = range(len(targets))
+    for i, target in zip(indices, targets):
+        pointer = c_func(*(head + target + tail))
+        if not pointer:
+            raise ValueError("alignment failed for target {}".format(i))
+        result = pointer[0]
+        score[i] = result.score
+        if batch is not None:
+            batch.end_query[i] = result.end_query
+            batch.end_ref[i] = result.end_ref
+            batch.flag[i] = result.flag
+            # saturated 8-bit results of 'sat' functions carry no stats
+            if stats and result.flag & _FLAG_STATS:
+                batch._matches[i] = _lib.parasail_result_get_matches(pointer)
+                batch._similar[i] = _lib.parasail_result_get_similar(pointer)
+                batch._length[i] = _lib.parasail_result_get_length(pointer)
+        _lib.parasail_result_free(pointer)
+
+def _align_escalate(alg, par, query, targets, open, extend, matrix, batch):
+    # Run every pair with the 8-bit kernel, then re-run only the saturated
+    # pairs at 16 and then 32 bits using the same 'sat' profile.
+    stats = "_stats" in alg
+    profile = _profile_create(query, matrix, "sat", stats)
+    indices = numpy.arange(len(targets))
+    for width in [8, 16, 32]:
+        if width == 32 and not profile.pointer[0].profile32.score:
+            # older C libraries only build the 8- and 16-bit 'sat' profiles
+            profile = _profile_create(query, matrix, 32, stats)
+        c_func = _c_function("{}_{}_profile_{}".format(alg, par, width))
+        if width > 8:
+            batch.escalated[width] = len(indices)
+        _align_loop(c_func, (profile,), (open, extend),
+                [targets[i] for i in indices], batch.score, batch, indices)
+        indices = indices[(batch.flag[indices] & _FLAG_SATURATED) != 0]
+        if len(indices) == 0:
+            break
+
+def align_many(query, targets, open, extend, matrix, func="sw_striped_16"):
+    name = _batch_name(func)
+    targets = [_buffer(t) for t in targets]
+    batch = ResultBatch.empty(len(targets), "_stats" in name)
+    match = _profile_func_re.match(name)
+    if match and match.group(3) == "sat":
+        alg, par, width = match.groups()
+        _align_escalate(alg, par, query, targets, open, extend, matrix, batch)
+    else:
+        c_func, head, tail = _batch_kernel(func, query, matrix, open, extend)
+        _align_loop(c_func, head, tail, targets, batch.score, batch)
+    return batch
+
+def align_matrix(queries, targets, open, extend, matrix, func="sw_striped_16", threads=None):
+    # Each worker thread owns whole rows: one Profile per query, reused
+    # for every target.  Matrix and the encoded targets are shared
+    # read-only, which is safe because the C kernels do not modify them.
+    targets = [_buffer(t) for t in targets]
+    score = numpy.zeros((len(queries), len(targets)), numpy.intc)
+    def _row(i):
+        c_func, head, tail = _batch_kernel(func, queries[i], matrix, open, extend)
+        _align_loop(c_func, head, tail, targets, score[i])
+    # Workers run under the caller's settings, so queries are encoded
+    # like the targets and share the caller's profile_cache.
+    overrides = getattr(_local, "overrides", None)
+    def _worker(i):
+        with settings(**(overrides or {})):
+            _row(i)
+    if threads == 1:
+        for i in range(len(queries)):
+            _row(i)
+    else:
+        pool = ThreadPool(threads)
+        try:
+            pool.map(_worker, range(len(queries)), 1)
+        finally:
+            pool.close()
+            pool.join()
+    return score
+
+# The alignment functions are bound lazily.  Declaring argtypes for
+# several thousand C symbols and defining a wrapper for each dominates
+# import time, so the generated section below only lists their names;
+# the C symbol is looked up and its wrapper created on first access
+# through the module __getattr__.
+
+_pair_argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, c_matrix_p]
+_profile_argtypes = [c_profile_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+
+def _c_function(name):
+    c_func = getattr(_lib, "parasail_"+name)
+    c_func.argtypes = _profile_argtypes if "_profile_" in name else _pair_argtypes
+    c_func.restype = c_result_p
+    return c_func
+
+def _bind_pair(name):
+    c_func = _c_function(name)
+    if "_trace" in name:
+        def func(s1, s2, open, extend, matrix):
+            s1b, s1Len = _buffer(s1)
+            s2b, s2Len = _buffer(s2)
+            return Result(c_func(s1b, s1Len, s2b, s2Len, open, extend, matrix),
+                    s1Len, s2Len, s1, s2, matrix)
+    else:
+        def func(s1, s2, open, extend, matrix):
+            s1b, s1Len = _buffer(s1)
+            s2b, s2Len = _buffer(s2)
+            return Result(c_func(s1b, s1Len, s2b, s2Len, open, extend, matrix),
+                    s1Len, s2Len)
+    match = _profile_func_re.match(name)
+    if not match:
+        return func
+    # striped and scan functions use the profile cache when one is set
+    alg, par, width = match.groups()
+    profile_name = "{}_{}_profile_{}".format(alg, par, width)
+    stats = "_stats" in alg
+    def cached(s1, s2, open, extend, matrix):
+        cache = _setting("profile_cache")
+        if cache is not None:
+            return _function(profile_name)(
+                cache.get(s1, matrix, width, stats), s2, open, extend)
+        return func(s1, s2, open, extend, matrix)
+    return cached
+
+def _bind_profile(name):
+    c_func = _c_function(name)
+    if "_trace" in name:
+        def func(profile, s2, open, extend):
+            s2b, s2Len = _buffer(s2)
+            return Result(c_func(profile, s2b, s2Len, open, extend),
+                    profile.s1Len, s2Len, profile.s1, s2, profile.matrix)
+    else:
+        def func(profile, s2, open, extend):
+            s2b, s2Len = _buffer(s2)
+            return Result(c_func(profile, s2b, s2Len, open, extend),
+                    profile.s1Len, s2Len)
+    return func
+
+def _bind(name):
+    func = _binders[name](name)
+    func.__name__ = name
+    if sys.version_info >= (3, 3):
+        func.__qualname__ = name
+    globals()[name] = func
+    return func
+
+def _function(name):
+    func = globals().get(name)
+    if func is None:
+        func = _bind(name)
+    return func
+
+# Score-only calls without a Result.  The C result is read into a plain
+# tuple and freed at once, so nothing is left for the garbage collector
+# and no finaliser runs later.
+
+_score_functions = {}
+
+def _bind_score(name):
+    name = _batch_name(name)
+    if name not in _binders:
+        raise ValueError("unknown alignment function '{}'".format(name))
+    c_func = _c_function(name)
+    stats = "_stats" in name
+    def read(pointer):
+        if not pointer:
+            raise ValueError("'{}' failed".format(name))
+        result = pointer[0]
+        values = (result.score, result.end_query, result.end_ref)
+        if stats:
+            values += (_lib.parasail_result_get_matches(pointer),
+                    _lib.parasail_result_get_similar(pointer),
+                    _lib.parasail_result_get_length(pointer))
+        _lib.parasail_result_free(pointer)
+        return values
+    if _binders[name] is _bind_profile:
+        def func(profile, s2, open, extend):
+            s2b, s2Len = _buffer(s2)
+            return read(c_func(profile, s2b, s2Len, open, extend))
+        return func
+    match = _profile_func_re.match(name)
+    profile_func = None
+    if match:
+        alg, par, width = match.groups()
+        profile_func = _bind_score("{}_{}_profile_{}".format(alg, par, width))
+    def func(s1, s2, open, extend, matrix):
+        if profile_func is not None:
+            cache = _setting("profile_cache")
+            if cache is not None:
+                return profile_func(cache.get(s1, matrix, width, stats), s2, open, extend)
+        s1b, s1Len = _buffer(s1)
+        s2b, s2Len = _buffer(s2)
+        return read(c_func(s1b, s1Len, s2b, s2Len, open, extend, matrix))
+    return func
+
+def align_score(func, *args):
+    # Align like func(*args), a score-only function or its name, and
+    # return the tuple (score, end_query, end_ref), followed by (matches,
+    # similar, length) for stats functions, instead of a Result.
+    name = func if isstr(func) else func.__name__
+    score_func = _score_functions.get(name)
+    if score_func is None:
+        score_func = _score_functions[name] = _bind_score(name)
+    return score_func(*args)
+
+def __getattr__(name):
+    if name in _binders:
+        return _bind(name)
+    if name in _builtin_matrices:
+        return _builtin_matrix(name)
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(_binders) | _builtin_matrices)
+
 # begin generated names here
 
-_argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, c_matrix_p]
-
-
-_lib.parasail_nw.argtypes = _argtypes
-_lib.parasail_nw.restype = c_result_p
-def nw(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table.argtypes = _argtypes
-_lib.parasail_nw_table.restype = c_result_p
-def nw_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol.argtypes = _argtypes
-_lib.parasail_nw_rowcol.restype = c_result_p
-def nw_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_trace.argtypes = _argtypes
-_lib.parasail_nw_trace.restype = c_result_p
-def nw_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_stats.argtypes = _argtypes
-_lib.parasail_nw_stats.restype = c_result_p
-def nw_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table.argtypes = _argtypes
-_lib.parasail_nw_stats_table.restype = c_result_p
-def nw_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol.restype = c_result_p
-def nw_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg.argtypes = _argtypes
-_lib.parasail_sg.restype = c_result_p
-def sg(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table.argtypes = _argtypes
-_lib.parasail_sg_table.restype = c_result_p
-def sg_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol.argtypes = _argtypes
-_lib.parasail_sg_rowcol.restype = c_result_p
-def sg_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_trace.argtypes = _argtypes
-_lib.parasail_sg_trace.restype = c_result_p
-def sg_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_stats.argtypes = _argtypes
-_lib.parasail_sg_stats.restype = c_result_p
-def sg_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table.argtypes = _argtypes
-_lib.parasail_sg_stats_table.restype = c_result_p
-def sg_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol.restype = c_result_p
-def sg_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw.argtypes = _argtypes
-_lib.parasail_sw.restype = c_result_p
-def sw(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table.argtypes = _argtypes
-_lib.parasail_sw_table.restype = c_result_p
-def sw_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol.argtypes = _argtypes
-_lib.parasail_sw_rowcol.restype = c_result_p
-def sw_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_trace.argtypes = _argtypes
-_lib.parasail_sw_trace.restype = c_result_p
-def sw_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_stats.argtypes = _argtypes
-_lib.parasail_sw_stats.restype = c_result_p
-def sw_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table.argtypes = _argtypes
-_lib.parasail_sw_stats_table.restype = c_result_p
-def sw_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol.restype = c_result_p
-def sw_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb.argtypes = _argtypes
-_lib.parasail_sg_qb.restype = c_result_p
-def sg_qb(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table.argtypes = _argtypes
-_lib.parasail_sg_qb_table.restype = c_result_p
-def sg_qb_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol.restype = c_result_p
-def sg_qb_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_trace.argtypes = _argtypes
-_lib.parasail_sg_qb_trace.restype = c_result_p
-def sg_qb_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_stats.argtypes = _argtypes
-_lib.parasail_sg_qb_stats.restype = c_result_p
-def sg_qb_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table.restype = c_result_p
-def sg_qb_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol.restype = c_result_p
-def sg_qb_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe.argtypes = _argtypes
-_lib.parasail_sg_qe.restype = c_result_p
-def sg_qe(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table.argtypes = _argtypes
-_lib.parasail_sg_qe_table.restype = c_result_p
-def sg_qe_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol.restype = c_result_p
-def sg_qe_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_trace.argtypes = _argtypes
-_lib.parasail_sg_qe_trace.restype = c_result_p
-def sg_qe_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_stats.argtypes = _argtypes
-_lib.parasail_sg_qe_stats.restype = c_result_p
-def sg_qe_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table.restype = c_result_p
-def sg_qe_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol.restype = c_result_p
-def sg_qe_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx.argtypes = _argtypes
-_lib.parasail_sg_qx.restype = c_result_p
-def sg_qx(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table.argtypes = _argtypes
-_lib.parasail_sg_qx_table.restype = c_result_p
-def sg_qx_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol.restype = c_result_p
-def sg_qx_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_trace.argtypes = _argtypes
-_lib.parasail_sg_qx_trace.restype = c_result_p
-def sg_qx_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_stats.argtypes = _argtypes
-_lib.parasail_sg_qx_stats.restype = c_result_p
-def sg_qx_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table.restype = c_result_p
-def sg_qx_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol.restype = c_result_p
-def sg_qx_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db.argtypes = _argtypes
-_lib.parasail_sg_db.restype = c_result_p
-def sg_db(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table.argtypes = _argtypes
-_lib.parasail_sg_db_table.restype = c_result_p
-def sg_db_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol.restype = c_result_p
-def sg_db_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_trace.argtypes = _argtypes
-_lib.parasail_sg_db_trace.restype = c_result_p
-def sg_db_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_stats.argtypes = _argtypes
-_lib.parasail_sg_db_stats.restype = c_result_p
-def sg_db_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table.restype = c_result_p
-def sg_db_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol.restype = c_result_p
-def sg_db_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de.argtypes = _argtypes
-_lib.parasail_sg_de.restype = c_result_p
-def sg_de(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table.argtypes = _argtypes
-_lib.parasail_sg_de_table.restype = c_result_p
-def sg_de_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol.restype = c_result_p
-def sg_de_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_trace.argtypes = _argtypes
-_lib.parasail_sg_de_trace.restype = c_result_p
-def sg_de_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_stats.argtypes = _argtypes
-_lib.parasail_sg_de_stats.restype = c_result_p
-def sg_de_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table.restype = c_result_p
-def sg_de_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol.restype = c_result_p
-def sg_de_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx.argtypes = _argtypes
-_lib.parasail_sg_dx.restype = c_result_p
-def sg_dx(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table.argtypes = _argtypes
-_lib.parasail_sg_dx_table.restype = c_result_p
-def sg_dx_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol.restype = c_result_p
-def sg_dx_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_trace.argtypes = _argtypes
-_lib.parasail_sg_dx_trace.restype = c_result_p
-def sg_dx_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_stats.argtypes = _argtypes
-_lib.parasail_sg_dx_stats.restype = c_result_p
-def sg_dx_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table.restype = c_result_p
-def sg_dx_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol.restype = c_result_p
-def sg_dx_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de.argtypes = _argtypes
-_lib.parasail_sg_qb_de.restype = c_result_p
-def sg_qb_de(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table.restype = c_result_p
-def sg_qb_de_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol.restype = c_result_p
-def sg_qb_de_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_trace.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace.restype = c_result_p
-def sg_qb_de_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_stats.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats.restype = c_result_p
-def sg_qb_de_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table.restype = c_result_p
-def sg_qb_de_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol.restype = c_result_p
-def sg_qb_de_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db.argtypes = _argtypes
-_lib.parasail_sg_qe_db.restype = c_result_p
-def sg_qe_db(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table.restype = c_result_p
-def sg_qe_db_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol.restype = c_result_p
-def sg_qe_db_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_trace.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace.restype = c_result_p
-def sg_qe_db_trace(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_stats.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats.restype = c_result_p
-def sg_qe_db_stats(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table.restype = c_result_p
-def sg_qe_db_stats_table(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol.restype = c_result_p
-def sg_qe_db_stats_rowcol(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_scan.argtypes = _argtypes
-_lib.parasail_nw_scan.restype = c_result_p
-def nw_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_scan.argtypes = _argtypes
-_lib.parasail_nw_table_scan.restype = c_result_p
-def nw_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan.restype = c_result_p
-def nw_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_trace_scan.argtypes = _argtypes
-_lib.parasail_nw_trace_scan.restype = c_result_p
-def nw_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_stats_scan.argtypes = _argtypes
-_lib.parasail_nw_stats_scan.restype = c_result_p
-def nw_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan.restype = c_result_p
-def nw_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan.restype = c_result_p
-def nw_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_scan.argtypes = _argtypes
-_lib.parasail_sg_scan.restype = c_result_p
-def sg_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_scan.argtypes = _argtypes
-_lib.parasail_sg_table_scan.restype = c_result_p
-def sg_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan.restype = c_result_p
-def sg_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_trace_scan.restype = c_result_p
-def sg_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_stats_scan.restype = c_result_p
-def sg_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan.restype = c_result_p
-def sg_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan.restype = c_result_p
-def sg_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_scan.argtypes = _argtypes
-_lib.parasail_sw_scan.restype = c_result_p
-def sw_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_scan.argtypes = _argtypes
-_lib.parasail_sw_table_scan.restype = c_result_p
-def sw_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan.restype = c_result_p
-def sw_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_trace_scan.argtypes = _argtypes
-_lib.parasail_sw_trace_scan.restype = c_result_p
-def sw_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_stats_scan.argtypes = _argtypes
-_lib.parasail_sw_stats_scan.restype = c_result_p
-def sw_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan.restype = c_result_p
-def sw_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan.restype = c_result_p
-def sw_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_scan.restype = c_result_p
-def sg_qb_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan.restype = c_result_p
-def sg_qb_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan.restype = c_result_p
-def sg_qb_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan.restype = c_result_p
-def sg_qb_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan.restype = c_result_p
-def sg_qb_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan.restype = c_result_p
-def sg_qb_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan.restype = c_result_p
-def sg_qb_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_scan.restype = c_result_p
-def sg_qe_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan.restype = c_result_p
-def sg_qe_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan.restype = c_result_p
-def sg_qe_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan.restype = c_result_p
-def sg_qe_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan.restype = c_result_p
-def sg_qe_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan.restype = c_result_p
-def sg_qe_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan.restype = c_result_p
-def sg_qe_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_scan.argtypes = _argtypes
-_lib.parasail_sg_qx_scan.restype = c_result_p
-def sg_qx_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan.restype = c_result_p
-def sg_qx_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan.restype = c_result_p
-def sg_qx_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan.restype = c_result_p
-def sg_qx_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan.restype = c_result_p
-def sg_qx_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan.restype = c_result_p
-def sg_qx_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan.restype = c_result_p
-def sg_qx_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_scan.argtypes = _argtypes
-_lib.parasail_sg_db_scan.restype = c_result_p
-def sg_db_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_scan.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan.restype = c_result_p
-def sg_db_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan.restype = c_result_p
-def sg_db_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan.restype = c_result_p
-def sg_db_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan.restype = c_result_p
-def sg_db_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan.restype = c_result_p
-def sg_db_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan.restype = c_result_p
-def sg_db_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_scan.argtypes = _argtypes
-_lib.parasail_sg_de_scan.restype = c_result_p
-def sg_de_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_scan.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan.restype = c_result_p
-def sg_de_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan.restype = c_result_p
-def sg_de_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan.restype = c_result_p
-def sg_de_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan.restype = c_result_p
-def sg_de_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan.restype = c_result_p
-def sg_de_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan.restype = c_result_p
-def sg_de_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_scan.argtypes = _argtypes
-_lib.parasail_sg_dx_scan.restype = c_result_p
-def sg_dx_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan.restype = c_result_p
-def sg_dx_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan.restype = c_result_p
-def sg_dx_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan.restype = c_result_p
-def sg_dx_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan.restype = c_result_p
-def sg_dx_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan.restype = c_result_p
-def sg_dx_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan.restype = c_result_p
-def sg_dx_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan.restype = c_result_p
-def sg_qb_de_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan.restype = c_result_p
-def sg_qb_de_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan.restype = c_result_p
-def sg_qb_de_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan.restype = c_result_p
-def sg_qb_de_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan.restype = c_result_p
-def sg_qb_de_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan.restype = c_result_p
-def sg_qb_de_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan.restype = c_result_p
-def sg_qe_db_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan.restype = c_result_p
-def sg_qe_db_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan.restype = c_result_p
-def sg_qe_db_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_trace_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan.restype = c_result_p
-def sg_qe_db_trace_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_stats_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan.restype = c_result_p
-def sg_qe_db_stats_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan.restype = c_result_p
-def sg_qe_db_stats_table_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_scan_64.argtypes = _argtypes
-_lib.parasail_nw_scan_64.restype = c_result_p
-def nw_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_scan_32.argtypes = _argtypes
-_lib.parasail_nw_scan_32.restype = c_result_p
-def nw_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_scan_16.argtypes = _argtypes
-_lib.parasail_nw_scan_16.restype = c_result_p
-def nw_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_scan_8.argtypes = _argtypes
-_lib.parasail_nw_scan_8.restype = c_result_p
-def nw_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_scan_sat.argtypes = _argtypes
-_lib.parasail_nw_scan_sat.restype = c_result_p
-def nw_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_striped_64.argtypes = _argtypes
-_lib.parasail_nw_striped_64.restype = c_result_p
-def nw_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_striped_32.argtypes = _argtypes
-_lib.parasail_nw_striped_32.restype = c_result_p
-def nw_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_striped_16.argtypes = _argtypes
-_lib.parasail_nw_striped_16.restype = c_result_p
-def nw_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_striped_8.argtypes = _argtypes
-_lib.parasail_nw_striped_8.restype = c_result_p
-def nw_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_striped_sat.argtypes = _argtypes
-_lib.parasail_nw_striped_sat.restype = c_result_p
-def nw_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_diag_64.argtypes = _argtypes
-_lib.parasail_nw_diag_64.restype = c_result_p
-def nw_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_diag_32.argtypes = _argtypes
-_lib.parasail_nw_diag_32.restype = c_result_p
-def nw_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_diag_16.argtypes = _argtypes
-_lib.parasail_nw_diag_16.restype = c_result_p
-def nw_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_diag_8.argtypes = _argtypes
-_lib.parasail_nw_diag_8.restype = c_result_p
-def nw_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_diag_sat.argtypes = _argtypes
-_lib.parasail_nw_diag_sat.restype = c_result_p
-def nw_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_scan_64.argtypes = _argtypes
-_lib.parasail_nw_table_scan_64.restype = c_result_p
-def nw_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_scan_32.argtypes = _argtypes
-_lib.parasail_nw_table_scan_32.restype = c_result_p
-def nw_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_scan_16.argtypes = _argtypes
-_lib.parasail_nw_table_scan_16.restype = c_result_p
-def nw_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_scan_8.argtypes = _argtypes
-_lib.parasail_nw_table_scan_8.restype = c_result_p
-def nw_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_scan_sat.argtypes = _argtypes
-_lib.parasail_nw_table_scan_sat.restype = c_result_p
-def nw_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_striped_64.argtypes = _argtypes
-_lib.parasail_nw_table_striped_64.restype = c_result_p
-def nw_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_striped_32.argtypes = _argtypes
-_lib.parasail_nw_table_striped_32.restype = c_result_p
-def nw_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_striped_16.argtypes = _argtypes
-_lib.parasail_nw_table_striped_16.restype = c_result_p
-def nw_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_striped_8.argtypes = _argtypes
-_lib.parasail_nw_table_striped_8.restype = c_result_p
-def nw_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_striped_sat.argtypes = _argtypes
-_lib.parasail_nw_table_striped_sat.restype = c_result_p
-def nw_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_diag_64.argtypes = _argtypes
-_lib.parasail_nw_table_diag_64.restype = c_result_p
-def nw_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_diag_32.argtypes = _argtypes
-_lib.parasail_nw_table_diag_32.restype = c_result_p
-def nw_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_diag_16.argtypes = _argtypes
-_lib.parasail_nw_table_diag_16.restype = c_result_p
-def nw_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_diag_8.argtypes = _argtypes
-_lib.parasail_nw_table_diag_8.restype = c_result_p
-def nw_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_table_diag_sat.argtypes = _argtypes
-_lib.parasail_nw_table_diag_sat.restype = c_result_p
-def nw_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_64.restype = c_result_p
-def nw_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_32.restype = c_result_p
-def nw_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_16.restype = c_result_p
-def nw_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_8.restype = c_result_p
-def nw_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_sat.restype = c_result_p
-def nw_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_64.restype = c_result_p
-def nw_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_32.restype = c_result_p
-def nw_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_16.restype = c_result_p
-def nw_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_8.restype = c_result_p
-def nw_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_sat.restype = c_result_p
-def nw_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_nw_rowcol_diag_64.restype = c_result_p
-def nw_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_nw_rowcol_diag_32.restype = c_result_p
-def nw_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_nw_rowcol_diag_16.restype = c_result_p
-def nw_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_nw_rowcol_diag_8.restype = c_result_p
-def nw_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_nw_rowcol_diag_sat.restype = c_result_p
-def nw_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_trace_scan_64.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_64.restype = c_result_p
-def nw_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_scan_32.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_32.restype = c_result_p
-def nw_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_scan_16.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_16.restype = c_result_p
-def nw_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_scan_8.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_8.restype = c_result_p
-def nw_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_sat.restype = c_result_p
-def nw_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_striped_64.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_64.restype = c_result_p
-def nw_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_striped_32.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_32.restype = c_result_p
-def nw_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_striped_16.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_16.restype = c_result_p
-def nw_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_striped_8.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_8.restype = c_result_p
-def nw_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_sat.restype = c_result_p
-def nw_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_diag_64.argtypes = _argtypes
-_lib.parasail_nw_trace_diag_64.restype = c_result_p
-def nw_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_diag_32.argtypes = _argtypes
-_lib.parasail_nw_trace_diag_32.restype = c_result_p
-def nw_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_diag_16.argtypes = _argtypes
-_lib.parasail_nw_trace_diag_16.restype = c_result_p
-def nw_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_diag_8.argtypes = _argtypes
-_lib.parasail_nw_trace_diag_8.restype = c_result_p
-def nw_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_nw_trace_diag_sat.restype = c_result_p
-def nw_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_nw_stats_scan_64.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_64.restype = c_result_p
-def nw_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_scan_32.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_32.restype = c_result_p
-def nw_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_scan_16.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_16.restype = c_result_p
-def nw_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_scan_8.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_8.restype = c_result_p
-def nw_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_sat.restype = c_result_p
-def nw_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_striped_64.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_64.restype = c_result_p
-def nw_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_striped_32.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_32.restype = c_result_p
-def nw_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_striped_16.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_16.restype = c_result_p
-def nw_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_striped_8.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_8.restype = c_result_p
-def nw_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_sat.restype = c_result_p
-def nw_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_diag_64.argtypes = _argtypes
-_lib.parasail_nw_stats_diag_64.restype = c_result_p
-def nw_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_diag_32.argtypes = _argtypes
-_lib.parasail_nw_stats_diag_32.restype = c_result_p
-def nw_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_diag_16.argtypes = _argtypes
-_lib.parasail_nw_stats_diag_16.restype = c_result_p
-def nw_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_diag_8.argtypes = _argtypes
-_lib.parasail_nw_stats_diag_8.restype = c_result_p
-def nw_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_diag_sat.restype = c_result_p
-def nw_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_64.restype = c_result_p
-def nw_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_32.restype = c_result_p
-def nw_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_16.restype = c_result_p
-def nw_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_8.restype = c_result_p
-def nw_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_sat.restype = c_result_p
-def nw_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_64.restype = c_result_p
-def nw_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_32.restype = c_result_p
-def nw_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_16.restype = c_result_p
-def nw_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_8.restype = c_result_p
-def nw_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_sat.restype = c_result_p
-def nw_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_nw_stats_table_diag_64.restype = c_result_p
-def nw_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_nw_stats_table_diag_32.restype = c_result_p
-def nw_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_nw_stats_table_diag_16.restype = c_result_p
-def nw_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_nw_stats_table_diag_8.restype = c_result_p
-def nw_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_table_diag_sat.restype = c_result_p
-def nw_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_64.restype = c_result_p
-def nw_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_32.restype = c_result_p
-def nw_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_16.restype = c_result_p
-def nw_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_8.restype = c_result_p
-def nw_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_sat.restype = c_result_p
-def nw_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_64.restype = c_result_p
-def nw_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_32.restype = c_result_p
-def nw_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_16.restype = c_result_p
-def nw_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_8.restype = c_result_p
-def nw_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_sat.restype = c_result_p
-def nw_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_diag_64.restype = c_result_p
-def nw_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_diag_32.restype = c_result_p
-def nw_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_diag_16.restype = c_result_p
-def nw_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_diag_8.restype = c_result_p
-def nw_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_diag_sat.restype = c_result_p
-def nw_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_nw_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_scan_64.argtypes = _argtypes
-_lib.parasail_sg_scan_64.restype = c_result_p
-def sg_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_scan_32.argtypes = _argtypes
-_lib.parasail_sg_scan_32.restype = c_result_p
-def sg_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_scan_16.argtypes = _argtypes
-_lib.parasail_sg_scan_16.restype = c_result_p
-def sg_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_scan_8.argtypes = _argtypes
-_lib.parasail_sg_scan_8.restype = c_result_p
-def sg_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_scan_sat.restype = c_result_p
-def sg_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_striped_64.argtypes = _argtypes
-_lib.parasail_sg_striped_64.restype = c_result_p
-def sg_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_striped_32.argtypes = _argtypes
-_lib.parasail_sg_striped_32.restype = c_result_p
-def sg_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_striped_16.argtypes = _argtypes
-_lib.parasail_sg_striped_16.restype = c_result_p
-def sg_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_striped_8.argtypes = _argtypes
-_lib.parasail_sg_striped_8.restype = c_result_p
-def sg_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_striped_sat.restype = c_result_p
-def sg_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_diag_64.argtypes = _argtypes
-_lib.parasail_sg_diag_64.restype = c_result_p
-def sg_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_diag_32.argtypes = _argtypes
-_lib.parasail_sg_diag_32.restype = c_result_p
-def sg_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_diag_16.argtypes = _argtypes
-_lib.parasail_sg_diag_16.restype = c_result_p
-def sg_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_diag_8.argtypes = _argtypes
-_lib.parasail_sg_diag_8.restype = c_result_p
-def sg_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_diag_sat.restype = c_result_p
-def sg_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_table_scan_64.restype = c_result_p
-def sg_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_table_scan_32.restype = c_result_p
-def sg_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_table_scan_16.restype = c_result_p
-def sg_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_table_scan_8.restype = c_result_p
-def sg_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_table_scan_sat.restype = c_result_p
-def sg_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_table_striped_64.restype = c_result_p
-def sg_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_table_striped_32.restype = c_result_p
-def sg_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_table_striped_16.restype = c_result_p
-def sg_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_table_striped_8.restype = c_result_p
-def sg_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_table_striped_sat.restype = c_result_p
-def sg_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_table_diag_64.restype = c_result_p
-def sg_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_table_diag_32.restype = c_result_p
-def sg_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_table_diag_16.restype = c_result_p
-def sg_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_table_diag_8.restype = c_result_p
-def sg_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_table_diag_sat.restype = c_result_p
-def sg_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_64.restype = c_result_p
-def sg_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_32.restype = c_result_p
-def sg_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_16.restype = c_result_p
-def sg_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_8.restype = c_result_p
-def sg_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_sat.restype = c_result_p
-def sg_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_64.restype = c_result_p
-def sg_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_32.restype = c_result_p
-def sg_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_16.restype = c_result_p
-def sg_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_8.restype = c_result_p
-def sg_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_sat.restype = c_result_p
-def sg_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_rowcol_diag_64.restype = c_result_p
-def sg_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_rowcol_diag_32.restype = c_result_p
-def sg_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_rowcol_diag_16.restype = c_result_p
-def sg_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_rowcol_diag_8.restype = c_result_p
-def sg_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_rowcol_diag_sat.restype = c_result_p
-def sg_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_64.restype = c_result_p
-def sg_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_32.restype = c_result_p
-def sg_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_16.restype = c_result_p
-def sg_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_8.restype = c_result_p
-def sg_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_sat.restype = c_result_p
-def sg_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_64.restype = c_result_p
-def sg_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_32.restype = c_result_p
-def sg_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_16.restype = c_result_p
-def sg_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_8.restype = c_result_p
-def sg_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_sat.restype = c_result_p
-def sg_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_trace_diag_64.restype = c_result_p
-def sg_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_trace_diag_32.restype = c_result_p
-def sg_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_trace_diag_16.restype = c_result_p
-def sg_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_trace_diag_8.restype = c_result_p
-def sg_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_trace_diag_sat.restype = c_result_p
-def sg_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_64.restype = c_result_p
-def sg_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_32.restype = c_result_p
-def sg_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_16.restype = c_result_p
-def sg_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_8.restype = c_result_p
-def sg_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_sat.restype = c_result_p
-def sg_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_64.restype = c_result_p
-def sg_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_32.restype = c_result_p
-def sg_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_16.restype = c_result_p
-def sg_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_8.restype = c_result_p
-def sg_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_sat.restype = c_result_p
-def sg_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_stats_diag_64.restype = c_result_p
-def sg_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_stats_diag_32.restype = c_result_p
-def sg_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_stats_diag_16.restype = c_result_p
-def sg_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_stats_diag_8.restype = c_result_p
-def sg_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_diag_sat.restype = c_result_p
-def sg_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_64.restype = c_result_p
-def sg_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_32.restype = c_result_p
-def sg_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_16.restype = c_result_p
-def sg_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_8.restype = c_result_p
-def sg_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_sat.restype = c_result_p
-def sg_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_64.restype = c_result_p
-def sg_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_32.restype = c_result_p
-def sg_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_16.restype = c_result_p
-def sg_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_8.restype = c_result_p
-def sg_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_sat.restype = c_result_p
-def sg_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_stats_table_diag_64.restype = c_result_p
-def sg_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_stats_table_diag_32.restype = c_result_p
-def sg_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_stats_table_diag_16.restype = c_result_p
-def sg_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_stats_table_diag_8.restype = c_result_p
-def sg_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_table_diag_sat.restype = c_result_p
-def sg_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_64.restype = c_result_p
-def sg_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_32.restype = c_result_p
-def sg_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_16.restype = c_result_p
-def sg_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_8.restype = c_result_p
-def sg_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_sat.restype = c_result_p
-def sg_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_64.restype = c_result_p
-def sg_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_32.restype = c_result_p
-def sg_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_16.restype = c_result_p
-def sg_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_8.restype = c_result_p
-def sg_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_sat.restype = c_result_p
-def sg_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_diag_64.restype = c_result_p
-def sg_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_diag_32.restype = c_result_p
-def sg_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_diag_16.restype = c_result_p
-def sg_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_diag_8.restype = c_result_p
-def sg_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_diag_sat.restype = c_result_p
-def sg_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_scan_64.argtypes = _argtypes
-_lib.parasail_sw_scan_64.restype = c_result_p
-def sw_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_scan_32.argtypes = _argtypes
-_lib.parasail_sw_scan_32.restype = c_result_p
-def sw_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_scan_16.argtypes = _argtypes
-_lib.parasail_sw_scan_16.restype = c_result_p
-def sw_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_scan_8.argtypes = _argtypes
-_lib.parasail_sw_scan_8.restype = c_result_p
-def sw_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_scan_sat.argtypes = _argtypes
-_lib.parasail_sw_scan_sat.restype = c_result_p
-def sw_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_striped_64.argtypes = _argtypes
-_lib.parasail_sw_striped_64.restype = c_result_p
-def sw_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_striped_32.argtypes = _argtypes
-_lib.parasail_sw_striped_32.restype = c_result_p
-def sw_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_striped_16.argtypes = _argtypes
-_lib.parasail_sw_striped_16.restype = c_result_p
-def sw_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_striped_8.argtypes = _argtypes
-_lib.parasail_sw_striped_8.restype = c_result_p
-def sw_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_striped_sat.argtypes = _argtypes
-_lib.parasail_sw_striped_sat.restype = c_result_p
-def sw_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_diag_64.argtypes = _argtypes
-_lib.parasail_sw_diag_64.restype = c_result_p
-def sw_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_diag_32.argtypes = _argtypes
-_lib.parasail_sw_diag_32.restype = c_result_p
-def sw_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_diag_16.argtypes = _argtypes
-_lib.parasail_sw_diag_16.restype = c_result_p
-def sw_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_diag_8.argtypes = _argtypes
-_lib.parasail_sw_diag_8.restype = c_result_p
-def sw_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_diag_sat.argtypes = _argtypes
-_lib.parasail_sw_diag_sat.restype = c_result_p
-def sw_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_scan_64.argtypes = _argtypes
-_lib.parasail_sw_table_scan_64.restype = c_result_p
-def sw_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_scan_32.argtypes = _argtypes
-_lib.parasail_sw_table_scan_32.restype = c_result_p
-def sw_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_scan_16.argtypes = _argtypes
-_lib.parasail_sw_table_scan_16.restype = c_result_p
-def sw_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_scan_8.argtypes = _argtypes
-_lib.parasail_sw_table_scan_8.restype = c_result_p
-def sw_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sw_table_scan_sat.restype = c_result_p
-def sw_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_striped_64.argtypes = _argtypes
-_lib.parasail_sw_table_striped_64.restype = c_result_p
-def sw_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_striped_32.argtypes = _argtypes
-_lib.parasail_sw_table_striped_32.restype = c_result_p
-def sw_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_striped_16.argtypes = _argtypes
-_lib.parasail_sw_table_striped_16.restype = c_result_p
-def sw_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_striped_8.argtypes = _argtypes
-_lib.parasail_sw_table_striped_8.restype = c_result_p
-def sw_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sw_table_striped_sat.restype = c_result_p
-def sw_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_diag_64.argtypes = _argtypes
-_lib.parasail_sw_table_diag_64.restype = c_result_p
-def sw_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_diag_32.argtypes = _argtypes
-_lib.parasail_sw_table_diag_32.restype = c_result_p
-def sw_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_diag_16.argtypes = _argtypes
-_lib.parasail_sw_table_diag_16.restype = c_result_p
-def sw_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_diag_8.argtypes = _argtypes
-_lib.parasail_sw_table_diag_8.restype = c_result_p
-def sw_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sw_table_diag_sat.restype = c_result_p
-def sw_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_64.restype = c_result_p
-def sw_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_32.restype = c_result_p
-def sw_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_16.restype = c_result_p
-def sw_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_8.restype = c_result_p
-def sw_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_sat.restype = c_result_p
-def sw_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_64.restype = c_result_p
-def sw_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_32.restype = c_result_p
-def sw_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_16.restype = c_result_p
-def sw_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_8.restype = c_result_p
-def sw_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_sat.restype = c_result_p
-def sw_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sw_rowcol_diag_64.restype = c_result_p
-def sw_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sw_rowcol_diag_32.restype = c_result_p
-def sw_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sw_rowcol_diag_16.restype = c_result_p
-def sw_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sw_rowcol_diag_8.restype = c_result_p
-def sw_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sw_rowcol_diag_sat.restype = c_result_p
-def sw_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_64.restype = c_result_p
-def sw_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_32.restype = c_result_p
-def sw_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_16.restype = c_result_p
-def sw_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_8.restype = c_result_p
-def sw_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_sat.restype = c_result_p
-def sw_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_64.restype = c_result_p
-def sw_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_32.restype = c_result_p
-def sw_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_16.restype = c_result_p
-def sw_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_8.restype = c_result_p
-def sw_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_sat.restype = c_result_p
-def sw_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sw_trace_diag_64.restype = c_result_p
-def sw_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sw_trace_diag_32.restype = c_result_p
-def sw_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sw_trace_diag_16.restype = c_result_p
-def sw_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sw_trace_diag_8.restype = c_result_p
-def sw_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sw_trace_diag_sat.restype = c_result_p
-def sw_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sw_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_64.restype = c_result_p
-def sw_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_32.restype = c_result_p
-def sw_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_16.restype = c_result_p
-def sw_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_8.restype = c_result_p
-def sw_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_sat.restype = c_result_p
-def sw_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_64.restype = c_result_p
-def sw_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_32.restype = c_result_p
-def sw_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_16.restype = c_result_p
-def sw_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_8.restype = c_result_p
-def sw_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_sat.restype = c_result_p
-def sw_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sw_stats_diag_64.restype = c_result_p
-def sw_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sw_stats_diag_32.restype = c_result_p
-def sw_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sw_stats_diag_16.restype = c_result_p
-def sw_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sw_stats_diag_8.restype = c_result_p
-def sw_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_diag_sat.restype = c_result_p
-def sw_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_64.restype = c_result_p
-def sw_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_32.restype = c_result_p
-def sw_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_16.restype = c_result_p
-def sw_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_8.restype = c_result_p
-def sw_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_sat.restype = c_result_p
-def sw_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_64.restype = c_result_p
-def sw_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_32.restype = c_result_p
-def sw_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_16.restype = c_result_p
-def sw_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_8.restype = c_result_p
-def sw_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_sat.restype = c_result_p
-def sw_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sw_stats_table_diag_64.restype = c_result_p
-def sw_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sw_stats_table_diag_32.restype = c_result_p
-def sw_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sw_stats_table_diag_16.restype = c_result_p
-def sw_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sw_stats_table_diag_8.restype = c_result_p
-def sw_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_table_diag_sat.restype = c_result_p
-def sw_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_64.restype = c_result_p
-def sw_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_32.restype = c_result_p
-def sw_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_16.restype = c_result_p
-def sw_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_8.restype = c_result_p
-def sw_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_sat.restype = c_result_p
-def sw_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_64.restype = c_result_p
-def sw_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_32.restype = c_result_p
-def sw_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_16.restype = c_result_p
-def sw_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_8.restype = c_result_p
-def sw_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_sat.restype = c_result_p
-def sw_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_diag_64.restype = c_result_p
-def sw_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_diag_32.restype = c_result_p
-def sw_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_diag_16.restype = c_result_p
-def sw_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_diag_8.restype = c_result_p
-def sw_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_diag_sat.restype = c_result_p
-def sw_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sw_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_64.restype = c_result_p
-def sg_qb_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_32.restype = c_result_p
-def sg_qb_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_16.restype = c_result_p
-def sg_qb_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_8.restype = c_result_p
-def sg_qb_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_sat.restype = c_result_p
-def sg_qb_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_64.restype = c_result_p
-def sg_qb_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_32.restype = c_result_p
-def sg_qb_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_16.restype = c_result_p
-def sg_qb_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_8.restype = c_result_p
-def sg_qb_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_sat.restype = c_result_p
-def sg_qb_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_diag_64.restype = c_result_p
-def sg_qb_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_diag_32.restype = c_result_p
-def sg_qb_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_diag_16.restype = c_result_p
-def sg_qb_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_diag_8.restype = c_result_p
-def sg_qb_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_diag_sat.restype = c_result_p
-def sg_qb_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_64.restype = c_result_p
-def sg_qb_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_32.restype = c_result_p
-def sg_qb_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_16.restype = c_result_p
-def sg_qb_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_8.restype = c_result_p
-def sg_qb_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_sat.restype = c_result_p
-def sg_qb_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_64.restype = c_result_p
-def sg_qb_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_32.restype = c_result_p
-def sg_qb_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_16.restype = c_result_p
-def sg_qb_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_8.restype = c_result_p
-def sg_qb_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_sat.restype = c_result_p
-def sg_qb_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_table_diag_64.restype = c_result_p
-def sg_qb_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_table_diag_32.restype = c_result_p
-def sg_qb_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_table_diag_16.restype = c_result_p
-def sg_qb_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_table_diag_8.restype = c_result_p
-def sg_qb_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_table_diag_sat.restype = c_result_p
-def sg_qb_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_64.restype = c_result_p
-def sg_qb_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_32.restype = c_result_p
-def sg_qb_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_16.restype = c_result_p
-def sg_qb_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_8.restype = c_result_p
-def sg_qb_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_sat.restype = c_result_p
-def sg_qb_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_64.restype = c_result_p
-def sg_qb_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_32.restype = c_result_p
-def sg_qb_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_16.restype = c_result_p
-def sg_qb_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_8.restype = c_result_p
-def sg_qb_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_sat.restype = c_result_p
-def sg_qb_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_diag_64.restype = c_result_p
-def sg_qb_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_diag_32.restype = c_result_p
-def sg_qb_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_diag_16.restype = c_result_p
-def sg_qb_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_diag_8.restype = c_result_p
-def sg_qb_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_diag_sat.restype = c_result_p
-def sg_qb_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_64.restype = c_result_p
-def sg_qb_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_32.restype = c_result_p
-def sg_qb_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_16.restype = c_result_p
-def sg_qb_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_8.restype = c_result_p
-def sg_qb_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_sat.restype = c_result_p
-def sg_qb_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_64.restype = c_result_p
-def sg_qb_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_32.restype = c_result_p
-def sg_qb_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_16.restype = c_result_p
-def sg_qb_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_8.restype = c_result_p
-def sg_qb_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_sat.restype = c_result_p
-def sg_qb_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_diag_64.restype = c_result_p
-def sg_qb_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_diag_32.restype = c_result_p
-def sg_qb_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_diag_16.restype = c_result_p
-def sg_qb_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_diag_8.restype = c_result_p
-def sg_qb_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_diag_sat.restype = c_result_p
-def sg_qb_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_64.restype = c_result_p
-def sg_qb_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_32.restype = c_result_p
-def sg_qb_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_16.restype = c_result_p
-def sg_qb_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_8.restype = c_result_p
-def sg_qb_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_sat.restype = c_result_p
-def sg_qb_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_64.restype = c_result_p
-def sg_qb_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_32.restype = c_result_p
-def sg_qb_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_16.restype = c_result_p
-def sg_qb_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_8.restype = c_result_p
-def sg_qb_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_sat.restype = c_result_p
-def sg_qb_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_diag_64.restype = c_result_p
-def sg_qb_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_diag_32.restype = c_result_p
-def sg_qb_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_diag_16.restype = c_result_p
-def sg_qb_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_diag_8.restype = c_result_p
-def sg_qb_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_diag_sat.restype = c_result_p
-def sg_qb_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_64.restype = c_result_p
-def sg_qb_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_32.restype = c_result_p
-def sg_qb_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_16.restype = c_result_p
-def sg_qb_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_8.restype = c_result_p
-def sg_qb_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_sat.restype = c_result_p
-def sg_qb_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_64.restype = c_result_p
-def sg_qb_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_32.restype = c_result_p
-def sg_qb_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_16.restype = c_result_p
-def sg_qb_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_8.restype = c_result_p
-def sg_qb_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_sat.restype = c_result_p
-def sg_qb_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_diag_64.restype = c_result_p
-def sg_qb_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_diag_32.restype = c_result_p
-def sg_qb_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_diag_16.restype = c_result_p
-def sg_qb_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_diag_8.restype = c_result_p
-def sg_qb_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_diag_sat.restype = c_result_p
-def sg_qb_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_64.restype = c_result_p
-def sg_qb_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_32.restype = c_result_p
-def sg_qb_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_16.restype = c_result_p
-def sg_qb_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_8.restype = c_result_p
-def sg_qb_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_sat.restype = c_result_p
-def sg_qb_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_64.restype = c_result_p
-def sg_qb_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_32.restype = c_result_p
-def sg_qb_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_16.restype = c_result_p
-def sg_qb_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_8.restype = c_result_p
-def sg_qb_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_sat.restype = c_result_p
-def sg_qb_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_diag_64.restype = c_result_p
-def sg_qb_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_diag_32.restype = c_result_p
-def sg_qb_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_diag_16.restype = c_result_p
-def sg_qb_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_diag_8.restype = c_result_p
-def sg_qb_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_diag_sat.restype = c_result_p
-def sg_qb_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_64.restype = c_result_p
-def sg_qe_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_32.restype = c_result_p
-def sg_qe_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_16.restype = c_result_p
-def sg_qe_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_8.restype = c_result_p
-def sg_qe_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_sat.restype = c_result_p
-def sg_qe_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_64.restype = c_result_p
-def sg_qe_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_32.restype = c_result_p
-def sg_qe_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_16.restype = c_result_p
-def sg_qe_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_8.restype = c_result_p
-def sg_qe_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_sat.restype = c_result_p
-def sg_qe_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_diag_64.restype = c_result_p
-def sg_qe_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_diag_32.restype = c_result_p
-def sg_qe_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_diag_16.restype = c_result_p
-def sg_qe_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_diag_8.restype = c_result_p
-def sg_qe_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_diag_sat.restype = c_result_p
-def sg_qe_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_64.restype = c_result_p
-def sg_qe_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_32.restype = c_result_p
-def sg_qe_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_16.restype = c_result_p
-def sg_qe_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_8.restype = c_result_p
-def sg_qe_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_sat.restype = c_result_p
-def sg_qe_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_64.restype = c_result_p
-def sg_qe_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_32.restype = c_result_p
-def sg_qe_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_16.restype = c_result_p
-def sg_qe_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_8.restype = c_result_p
-def sg_qe_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_sat.restype = c_result_p
-def sg_qe_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_table_diag_64.restype = c_result_p
-def sg_qe_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_table_diag_32.restype = c_result_p
-def sg_qe_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_table_diag_16.restype = c_result_p
-def sg_qe_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_table_diag_8.restype = c_result_p
-def sg_qe_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_table_diag_sat.restype = c_result_p
-def sg_qe_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_64.restype = c_result_p
-def sg_qe_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_32.restype = c_result_p
-def sg_qe_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_16.restype = c_result_p
-def sg_qe_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_8.restype = c_result_p
-def sg_qe_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_sat.restype = c_result_p
-def sg_qe_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_64.restype = c_result_p
-def sg_qe_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_32.restype = c_result_p
-def sg_qe_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_16.restype = c_result_p
-def sg_qe_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_8.restype = c_result_p
-def sg_qe_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_sat.restype = c_result_p
-def sg_qe_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_diag_64.restype = c_result_p
-def sg_qe_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_diag_32.restype = c_result_p
-def sg_qe_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_diag_16.restype = c_result_p
-def sg_qe_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_diag_8.restype = c_result_p
-def sg_qe_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_diag_sat.restype = c_result_p
-def sg_qe_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_64.restype = c_result_p
-def sg_qe_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_32.restype = c_result_p
-def sg_qe_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_16.restype = c_result_p
-def sg_qe_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_8.restype = c_result_p
-def sg_qe_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_sat.restype = c_result_p
-def sg_qe_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_64.restype = c_result_p
-def sg_qe_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_32.restype = c_result_p
-def sg_qe_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_16.restype = c_result_p
-def sg_qe_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_8.restype = c_result_p
-def sg_qe_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_sat.restype = c_result_p
-def sg_qe_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_diag_64.restype = c_result_p
-def sg_qe_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_diag_32.restype = c_result_p
-def sg_qe_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_diag_16.restype = c_result_p
-def sg_qe_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_diag_8.restype = c_result_p
-def sg_qe_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_diag_sat.restype = c_result_p
-def sg_qe_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_64.restype = c_result_p
-def sg_qe_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_32.restype = c_result_p
-def sg_qe_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_16.restype = c_result_p
-def sg_qe_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_8.restype = c_result_p
-def sg_qe_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_sat.restype = c_result_p
-def sg_qe_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_64.restype = c_result_p
-def sg_qe_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_32.restype = c_result_p
-def sg_qe_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_16.restype = c_result_p
-def sg_qe_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_8.restype = c_result_p
-def sg_qe_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_sat.restype = c_result_p
-def sg_qe_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_diag_64.restype = c_result_p
-def sg_qe_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_diag_32.restype = c_result_p
-def sg_qe_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_diag_16.restype = c_result_p
-def sg_qe_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_diag_8.restype = c_result_p
-def sg_qe_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_diag_sat.restype = c_result_p
-def sg_qe_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_64.restype = c_result_p
-def sg_qe_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_32.restype = c_result_p
-def sg_qe_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_16.restype = c_result_p
-def sg_qe_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_8.restype = c_result_p
-def sg_qe_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_sat.restype = c_result_p
-def sg_qe_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_64.restype = c_result_p
-def sg_qe_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_32.restype = c_result_p
-def sg_qe_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_16.restype = c_result_p
-def sg_qe_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_8.restype = c_result_p
-def sg_qe_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_sat.restype = c_result_p
-def sg_qe_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_diag_64.restype = c_result_p
-def sg_qe_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_diag_32.restype = c_result_p
-def sg_qe_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_diag_16.restype = c_result_p
-def sg_qe_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_diag_8.restype = c_result_p
-def sg_qe_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_diag_sat.restype = c_result_p
-def sg_qe_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_64.restype = c_result_p
-def sg_qe_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_32.restype = c_result_p
-def sg_qe_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_16.restype = c_result_p
-def sg_qe_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_8.restype = c_result_p
-def sg_qe_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_sat.restype = c_result_p
-def sg_qe_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_64.restype = c_result_p
-def sg_qe_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_32.restype = c_result_p
-def sg_qe_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_16.restype = c_result_p
-def sg_qe_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_8.restype = c_result_p
-def sg_qe_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_sat.restype = c_result_p
-def sg_qe_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_diag_64.restype = c_result_p
-def sg_qe_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_diag_32.restype = c_result_p
-def sg_qe_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_diag_16.restype = c_result_p
-def sg_qe_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_diag_8.restype = c_result_p
-def sg_qe_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_diag_sat.restype = c_result_p
-def sg_qe_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_64.restype = c_result_p
-def sg_qx_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_32.restype = c_result_p
-def sg_qx_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_16.restype = c_result_p
-def sg_qx_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_8.restype = c_result_p
-def sg_qx_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_sat.restype = c_result_p
-def sg_qx_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_64.restype = c_result_p
-def sg_qx_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_32.restype = c_result_p
-def sg_qx_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_16.restype = c_result_p
-def sg_qx_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_8.restype = c_result_p
-def sg_qx_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_sat.restype = c_result_p
-def sg_qx_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qx_diag_64.restype = c_result_p
-def sg_qx_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qx_diag_32.restype = c_result_p
-def sg_qx_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qx_diag_16.restype = c_result_p
-def sg_qx_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qx_diag_8.restype = c_result_p
-def sg_qx_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_diag_sat.restype = c_result_p
-def sg_qx_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_64.restype = c_result_p
-def sg_qx_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_32.restype = c_result_p
-def sg_qx_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_16.restype = c_result_p
-def sg_qx_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_8.restype = c_result_p
-def sg_qx_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_sat.restype = c_result_p
-def sg_qx_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_64.restype = c_result_p
-def sg_qx_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_32.restype = c_result_p
-def sg_qx_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_16.restype = c_result_p
-def sg_qx_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_8.restype = c_result_p
-def sg_qx_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_sat.restype = c_result_p
-def sg_qx_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qx_table_diag_64.restype = c_result_p
-def sg_qx_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qx_table_diag_32.restype = c_result_p
-def sg_qx_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qx_table_diag_16.restype = c_result_p
-def sg_qx_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qx_table_diag_8.restype = c_result_p
-def sg_qx_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_table_diag_sat.restype = c_result_p
-def sg_qx_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_64.restype = c_result_p
-def sg_qx_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_32.restype = c_result_p
-def sg_qx_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_16.restype = c_result_p
-def sg_qx_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_8.restype = c_result_p
-def sg_qx_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_sat.restype = c_result_p
-def sg_qx_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_64.restype = c_result_p
-def sg_qx_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_32.restype = c_result_p
-def sg_qx_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_16.restype = c_result_p
-def sg_qx_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_8.restype = c_result_p
-def sg_qx_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_sat.restype = c_result_p
-def sg_qx_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_diag_64.restype = c_result_p
-def sg_qx_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_diag_32.restype = c_result_p
-def sg_qx_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_diag_16.restype = c_result_p
-def sg_qx_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_diag_8.restype = c_result_p
-def sg_qx_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_diag_sat.restype = c_result_p
-def sg_qx_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_64.restype = c_result_p
-def sg_qx_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_32.restype = c_result_p
-def sg_qx_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_16.restype = c_result_p
-def sg_qx_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_8.restype = c_result_p
-def sg_qx_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_sat.restype = c_result_p
-def sg_qx_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_64.restype = c_result_p
-def sg_qx_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_32.restype = c_result_p
-def sg_qx_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_16.restype = c_result_p
-def sg_qx_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_8.restype = c_result_p
-def sg_qx_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_sat.restype = c_result_p
-def sg_qx_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_diag_64.restype = c_result_p
-def sg_qx_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_diag_32.restype = c_result_p
-def sg_qx_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_diag_16.restype = c_result_p
-def sg_qx_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_diag_8.restype = c_result_p
-def sg_qx_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_diag_sat.restype = c_result_p
-def sg_qx_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qx_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_64.restype = c_result_p
-def sg_qx_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_32.restype = c_result_p
-def sg_qx_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_16.restype = c_result_p
-def sg_qx_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_8.restype = c_result_p
-def sg_qx_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_sat.restype = c_result_p
-def sg_qx_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_64.restype = c_result_p
-def sg_qx_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_32.restype = c_result_p
-def sg_qx_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_16.restype = c_result_p
-def sg_qx_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_8.restype = c_result_p
-def sg_qx_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_sat.restype = c_result_p
-def sg_qx_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_diag_64.restype = c_result_p
-def sg_qx_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_diag_32.restype = c_result_p
-def sg_qx_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_diag_16.restype = c_result_p
-def sg_qx_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_diag_8.restype = c_result_p
-def sg_qx_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_diag_sat.restype = c_result_p
-def sg_qx_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_64.restype = c_result_p
-def sg_qx_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_32.restype = c_result_p
-def sg_qx_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_16.restype = c_result_p
-def sg_qx_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_8.restype = c_result_p
-def sg_qx_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_sat.restype = c_result_p
-def sg_qx_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_64.restype = c_result_p
-def sg_qx_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_32.restype = c_result_p
-def sg_qx_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_16.restype = c_result_p
-def sg_qx_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_8.restype = c_result_p
-def sg_qx_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_sat.restype = c_result_p
-def sg_qx_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_diag_64.restype = c_result_p
-def sg_qx_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_diag_32.restype = c_result_p
-def sg_qx_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_diag_16.restype = c_result_p
-def sg_qx_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_diag_8.restype = c_result_p
-def sg_qx_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_diag_sat.restype = c_result_p
-def sg_qx_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_64.restype = c_result_p
-def sg_qx_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_32.restype = c_result_p
-def sg_qx_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_16.restype = c_result_p
-def sg_qx_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_8.restype = c_result_p
-def sg_qx_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_sat.restype = c_result_p
-def sg_qx_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_64.restype = c_result_p
-def sg_qx_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_32.restype = c_result_p
-def sg_qx_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_16.restype = c_result_p
-def sg_qx_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_8.restype = c_result_p
-def sg_qx_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_sat.restype = c_result_p
-def sg_qx_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_diag_64.restype = c_result_p
-def sg_qx_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_diag_32.restype = c_result_p
-def sg_qx_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_diag_16.restype = c_result_p
-def sg_qx_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_diag_8.restype = c_result_p
-def sg_qx_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_diag_sat.restype = c_result_p
-def sg_qx_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_scan_64.argtypes = _argtypes
-_lib.parasail_sg_db_scan_64.restype = c_result_p
-def sg_db_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_scan_32.argtypes = _argtypes
-_lib.parasail_sg_db_scan_32.restype = c_result_p
-def sg_db_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_scan_16.argtypes = _argtypes
-_lib.parasail_sg_db_scan_16.restype = c_result_p
-def sg_db_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_scan_8.argtypes = _argtypes
-_lib.parasail_sg_db_scan_8.restype = c_result_p
-def sg_db_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_db_scan_sat.restype = c_result_p
-def sg_db_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_striped_64.argtypes = _argtypes
-_lib.parasail_sg_db_striped_64.restype = c_result_p
-def sg_db_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_striped_32.argtypes = _argtypes
-_lib.parasail_sg_db_striped_32.restype = c_result_p
-def sg_db_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_striped_16.argtypes = _argtypes
-_lib.parasail_sg_db_striped_16.restype = c_result_p
-def sg_db_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_striped_8.argtypes = _argtypes
-_lib.parasail_sg_db_striped_8.restype = c_result_p
-def sg_db_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_db_striped_sat.restype = c_result_p
-def sg_db_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_diag_64.argtypes = _argtypes
-_lib.parasail_sg_db_diag_64.restype = c_result_p
-def sg_db_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_diag_32.argtypes = _argtypes
-_lib.parasail_sg_db_diag_32.restype = c_result_p
-def sg_db_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_diag_16.argtypes = _argtypes
-_lib.parasail_sg_db_diag_16.restype = c_result_p
-def sg_db_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_diag_8.argtypes = _argtypes
-_lib.parasail_sg_db_diag_8.restype = c_result_p
-def sg_db_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_db_diag_sat.restype = c_result_p
-def sg_db_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_64.restype = c_result_p
-def sg_db_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_32.restype = c_result_p
-def sg_db_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_16.restype = c_result_p
-def sg_db_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_8.restype = c_result_p
-def sg_db_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_sat.restype = c_result_p
-def sg_db_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_64.restype = c_result_p
-def sg_db_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_32.restype = c_result_p
-def sg_db_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_16.restype = c_result_p
-def sg_db_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_8.restype = c_result_p
-def sg_db_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_sat.restype = c_result_p
-def sg_db_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_db_table_diag_64.restype = c_result_p
-def sg_db_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_db_table_diag_32.restype = c_result_p
-def sg_db_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_db_table_diag_16.restype = c_result_p
-def sg_db_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_db_table_diag_8.restype = c_result_p
-def sg_db_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_db_table_diag_sat.restype = c_result_p
-def sg_db_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_64.restype = c_result_p
-def sg_db_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_32.restype = c_result_p
-def sg_db_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_16.restype = c_result_p
-def sg_db_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_8.restype = c_result_p
-def sg_db_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_sat.restype = c_result_p
-def sg_db_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_64.restype = c_result_p
-def sg_db_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_32.restype = c_result_p
-def sg_db_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_16.restype = c_result_p
-def sg_db_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_8.restype = c_result_p
-def sg_db_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_sat.restype = c_result_p
-def sg_db_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_diag_64.restype = c_result_p
-def sg_db_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_diag_32.restype = c_result_p
-def sg_db_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_diag_16.restype = c_result_p
-def sg_db_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_diag_8.restype = c_result_p
-def sg_db_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_diag_sat.restype = c_result_p
-def sg_db_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_64.restype = c_result_p
-def sg_db_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_32.restype = c_result_p
-def sg_db_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_16.restype = c_result_p
-def sg_db_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_8.restype = c_result_p
-def sg_db_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_sat.restype = c_result_p
-def sg_db_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_64.restype = c_result_p
-def sg_db_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_32.restype = c_result_p
-def sg_db_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_16.restype = c_result_p
-def sg_db_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_8.restype = c_result_p
-def sg_db_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_sat.restype = c_result_p
-def sg_db_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_db_trace_diag_64.restype = c_result_p
-def sg_db_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_db_trace_diag_32.restype = c_result_p
-def sg_db_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_db_trace_diag_16.restype = c_result_p
-def sg_db_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_db_trace_diag_8.restype = c_result_p
-def sg_db_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_db_trace_diag_sat.restype = c_result_p
-def sg_db_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_db_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_64.restype = c_result_p
-def sg_db_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_32.restype = c_result_p
-def sg_db_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_16.restype = c_result_p
-def sg_db_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_8.restype = c_result_p
-def sg_db_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_sat.restype = c_result_p
-def sg_db_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_64.restype = c_result_p
-def sg_db_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_32.restype = c_result_p
-def sg_db_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_16.restype = c_result_p
-def sg_db_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_8.restype = c_result_p
-def sg_db_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_sat.restype = c_result_p
-def sg_db_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_diag_64.restype = c_result_p
-def sg_db_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_diag_32.restype = c_result_p
-def sg_db_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_diag_16.restype = c_result_p
-def sg_db_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_diag_8.restype = c_result_p
-def sg_db_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_diag_sat.restype = c_result_p
-def sg_db_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_64.restype = c_result_p
-def sg_db_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_32.restype = c_result_p
-def sg_db_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_16.restype = c_result_p
-def sg_db_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_8.restype = c_result_p
-def sg_db_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_sat.restype = c_result_p
-def sg_db_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_64.restype = c_result_p
-def sg_db_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_32.restype = c_result_p
-def sg_db_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_16.restype = c_result_p
-def sg_db_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_8.restype = c_result_p
-def sg_db_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_sat.restype = c_result_p
-def sg_db_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_diag_64.restype = c_result_p
-def sg_db_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_diag_32.restype = c_result_p
-def sg_db_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_diag_16.restype = c_result_p
-def sg_db_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_diag_8.restype = c_result_p
-def sg_db_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_diag_sat.restype = c_result_p
-def sg_db_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_64.restype = c_result_p
-def sg_db_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_32.restype = c_result_p
-def sg_db_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_16.restype = c_result_p
-def sg_db_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_8.restype = c_result_p
-def sg_db_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_sat.restype = c_result_p
-def sg_db_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_64.restype = c_result_p
-def sg_db_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_32.restype = c_result_p
-def sg_db_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_16.restype = c_result_p
-def sg_db_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_8.restype = c_result_p
-def sg_db_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_sat.restype = c_result_p
-def sg_db_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_diag_64.restype = c_result_p
-def sg_db_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_diag_32.restype = c_result_p
-def sg_db_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_diag_16.restype = c_result_p
-def sg_db_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_diag_8.restype = c_result_p
-def sg_db_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_diag_sat.restype = c_result_p
-def sg_db_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_db_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_scan_64.argtypes = _argtypes
-_lib.parasail_sg_de_scan_64.restype = c_result_p
-def sg_de_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_scan_32.argtypes = _argtypes
-_lib.parasail_sg_de_scan_32.restype = c_result_p
-def sg_de_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_scan_16.argtypes = _argtypes
-_lib.parasail_sg_de_scan_16.restype = c_result_p
-def sg_de_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_scan_8.argtypes = _argtypes
-_lib.parasail_sg_de_scan_8.restype = c_result_p
-def sg_de_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_de_scan_sat.restype = c_result_p
-def sg_de_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_striped_64.argtypes = _argtypes
-_lib.parasail_sg_de_striped_64.restype = c_result_p
-def sg_de_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_striped_32.argtypes = _argtypes
-_lib.parasail_sg_de_striped_32.restype = c_result_p
-def sg_de_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_striped_16.argtypes = _argtypes
-_lib.parasail_sg_de_striped_16.restype = c_result_p
-def sg_de_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_striped_8.argtypes = _argtypes
-_lib.parasail_sg_de_striped_8.restype = c_result_p
-def sg_de_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_de_striped_sat.restype = c_result_p
-def sg_de_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_diag_64.argtypes = _argtypes
-_lib.parasail_sg_de_diag_64.restype = c_result_p
-def sg_de_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_diag_32.argtypes = _argtypes
-_lib.parasail_sg_de_diag_32.restype = c_result_p
-def sg_de_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_diag_16.argtypes = _argtypes
-_lib.parasail_sg_de_diag_16.restype = c_result_p
-def sg_de_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_diag_8.argtypes = _argtypes
-_lib.parasail_sg_de_diag_8.restype = c_result_p
-def sg_de_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_de_diag_sat.restype = c_result_p
-def sg_de_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_64.restype = c_result_p
-def sg_de_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_32.restype = c_result_p
-def sg_de_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_16.restype = c_result_p
-def sg_de_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_8.restype = c_result_p
-def sg_de_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_sat.restype = c_result_p
-def sg_de_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_64.restype = c_result_p
-def sg_de_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_32.restype = c_result_p
-def sg_de_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_16.restype = c_result_p
-def sg_de_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_8.restype = c_result_p
-def sg_de_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_sat.restype = c_result_p
-def sg_de_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_de_table_diag_64.restype = c_result_p
-def sg_de_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_de_table_diag_32.restype = c_result_p
-def sg_de_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_de_table_diag_16.restype = c_result_p
-def sg_de_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_de_table_diag_8.restype = c_result_p
-def sg_de_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_de_table_diag_sat.restype = c_result_p
-def sg_de_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_64.restype = c_result_p
-def sg_de_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_32.restype = c_result_p
-def sg_de_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_16.restype = c_result_p
-def sg_de_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_8.restype = c_result_p
-def sg_de_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_sat.restype = c_result_p
-def sg_de_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_64.restype = c_result_p
-def sg_de_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_32.restype = c_result_p
-def sg_de_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_16.restype = c_result_p
-def sg_de_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_8.restype = c_result_p
-def sg_de_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_sat.restype = c_result_p
-def sg_de_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_diag_64.restype = c_result_p
-def sg_de_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_diag_32.restype = c_result_p
-def sg_de_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_diag_16.restype = c_result_p
-def sg_de_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_diag_8.restype = c_result_p
-def sg_de_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_diag_sat.restype = c_result_p
-def sg_de_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_64.restype = c_result_p
-def sg_de_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_32.restype = c_result_p
-def sg_de_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_16.restype = c_result_p
-def sg_de_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_8.restype = c_result_p
-def sg_de_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_sat.restype = c_result_p
-def sg_de_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_64.restype = c_result_p
-def sg_de_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_32.restype = c_result_p
-def sg_de_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_16.restype = c_result_p
-def sg_de_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_8.restype = c_result_p
-def sg_de_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_sat.restype = c_result_p
-def sg_de_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_de_trace_diag_64.restype = c_result_p
-def sg_de_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_de_trace_diag_32.restype = c_result_p
-def sg_de_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_de_trace_diag_16.restype = c_result_p
-def sg_de_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_de_trace_diag_8.restype = c_result_p
-def sg_de_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_de_trace_diag_sat.restype = c_result_p
-def sg_de_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_de_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_64.restype = c_result_p
-def sg_de_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_32.restype = c_result_p
-def sg_de_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_16.restype = c_result_p
-def sg_de_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_8.restype = c_result_p
-def sg_de_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_sat.restype = c_result_p
-def sg_de_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_64.restype = c_result_p
-def sg_de_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_32.restype = c_result_p
-def sg_de_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_16.restype = c_result_p
-def sg_de_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_8.restype = c_result_p
-def sg_de_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_sat.restype = c_result_p
-def sg_de_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_diag_64.restype = c_result_p
-def sg_de_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_diag_32.restype = c_result_p
-def sg_de_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_diag_16.restype = c_result_p
-def sg_de_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_diag_8.restype = c_result_p
-def sg_de_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_diag_sat.restype = c_result_p
-def sg_de_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_64.restype = c_result_p
-def sg_de_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_32.restype = c_result_p
-def sg_de_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_16.restype = c_result_p
-def sg_de_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_8.restype = c_result_p
-def sg_de_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_sat.restype = c_result_p
-def sg_de_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_64.restype = c_result_p
-def sg_de_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_32.restype = c_result_p
-def sg_de_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_16.restype = c_result_p
-def sg_de_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_8.restype = c_result_p
-def sg_de_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_sat.restype = c_result_p
-def sg_de_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_diag_64.restype = c_result_p
-def sg_de_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_diag_32.restype = c_result_p
-def sg_de_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_diag_16.restype = c_result_p
-def sg_de_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_diag_8.restype = c_result_p
-def sg_de_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_diag_sat.restype = c_result_p
-def sg_de_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_64.restype = c_result_p
-def sg_de_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_32.restype = c_result_p
-def sg_de_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_16.restype = c_result_p
-def sg_de_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_8.restype = c_result_p
-def sg_de_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_sat.restype = c_result_p
-def sg_de_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_64.restype = c_result_p
-def sg_de_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_32.restype = c_result_p
-def sg_de_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_16.restype = c_result_p
-def sg_de_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_8.restype = c_result_p
-def sg_de_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_sat.restype = c_result_p
-def sg_de_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_diag_64.restype = c_result_p
-def sg_de_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_diag_32.restype = c_result_p
-def sg_de_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_diag_16.restype = c_result_p
-def sg_de_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_diag_8.restype = c_result_p
-def sg_de_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_diag_sat.restype = c_result_p
-def sg_de_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_de_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_scan_64.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_64.restype = c_result_p
-def sg_dx_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_scan_32.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_32.restype = c_result_p
-def sg_dx_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_scan_16.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_16.restype = c_result_p
-def sg_dx_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_scan_8.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_8.restype = c_result_p
-def sg_dx_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_sat.restype = c_result_p
-def sg_dx_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_striped_64.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_64.restype = c_result_p
-def sg_dx_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_striped_32.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_32.restype = c_result_p
-def sg_dx_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_striped_16.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_16.restype = c_result_p
-def sg_dx_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_striped_8.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_8.restype = c_result_p
-def sg_dx_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_sat.restype = c_result_p
-def sg_dx_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_diag_64.argtypes = _argtypes
-_lib.parasail_sg_dx_diag_64.restype = c_result_p
-def sg_dx_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_diag_32.argtypes = _argtypes
-_lib.parasail_sg_dx_diag_32.restype = c_result_p
-def sg_dx_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_diag_16.argtypes = _argtypes
-_lib.parasail_sg_dx_diag_16.restype = c_result_p
-def sg_dx_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_diag_8.argtypes = _argtypes
-_lib.parasail_sg_dx_diag_8.restype = c_result_p
-def sg_dx_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_diag_sat.restype = c_result_p
-def sg_dx_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_64.restype = c_result_p
-def sg_dx_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_32.restype = c_result_p
-def sg_dx_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_16.restype = c_result_p
-def sg_dx_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_8.restype = c_result_p
-def sg_dx_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_sat.restype = c_result_p
-def sg_dx_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_64.restype = c_result_p
-def sg_dx_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_32.restype = c_result_p
-def sg_dx_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_16.restype = c_result_p
-def sg_dx_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_8.restype = c_result_p
-def sg_dx_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_sat.restype = c_result_p
-def sg_dx_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_dx_table_diag_64.restype = c_result_p
-def sg_dx_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_dx_table_diag_32.restype = c_result_p
-def sg_dx_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_dx_table_diag_16.restype = c_result_p
-def sg_dx_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_dx_table_diag_8.restype = c_result_p
-def sg_dx_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_table_diag_sat.restype = c_result_p
-def sg_dx_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_64.restype = c_result_p
-def sg_dx_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_32.restype = c_result_p
-def sg_dx_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_16.restype = c_result_p
-def sg_dx_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_8.restype = c_result_p
-def sg_dx_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_sat.restype = c_result_p
-def sg_dx_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_64.restype = c_result_p
-def sg_dx_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_32.restype = c_result_p
-def sg_dx_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_16.restype = c_result_p
-def sg_dx_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_8.restype = c_result_p
-def sg_dx_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_sat.restype = c_result_p
-def sg_dx_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_diag_64.restype = c_result_p
-def sg_dx_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_diag_32.restype = c_result_p
-def sg_dx_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_diag_16.restype = c_result_p
-def sg_dx_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_diag_8.restype = c_result_p
-def sg_dx_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_diag_sat.restype = c_result_p
-def sg_dx_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_64.restype = c_result_p
-def sg_dx_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_32.restype = c_result_p
-def sg_dx_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_16.restype = c_result_p
-def sg_dx_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_8.restype = c_result_p
-def sg_dx_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_sat.restype = c_result_p
-def sg_dx_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_64.restype = c_result_p
-def sg_dx_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_32.restype = c_result_p
-def sg_dx_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_16.restype = c_result_p
-def sg_dx_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_8.restype = c_result_p
-def sg_dx_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_sat.restype = c_result_p
-def sg_dx_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_diag_64.restype = c_result_p
-def sg_dx_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_diag_32.restype = c_result_p
-def sg_dx_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_diag_16.restype = c_result_p
-def sg_dx_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_diag_8.restype = c_result_p
-def sg_dx_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_diag_sat.restype = c_result_p
-def sg_dx_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_dx_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_64.restype = c_result_p
-def sg_dx_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_32.restype = c_result_p
-def sg_dx_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_16.restype = c_result_p
-def sg_dx_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_8.restype = c_result_p
-def sg_dx_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_sat.restype = c_result_p
-def sg_dx_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_64.restype = c_result_p
-def sg_dx_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_32.restype = c_result_p
-def sg_dx_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_16.restype = c_result_p
-def sg_dx_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_8.restype = c_result_p
-def sg_dx_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_sat.restype = c_result_p
-def sg_dx_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_diag_64.restype = c_result_p
-def sg_dx_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_diag_32.restype = c_result_p
-def sg_dx_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_diag_16.restype = c_result_p
-def sg_dx_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_diag_8.restype = c_result_p
-def sg_dx_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_diag_sat.restype = c_result_p
-def sg_dx_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_64.restype = c_result_p
-def sg_dx_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_32.restype = c_result_p
-def sg_dx_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_16.restype = c_result_p
-def sg_dx_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_8.restype = c_result_p
-def sg_dx_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_sat.restype = c_result_p
-def sg_dx_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_64.restype = c_result_p
-def sg_dx_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_32.restype = c_result_p
-def sg_dx_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_16.restype = c_result_p
-def sg_dx_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_8.restype = c_result_p
-def sg_dx_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_sat.restype = c_result_p
-def sg_dx_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_diag_64.restype = c_result_p
-def sg_dx_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_diag_32.restype = c_result_p
-def sg_dx_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_diag_16.restype = c_result_p
-def sg_dx_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_diag_8.restype = c_result_p
-def sg_dx_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_diag_sat.restype = c_result_p
-def sg_dx_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_64.restype = c_result_p
-def sg_dx_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_32.restype = c_result_p
-def sg_dx_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_16.restype = c_result_p
-def sg_dx_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_8.restype = c_result_p
-def sg_dx_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_sat.restype = c_result_p
-def sg_dx_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_64.restype = c_result_p
-def sg_dx_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_32.restype = c_result_p
-def sg_dx_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_16.restype = c_result_p
-def sg_dx_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_8.restype = c_result_p
-def sg_dx_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_sat.restype = c_result_p
-def sg_dx_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_diag_64.restype = c_result_p
-def sg_dx_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_diag_32.restype = c_result_p
-def sg_dx_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_diag_16.restype = c_result_p
-def sg_dx_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_diag_8.restype = c_result_p
-def sg_dx_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_diag_sat.restype = c_result_p
-def sg_dx_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_64.restype = c_result_p
-def sg_qb_de_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_32.restype = c_result_p
-def sg_qb_de_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_16.restype = c_result_p
-def sg_qb_de_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_8.restype = c_result_p
-def sg_qb_de_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_sat.restype = c_result_p
-def sg_qb_de_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_64.restype = c_result_p
-def sg_qb_de_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_32.restype = c_result_p
-def sg_qb_de_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_16.restype = c_result_p
-def sg_qb_de_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_8.restype = c_result_p
-def sg_qb_de_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_sat.restype = c_result_p
-def sg_qb_de_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_diag_64.restype = c_result_p
-def sg_qb_de_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_diag_32.restype = c_result_p
-def sg_qb_de_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_diag_16.restype = c_result_p
-def sg_qb_de_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_diag_8.restype = c_result_p
-def sg_qb_de_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_diag_sat.restype = c_result_p
-def sg_qb_de_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_64.restype = c_result_p
-def sg_qb_de_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_32.restype = c_result_p
-def sg_qb_de_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_16.restype = c_result_p
-def sg_qb_de_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_8.restype = c_result_p
-def sg_qb_de_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_sat.restype = c_result_p
-def sg_qb_de_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_64.restype = c_result_p
-def sg_qb_de_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_32.restype = c_result_p
-def sg_qb_de_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_16.restype = c_result_p
-def sg_qb_de_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_8.restype = c_result_p
-def sg_qb_de_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_sat.restype = c_result_p
-def sg_qb_de_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_diag_64.restype = c_result_p
-def sg_qb_de_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_diag_32.restype = c_result_p
-def sg_qb_de_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_diag_16.restype = c_result_p
-def sg_qb_de_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_diag_8.restype = c_result_p
-def sg_qb_de_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_diag_sat.restype = c_result_p
-def sg_qb_de_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_64.restype = c_result_p
-def sg_qb_de_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_32.restype = c_result_p
-def sg_qb_de_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_16.restype = c_result_p
-def sg_qb_de_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_8.restype = c_result_p
-def sg_qb_de_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_sat.restype = c_result_p
-def sg_qb_de_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_64.restype = c_result_p
-def sg_qb_de_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_32.restype = c_result_p
-def sg_qb_de_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_16.restype = c_result_p
-def sg_qb_de_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_8.restype = c_result_p
-def sg_qb_de_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_sat.restype = c_result_p
-def sg_qb_de_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_diag_64.restype = c_result_p
-def sg_qb_de_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_diag_32.restype = c_result_p
-def sg_qb_de_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_diag_16.restype = c_result_p
-def sg_qb_de_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_diag_8.restype = c_result_p
-def sg_qb_de_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_diag_sat.restype = c_result_p
-def sg_qb_de_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_64.restype = c_result_p
-def sg_qb_de_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_32.restype = c_result_p
-def sg_qb_de_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_16.restype = c_result_p
-def sg_qb_de_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_8.restype = c_result_p
-def sg_qb_de_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_sat.restype = c_result_p
-def sg_qb_de_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_64.restype = c_result_p
-def sg_qb_de_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_32.restype = c_result_p
-def sg_qb_de_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_16.restype = c_result_p
-def sg_qb_de_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_8.restype = c_result_p
-def sg_qb_de_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_sat.restype = c_result_p
-def sg_qb_de_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_diag_64.restype = c_result_p
-def sg_qb_de_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_diag_32.restype = c_result_p
-def sg_qb_de_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_diag_16.restype = c_result_p
-def sg_qb_de_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_diag_8.restype = c_result_p
-def sg_qb_de_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_diag_sat.restype = c_result_p
-def sg_qb_de_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qb_de_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_64.restype = c_result_p
-def sg_qb_de_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_32.restype = c_result_p
-def sg_qb_de_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_16.restype = c_result_p
-def sg_qb_de_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_8.restype = c_result_p
-def sg_qb_de_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_sat.restype = c_result_p
-def sg_qb_de_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_64.restype = c_result_p
-def sg_qb_de_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_32.restype = c_result_p
-def sg_qb_de_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_16.restype = c_result_p
-def sg_qb_de_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_8.restype = c_result_p
-def sg_qb_de_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_sat.restype = c_result_p
-def sg_qb_de_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_diag_64.restype = c_result_p
-def sg_qb_de_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_diag_32.restype = c_result_p
-def sg_qb_de_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_diag_16.restype = c_result_p
-def sg_qb_de_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_diag_8.restype = c_result_p
-def sg_qb_de_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_diag_sat.restype = c_result_p
-def sg_qb_de_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_64.restype = c_result_p
-def sg_qb_de_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_32.restype = c_result_p
-def sg_qb_de_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_16.restype = c_result_p
-def sg_qb_de_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_8.restype = c_result_p
-def sg_qb_de_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_sat.restype = c_result_p
-def sg_qb_de_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_64.restype = c_result_p
-def sg_qb_de_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_32.restype = c_result_p
-def sg_qb_de_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_16.restype = c_result_p
-def sg_qb_de_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_8.restype = c_result_p
-def sg_qb_de_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_sat.restype = c_result_p
-def sg_qb_de_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_diag_64.restype = c_result_p
-def sg_qb_de_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_diag_32.restype = c_result_p
-def sg_qb_de_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_diag_16.restype = c_result_p
-def sg_qb_de_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_diag_8.restype = c_result_p
-def sg_qb_de_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_diag_sat.restype = c_result_p
-def sg_qb_de_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_64.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_32.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_16.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_8.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_sat.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_64.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_32.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_16.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_8.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_sat.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_diag_64.restype = c_result_p
-def sg_qb_de_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_diag_32.restype = c_result_p
-def sg_qb_de_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_diag_16.restype = c_result_p
-def sg_qb_de_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_diag_8.restype = c_result_p
-def sg_qb_de_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_diag_sat.restype = c_result_p
-def sg_qb_de_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_64.restype = c_result_p
-def sg_qe_db_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_32.restype = c_result_p
-def sg_qe_db_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_16.restype = c_result_p
-def sg_qe_db_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_8.restype = c_result_p
-def sg_qe_db_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_sat.restype = c_result_p
-def sg_qe_db_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_64.restype = c_result_p
-def sg_qe_db_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_32.restype = c_result_p
-def sg_qe_db_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_16.restype = c_result_p
-def sg_qe_db_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_8.restype = c_result_p
-def sg_qe_db_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_sat.restype = c_result_p
-def sg_qe_db_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_diag_64.restype = c_result_p
-def sg_qe_db_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_diag_32.restype = c_result_p
-def sg_qe_db_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_diag_16.restype = c_result_p
-def sg_qe_db_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_diag_8.restype = c_result_p
-def sg_qe_db_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_diag_sat.restype = c_result_p
-def sg_qe_db_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_64.restype = c_result_p
-def sg_qe_db_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_32.restype = c_result_p
-def sg_qe_db_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_16.restype = c_result_p
-def sg_qe_db_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_8.restype = c_result_p
-def sg_qe_db_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_sat.restype = c_result_p
-def sg_qe_db_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_64.restype = c_result_p
-def sg_qe_db_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_32.restype = c_result_p
-def sg_qe_db_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_16.restype = c_result_p
-def sg_qe_db_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_8.restype = c_result_p
-def sg_qe_db_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_sat.restype = c_result_p
-def sg_qe_db_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_diag_64.restype = c_result_p
-def sg_qe_db_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_diag_32.restype = c_result_p
-def sg_qe_db_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_diag_16.restype = c_result_p
-def sg_qe_db_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_diag_8.restype = c_result_p
-def sg_qe_db_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_diag_sat.restype = c_result_p
-def sg_qe_db_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_64.restype = c_result_p
-def sg_qe_db_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_32.restype = c_result_p
-def sg_qe_db_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_16.restype = c_result_p
-def sg_qe_db_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_8.restype = c_result_p
-def sg_qe_db_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_sat.restype = c_result_p
-def sg_qe_db_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_64.restype = c_result_p
-def sg_qe_db_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_32.restype = c_result_p
-def sg_qe_db_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_16.restype = c_result_p
-def sg_qe_db_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_8.restype = c_result_p
-def sg_qe_db_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_sat.restype = c_result_p
-def sg_qe_db_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_diag_64.restype = c_result_p
-def sg_qe_db_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_diag_32.restype = c_result_p
-def sg_qe_db_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_diag_16.restype = c_result_p
-def sg_qe_db_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_diag_8.restype = c_result_p
-def sg_qe_db_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_diag_sat.restype = c_result_p
-def sg_qe_db_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_trace_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_64.restype = c_result_p
-def sg_qe_db_trace_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_32.restype = c_result_p
-def sg_qe_db_trace_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_16.restype = c_result_p
-def sg_qe_db_trace_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_8.restype = c_result_p
-def sg_qe_db_trace_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_sat.restype = c_result_p
-def sg_qe_db_trace_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_64.restype = c_result_p
-def sg_qe_db_trace_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_32.restype = c_result_p
-def sg_qe_db_trace_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_16.restype = c_result_p
-def sg_qe_db_trace_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_8.restype = c_result_p
-def sg_qe_db_trace_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_sat.restype = c_result_p
-def sg_qe_db_trace_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_diag_64.restype = c_result_p
-def sg_qe_db_trace_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_diag_32.restype = c_result_p
-def sg_qe_db_trace_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_diag_16.restype = c_result_p
-def sg_qe_db_trace_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_diag_8.restype = c_result_p
-def sg_qe_db_trace_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_trace_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_diag_sat.restype = c_result_p
-def sg_qe_db_trace_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_trace_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2), s1, s2, matrix)
-
-_lib.parasail_sg_qe_db_stats_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_64.restype = c_result_p
-def sg_qe_db_stats_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_32.restype = c_result_p
-def sg_qe_db_stats_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_16.restype = c_result_p
-def sg_qe_db_stats_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_8.restype = c_result_p
-def sg_qe_db_stats_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_sat.restype = c_result_p
-def sg_qe_db_stats_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_64.restype = c_result_p
-def sg_qe_db_stats_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_32.restype = c_result_p
-def sg_qe_db_stats_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_16.restype = c_result_p
-def sg_qe_db_stats_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_8.restype = c_result_p
-def sg_qe_db_stats_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_sat.restype = c_result_p
-def sg_qe_db_stats_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_diag_64.restype = c_result_p
-def sg_qe_db_stats_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_diag_32.restype = c_result_p
-def sg_qe_db_stats_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_diag_16.restype = c_result_p
-def sg_qe_db_stats_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_diag_8.restype = c_result_p
-def sg_qe_db_stats_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_diag_sat.restype = c_result_p
-def sg_qe_db_stats_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_64.restype = c_result_p
-def sg_qe_db_stats_table_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_32.restype = c_result_p
-def sg_qe_db_stats_table_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_16.restype = c_result_p
-def sg_qe_db_stats_table_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_8.restype = c_result_p
-def sg_qe_db_stats_table_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_sat.restype = c_result_p
-def sg_qe_db_stats_table_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_64.restype = c_result_p
-def sg_qe_db_stats_table_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_32.restype = c_result_p
-def sg_qe_db_stats_table_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_16.restype = c_result_p
-def sg_qe_db_stats_table_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_8.restype = c_result_p
-def sg_qe_db_stats_table_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_sat.restype = c_result_p
-def sg_qe_db_stats_table_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_diag_64.restype = c_result_p
-def sg_qe_db_stats_table_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_diag_32.restype = c_result_p
-def sg_qe_db_stats_table_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_diag_16.restype = c_result_p
-def sg_qe_db_stats_table_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_diag_8.restype = c_result_p
-def sg_qe_db_stats_table_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_diag_sat.restype = c_result_p
-def sg_qe_db_stats_table_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_table_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_64.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_32.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_16.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_8.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_sat.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_64.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_32.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_16.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_8.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_sat.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_diag_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_diag_64.restype = c_result_p
-def sg_qe_db_stats_rowcol_diag_64(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_diag_64(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_diag_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_diag_32.restype = c_result_p
-def sg_qe_db_stats_rowcol_diag_32(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_diag_32(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_diag_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_diag_16.restype = c_result_p
-def sg_qe_db_stats_rowcol_diag_16(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_diag_16(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_diag_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_diag_8.restype = c_result_p
-def sg_qe_db_stats_rowcol_diag_8(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_diag_8(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_diag_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_diag_sat.restype = c_result_p
-def sg_qe_db_stats_rowcol_diag_sat(s1, s2, open, extend, matrix):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_diag_sat(
-        b(s1), len(s1), b(s2), len(s2), open, extend, matrix),
-        len(s1), len(s2))
-
-_argtypes = [c_profile_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_int, ctypes.c_int]
-
-
-_lib.parasail_nw_scan_profile_64.argtypes = _argtypes
-_lib.parasail_nw_scan_profile_64.restype = c_result_p
-def nw_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_scan_profile_32.argtypes = _argtypes
-_lib.parasail_nw_scan_profile_32.restype = c_result_p
-def nw_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_scan_profile_16.argtypes = _argtypes
-_lib.parasail_nw_scan_profile_16.restype = c_result_p
-def nw_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_scan_profile_8.argtypes = _argtypes
-_lib.parasail_nw_scan_profile_8.restype = c_result_p
-def nw_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_scan_profile_sat.restype = c_result_p
-def nw_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_striped_profile_64.argtypes = _argtypes
-_lib.parasail_nw_striped_profile_64.restype = c_result_p
-def nw_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_striped_profile_32.argtypes = _argtypes
-_lib.parasail_nw_striped_profile_32.restype = c_result_p
-def nw_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_striped_profile_16.argtypes = _argtypes
-_lib.parasail_nw_striped_profile_16.restype = c_result_p
-def nw_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_striped_profile_8.argtypes = _argtypes
-_lib.parasail_nw_striped_profile_8.restype = c_result_p
-def nw_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_striped_profile_sat.restype = c_result_p
-def nw_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_nw_table_scan_profile_64.restype = c_result_p
-def nw_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_nw_table_scan_profile_32.restype = c_result_p
-def nw_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_nw_table_scan_profile_16.restype = c_result_p
-def nw_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_nw_table_scan_profile_8.restype = c_result_p
-def nw_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_table_scan_profile_sat.restype = c_result_p
-def nw_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_nw_table_striped_profile_64.restype = c_result_p
-def nw_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_nw_table_striped_profile_32.restype = c_result_p
-def nw_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_nw_table_striped_profile_16.restype = c_result_p
-def nw_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_nw_table_striped_profile_8.restype = c_result_p
-def nw_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_table_striped_profile_sat.restype = c_result_p
-def nw_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_profile_64.restype = c_result_p
-def nw_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_profile_32.restype = c_result_p
-def nw_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_profile_16.restype = c_result_p
-def nw_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_profile_8.restype = c_result_p
-def nw_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_rowcol_scan_profile_sat.restype = c_result_p
-def nw_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_profile_64.restype = c_result_p
-def nw_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_profile_32.restype = c_result_p
-def nw_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_profile_16.restype = c_result_p
-def nw_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_profile_8.restype = c_result_p
-def nw_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_rowcol_striped_profile_sat.restype = c_result_p
-def nw_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_profile_64.restype = c_result_p
-def nw_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_profile_32.restype = c_result_p
-def nw_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_profile_16.restype = c_result_p
-def nw_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_profile_8.restype = c_result_p
-def nw_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_trace_scan_profile_sat.restype = c_result_p
-def nw_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_profile_64.restype = c_result_p
-def nw_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_profile_32.restype = c_result_p
-def nw_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_profile_16.restype = c_result_p
-def nw_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_profile_8.restype = c_result_p
-def nw_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_trace_striped_profile_sat.restype = c_result_p
-def nw_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_nw_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_profile_64.restype = c_result_p
-def nw_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_profile_32.restype = c_result_p
-def nw_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_profile_16.restype = c_result_p
-def nw_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_profile_8.restype = c_result_p
-def nw_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_scan_profile_sat.restype = c_result_p
-def nw_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_profile_64.restype = c_result_p
-def nw_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_profile_32.restype = c_result_p
-def nw_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_profile_16.restype = c_result_p
-def nw_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_profile_8.restype = c_result_p
-def nw_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_striped_profile_sat.restype = c_result_p
-def nw_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_profile_64.restype = c_result_p
-def nw_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_profile_32.restype = c_result_p
-def nw_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_profile_16.restype = c_result_p
-def nw_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_profile_8.restype = c_result_p
-def nw_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_table_scan_profile_sat.restype = c_result_p
-def nw_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_profile_64.restype = c_result_p
-def nw_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_profile_32.restype = c_result_p
-def nw_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_profile_16.restype = c_result_p
-def nw_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_profile_8.restype = c_result_p
-def nw_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_table_striped_profile_sat.restype = c_result_p
-def nw_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_profile_64.restype = c_result_p
-def nw_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_profile_32.restype = c_result_p
-def nw_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_profile_16.restype = c_result_p
-def nw_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_profile_8.restype = c_result_p
-def nw_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_scan_profile_sat.restype = c_result_p
-def nw_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_profile_64.restype = c_result_p
-def nw_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_profile_32.restype = c_result_p
-def nw_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_profile_16.restype = c_result_p
-def nw_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_profile_8.restype = c_result_p
-def nw_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_nw_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_nw_stats_rowcol_striped_profile_sat.restype = c_result_p
-def nw_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_nw_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_scan_profile_64.restype = c_result_p
-def sg_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_scan_profile_32.restype = c_result_p
-def sg_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_scan_profile_16.restype = c_result_p
-def sg_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_scan_profile_8.restype = c_result_p
-def sg_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_scan_profile_sat.restype = c_result_p
-def sg_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_striped_profile_64.restype = c_result_p
-def sg_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_striped_profile_32.restype = c_result_p
-def sg_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_striped_profile_16.restype = c_result_p
-def sg_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_striped_profile_8.restype = c_result_p
-def sg_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_striped_profile_sat.restype = c_result_p
-def sg_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_table_scan_profile_64.restype = c_result_p
-def sg_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_table_scan_profile_32.restype = c_result_p
-def sg_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_table_scan_profile_16.restype = c_result_p
-def sg_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_table_scan_profile_8.restype = c_result_p
-def sg_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_table_scan_profile_sat.restype = c_result_p
-def sg_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_table_striped_profile_64.restype = c_result_p
-def sg_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_table_striped_profile_32.restype = c_result_p
-def sg_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_table_striped_profile_16.restype = c_result_p
-def sg_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_table_striped_profile_8.restype = c_result_p
-def sg_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_table_striped_profile_sat.restype = c_result_p
-def sg_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_profile_64.restype = c_result_p
-def sg_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_profile_32.restype = c_result_p
-def sg_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_profile_16.restype = c_result_p
-def sg_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_profile_8.restype = c_result_p
-def sg_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_rowcol_scan_profile_sat.restype = c_result_p
-def sg_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_profile_64.restype = c_result_p
-def sg_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_profile_32.restype = c_result_p
-def sg_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_profile_16.restype = c_result_p
-def sg_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_profile_8.restype = c_result_p
-def sg_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_rowcol_striped_profile_sat.restype = c_result_p
-def sg_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_profile_64.restype = c_result_p
-def sg_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_profile_32.restype = c_result_p
-def sg_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_profile_16.restype = c_result_p
-def sg_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_profile_8.restype = c_result_p
-def sg_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_trace_scan_profile_sat.restype = c_result_p
-def sg_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_profile_64.restype = c_result_p
-def sg_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_profile_32.restype = c_result_p
-def sg_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_profile_16.restype = c_result_p
-def sg_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_profile_8.restype = c_result_p
-def sg_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_trace_striped_profile_sat.restype = c_result_p
-def sg_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_profile_64.restype = c_result_p
-def sg_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_profile_32.restype = c_result_p
-def sg_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_profile_16.restype = c_result_p
-def sg_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_profile_8.restype = c_result_p
-def sg_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_scan_profile_sat.restype = c_result_p
-def sg_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_profile_64.restype = c_result_p
-def sg_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_profile_32.restype = c_result_p
-def sg_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_profile_16.restype = c_result_p
-def sg_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_profile_8.restype = c_result_p
-def sg_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_striped_profile_sat.restype = c_result_p
-def sg_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_profile_64.restype = c_result_p
-def sg_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_profile_32.restype = c_result_p
-def sg_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_profile_16.restype = c_result_p
-def sg_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_profile_8.restype = c_result_p
-def sg_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_table_scan_profile_sat.restype = c_result_p
-def sg_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_profile_64.restype = c_result_p
-def sg_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_profile_32.restype = c_result_p
-def sg_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_profile_16.restype = c_result_p
-def sg_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_profile_8.restype = c_result_p
-def sg_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_table_striped_profile_sat.restype = c_result_p
-def sg_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sw_scan_profile_64.restype = c_result_p
-def sw_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sw_scan_profile_32.restype = c_result_p
-def sw_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sw_scan_profile_16.restype = c_result_p
-def sw_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sw_scan_profile_8.restype = c_result_p
-def sw_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_scan_profile_sat.restype = c_result_p
-def sw_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sw_striped_profile_64.restype = c_result_p
-def sw_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sw_striped_profile_32.restype = c_result_p
-def sw_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sw_striped_profile_16.restype = c_result_p
-def sw_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sw_striped_profile_8.restype = c_result_p
-def sw_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_striped_profile_sat.restype = c_result_p
-def sw_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sw_table_scan_profile_64.restype = c_result_p
-def sw_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sw_table_scan_profile_32.restype = c_result_p
-def sw_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sw_table_scan_profile_16.restype = c_result_p
-def sw_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sw_table_scan_profile_8.restype = c_result_p
-def sw_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_table_scan_profile_sat.restype = c_result_p
-def sw_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sw_table_striped_profile_64.restype = c_result_p
-def sw_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sw_table_striped_profile_32.restype = c_result_p
-def sw_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sw_table_striped_profile_16.restype = c_result_p
-def sw_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sw_table_striped_profile_8.restype = c_result_p
-def sw_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_table_striped_profile_sat.restype = c_result_p
-def sw_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_profile_64.restype = c_result_p
-def sw_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_profile_32.restype = c_result_p
-def sw_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_profile_16.restype = c_result_p
-def sw_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_profile_8.restype = c_result_p
-def sw_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_rowcol_scan_profile_sat.restype = c_result_p
-def sw_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_profile_64.restype = c_result_p
-def sw_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_profile_32.restype = c_result_p
-def sw_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_profile_16.restype = c_result_p
-def sw_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_profile_8.restype = c_result_p
-def sw_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_rowcol_striped_profile_sat.restype = c_result_p
-def sw_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_profile_64.restype = c_result_p
-def sw_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_profile_32.restype = c_result_p
-def sw_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_profile_16.restype = c_result_p
-def sw_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_profile_8.restype = c_result_p
-def sw_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_trace_scan_profile_sat.restype = c_result_p
-def sw_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_profile_64.restype = c_result_p
-def sw_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_profile_32.restype = c_result_p
-def sw_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_profile_16.restype = c_result_p
-def sw_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_profile_8.restype = c_result_p
-def sw_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_trace_striped_profile_sat.restype = c_result_p
-def sw_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sw_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_profile_64.restype = c_result_p
-def sw_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_profile_32.restype = c_result_p
-def sw_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_profile_16.restype = c_result_p
-def sw_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_profile_8.restype = c_result_p
-def sw_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_scan_profile_sat.restype = c_result_p
-def sw_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_profile_64.restype = c_result_p
-def sw_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_profile_32.restype = c_result_p
-def sw_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_profile_16.restype = c_result_p
-def sw_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_profile_8.restype = c_result_p
-def sw_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_striped_profile_sat.restype = c_result_p
-def sw_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_profile_64.restype = c_result_p
-def sw_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_profile_32.restype = c_result_p
-def sw_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_profile_16.restype = c_result_p
-def sw_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_profile_8.restype = c_result_p
-def sw_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_table_scan_profile_sat.restype = c_result_p
-def sw_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_profile_64.restype = c_result_p
-def sw_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_profile_32.restype = c_result_p
-def sw_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_profile_16.restype = c_result_p
-def sw_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_profile_8.restype = c_result_p
-def sw_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_table_striped_profile_sat.restype = c_result_p
-def sw_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_profile_64.restype = c_result_p
-def sw_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_profile_32.restype = c_result_p
-def sw_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_profile_16.restype = c_result_p
-def sw_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_profile_8.restype = c_result_p
-def sw_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sw_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_profile_64.restype = c_result_p
-def sw_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_profile_32.restype = c_result_p
-def sw_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_profile_16.restype = c_result_p
-def sw_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_profile_8.restype = c_result_p
-def sw_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sw_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sw_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sw_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sw_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_profile_64.restype = c_result_p
-def sg_qb_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_profile_32.restype = c_result_p
-def sg_qb_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_profile_16.restype = c_result_p
-def sg_qb_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_profile_8.restype = c_result_p
-def sg_qb_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_scan_profile_sat.restype = c_result_p
-def sg_qb_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_profile_64.restype = c_result_p
-def sg_qb_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_profile_32.restype = c_result_p
-def sg_qb_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_profile_16.restype = c_result_p
-def sg_qb_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_profile_8.restype = c_result_p
-def sg_qb_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_striped_profile_sat.restype = c_result_p
-def sg_qb_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_profile_64.restype = c_result_p
-def sg_qb_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_profile_32.restype = c_result_p
-def sg_qb_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_profile_16.restype = c_result_p
-def sg_qb_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_profile_8.restype = c_result_p
-def sg_qb_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_table_scan_profile_sat.restype = c_result_p
-def sg_qb_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_profile_64.restype = c_result_p
-def sg_qb_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_profile_32.restype = c_result_p
-def sg_qb_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_profile_16.restype = c_result_p
-def sg_qb_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_profile_8.restype = c_result_p
-def sg_qb_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_table_striped_profile_sat.restype = c_result_p
-def sg_qb_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_profile_64.restype = c_result_p
-def sg_qb_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_profile_32.restype = c_result_p
-def sg_qb_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_profile_16.restype = c_result_p
-def sg_qb_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_profile_8.restype = c_result_p
-def sg_qb_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qb_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_profile_64.restype = c_result_p
-def sg_qb_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_profile_32.restype = c_result_p
-def sg_qb_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_profile_16.restype = c_result_p
-def sg_qb_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_profile_8.restype = c_result_p
-def sg_qb_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qb_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_profile_64.restype = c_result_p
-def sg_qb_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_profile_32.restype = c_result_p
-def sg_qb_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_profile_16.restype = c_result_p
-def sg_qb_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_profile_8.restype = c_result_p
-def sg_qb_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_scan_profile_sat.restype = c_result_p
-def sg_qb_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_profile_64.restype = c_result_p
-def sg_qb_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_profile_32.restype = c_result_p
-def sg_qb_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_profile_16.restype = c_result_p
-def sg_qb_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_profile_8.restype = c_result_p
-def sg_qb_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_trace_striped_profile_sat.restype = c_result_p
-def sg_qb_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_profile_64.restype = c_result_p
-def sg_qb_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_profile_32.restype = c_result_p
-def sg_qb_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_profile_16.restype = c_result_p
-def sg_qb_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_profile_8.restype = c_result_p
-def sg_qb_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_scan_profile_sat.restype = c_result_p
-def sg_qb_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_profile_64.restype = c_result_p
-def sg_qb_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_profile_32.restype = c_result_p
-def sg_qb_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_profile_16.restype = c_result_p
-def sg_qb_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_profile_8.restype = c_result_p
-def sg_qb_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_striped_profile_sat.restype = c_result_p
-def sg_qb_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_profile_64.restype = c_result_p
-def sg_qb_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_profile_32.restype = c_result_p
-def sg_qb_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_profile_16.restype = c_result_p
-def sg_qb_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_profile_8.restype = c_result_p
-def sg_qb_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_scan_profile_sat.restype = c_result_p
-def sg_qb_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_profile_64.restype = c_result_p
-def sg_qb_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_profile_32.restype = c_result_p
-def sg_qb_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_profile_16.restype = c_result_p
-def sg_qb_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_profile_8.restype = c_result_p
-def sg_qb_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_table_striped_profile_sat.restype = c_result_p
-def sg_qb_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_qb_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_qb_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_qb_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_qb_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qb_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_qb_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_qb_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_qb_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_qb_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qb_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_profile_64.restype = c_result_p
-def sg_qe_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_profile_32.restype = c_result_p
-def sg_qe_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_profile_16.restype = c_result_p
-def sg_qe_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_profile_8.restype = c_result_p
-def sg_qe_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_scan_profile_sat.restype = c_result_p
-def sg_qe_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_profile_64.restype = c_result_p
-def sg_qe_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_profile_32.restype = c_result_p
-def sg_qe_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_profile_16.restype = c_result_p
-def sg_qe_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_profile_8.restype = c_result_p
-def sg_qe_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_striped_profile_sat.restype = c_result_p
-def sg_qe_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_profile_64.restype = c_result_p
-def sg_qe_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_profile_32.restype = c_result_p
-def sg_qe_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_profile_16.restype = c_result_p
-def sg_qe_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_profile_8.restype = c_result_p
-def sg_qe_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_table_scan_profile_sat.restype = c_result_p
-def sg_qe_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_profile_64.restype = c_result_p
-def sg_qe_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_profile_32.restype = c_result_p
-def sg_qe_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_profile_16.restype = c_result_p
-def sg_qe_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_profile_8.restype = c_result_p
-def sg_qe_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_table_striped_profile_sat.restype = c_result_p
-def sg_qe_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_profile_64.restype = c_result_p
-def sg_qe_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_profile_32.restype = c_result_p
-def sg_qe_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_profile_16.restype = c_result_p
-def sg_qe_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_profile_8.restype = c_result_p
-def sg_qe_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qe_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_profile_64.restype = c_result_p
-def sg_qe_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_profile_32.restype = c_result_p
-def sg_qe_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_profile_16.restype = c_result_p
-def sg_qe_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_profile_8.restype = c_result_p
-def sg_qe_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qe_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_profile_64.restype = c_result_p
-def sg_qe_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_profile_32.restype = c_result_p
-def sg_qe_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_profile_16.restype = c_result_p
-def sg_qe_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_profile_8.restype = c_result_p
-def sg_qe_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_scan_profile_sat.restype = c_result_p
-def sg_qe_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_profile_64.restype = c_result_p
-def sg_qe_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_profile_32.restype = c_result_p
-def sg_qe_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_profile_16.restype = c_result_p
-def sg_qe_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_profile_8.restype = c_result_p
-def sg_qe_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_trace_striped_profile_sat.restype = c_result_p
-def sg_qe_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_profile_64.restype = c_result_p
-def sg_qe_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_profile_32.restype = c_result_p
-def sg_qe_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_profile_16.restype = c_result_p
-def sg_qe_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_profile_8.restype = c_result_p
-def sg_qe_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_scan_profile_sat.restype = c_result_p
-def sg_qe_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_profile_64.restype = c_result_p
-def sg_qe_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_profile_32.restype = c_result_p
-def sg_qe_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_profile_16.restype = c_result_p
-def sg_qe_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_profile_8.restype = c_result_p
-def sg_qe_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_striped_profile_sat.restype = c_result_p
-def sg_qe_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_profile_64.restype = c_result_p
-def sg_qe_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_profile_32.restype = c_result_p
-def sg_qe_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_profile_16.restype = c_result_p
-def sg_qe_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_profile_8.restype = c_result_p
-def sg_qe_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_scan_profile_sat.restype = c_result_p
-def sg_qe_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_profile_64.restype = c_result_p
-def sg_qe_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_profile_32.restype = c_result_p
-def sg_qe_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_profile_16.restype = c_result_p
-def sg_qe_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_profile_8.restype = c_result_p
-def sg_qe_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_table_striped_profile_sat.restype = c_result_p
-def sg_qe_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_qe_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_qe_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_qe_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_qe_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qe_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_qe_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_qe_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_qe_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_qe_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qe_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_profile_64.restype = c_result_p
-def sg_qx_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_profile_32.restype = c_result_p
-def sg_qx_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_profile_16.restype = c_result_p
-def sg_qx_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_profile_8.restype = c_result_p
-def sg_qx_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_scan_profile_sat.restype = c_result_p
-def sg_qx_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_profile_64.restype = c_result_p
-def sg_qx_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_profile_32.restype = c_result_p
-def sg_qx_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_profile_16.restype = c_result_p
-def sg_qx_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_profile_8.restype = c_result_p
-def sg_qx_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_striped_profile_sat.restype = c_result_p
-def sg_qx_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_profile_64.restype = c_result_p
-def sg_qx_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_profile_32.restype = c_result_p
-def sg_qx_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_profile_16.restype = c_result_p
-def sg_qx_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_profile_8.restype = c_result_p
-def sg_qx_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_table_scan_profile_sat.restype = c_result_p
-def sg_qx_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_profile_64.restype = c_result_p
-def sg_qx_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_profile_32.restype = c_result_p
-def sg_qx_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_profile_16.restype = c_result_p
-def sg_qx_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_profile_8.restype = c_result_p
-def sg_qx_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_table_striped_profile_sat.restype = c_result_p
-def sg_qx_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_profile_64.restype = c_result_p
-def sg_qx_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_profile_32.restype = c_result_p
-def sg_qx_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_profile_16.restype = c_result_p
-def sg_qx_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_profile_8.restype = c_result_p
-def sg_qx_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qx_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_profile_64.restype = c_result_p
-def sg_qx_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_profile_32.restype = c_result_p
-def sg_qx_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_profile_16.restype = c_result_p
-def sg_qx_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_profile_8.restype = c_result_p
-def sg_qx_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qx_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_profile_64.restype = c_result_p
-def sg_qx_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_profile_32.restype = c_result_p
-def sg_qx_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_profile_16.restype = c_result_p
-def sg_qx_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_profile_8.restype = c_result_p
-def sg_qx_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_scan_profile_sat.restype = c_result_p
-def sg_qx_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_profile_64.restype = c_result_p
-def sg_qx_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_profile_32.restype = c_result_p
-def sg_qx_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_profile_16.restype = c_result_p
-def sg_qx_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_profile_8.restype = c_result_p
-def sg_qx_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_trace_striped_profile_sat.restype = c_result_p
-def sg_qx_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qx_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_profile_64.restype = c_result_p
-def sg_qx_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_profile_32.restype = c_result_p
-def sg_qx_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_profile_16.restype = c_result_p
-def sg_qx_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_profile_8.restype = c_result_p
-def sg_qx_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_scan_profile_sat.restype = c_result_p
-def sg_qx_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_profile_64.restype = c_result_p
-def sg_qx_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_profile_32.restype = c_result_p
-def sg_qx_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_profile_16.restype = c_result_p
-def sg_qx_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_profile_8.restype = c_result_p
-def sg_qx_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_striped_profile_sat.restype = c_result_p
-def sg_qx_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_profile_64.restype = c_result_p
-def sg_qx_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_profile_32.restype = c_result_p
-def sg_qx_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_profile_16.restype = c_result_p
-def sg_qx_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_profile_8.restype = c_result_p
-def sg_qx_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_scan_profile_sat.restype = c_result_p
-def sg_qx_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_profile_64.restype = c_result_p
-def sg_qx_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_profile_32.restype = c_result_p
-def sg_qx_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_profile_16.restype = c_result_p
-def sg_qx_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_profile_8.restype = c_result_p
-def sg_qx_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_table_striped_profile_sat.restype = c_result_p
-def sg_qx_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_qx_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_qx_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_qx_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_qx_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qx_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_qx_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_qx_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_qx_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_qx_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qx_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qx_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qx_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_scan_profile_64.restype = c_result_p
-def sg_db_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_scan_profile_32.restype = c_result_p
-def sg_db_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_scan_profile_16.restype = c_result_p
-def sg_db_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_scan_profile_8.restype = c_result_p
-def sg_db_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_scan_profile_sat.restype = c_result_p
-def sg_db_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_striped_profile_64.restype = c_result_p
-def sg_db_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_striped_profile_32.restype = c_result_p
-def sg_db_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_striped_profile_16.restype = c_result_p
-def sg_db_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_striped_profile_8.restype = c_result_p
-def sg_db_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_striped_profile_sat.restype = c_result_p
-def sg_db_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_profile_64.restype = c_result_p
-def sg_db_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_profile_32.restype = c_result_p
-def sg_db_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_profile_16.restype = c_result_p
-def sg_db_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_profile_8.restype = c_result_p
-def sg_db_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_table_scan_profile_sat.restype = c_result_p
-def sg_db_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_profile_64.restype = c_result_p
-def sg_db_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_profile_32.restype = c_result_p
-def sg_db_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_profile_16.restype = c_result_p
-def sg_db_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_profile_8.restype = c_result_p
-def sg_db_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_table_striped_profile_sat.restype = c_result_p
-def sg_db_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_profile_64.restype = c_result_p
-def sg_db_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_profile_32.restype = c_result_p
-def sg_db_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_profile_16.restype = c_result_p
-def sg_db_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_profile_8.restype = c_result_p
-def sg_db_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_scan_profile_sat.restype = c_result_p
-def sg_db_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_profile_64.restype = c_result_p
-def sg_db_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_profile_32.restype = c_result_p
-def sg_db_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_profile_16.restype = c_result_p
-def sg_db_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_profile_8.restype = c_result_p
-def sg_db_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_rowcol_striped_profile_sat.restype = c_result_p
-def sg_db_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_profile_64.restype = c_result_p
-def sg_db_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_profile_32.restype = c_result_p
-def sg_db_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_profile_16.restype = c_result_p
-def sg_db_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_profile_8.restype = c_result_p
-def sg_db_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_trace_scan_profile_sat.restype = c_result_p
-def sg_db_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_profile_64.restype = c_result_p
-def sg_db_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_profile_32.restype = c_result_p
-def sg_db_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_profile_16.restype = c_result_p
-def sg_db_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_profile_8.restype = c_result_p
-def sg_db_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_trace_striped_profile_sat.restype = c_result_p
-def sg_db_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_db_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_profile_64.restype = c_result_p
-def sg_db_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_profile_32.restype = c_result_p
-def sg_db_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_profile_16.restype = c_result_p
-def sg_db_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_profile_8.restype = c_result_p
-def sg_db_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_scan_profile_sat.restype = c_result_p
-def sg_db_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_profile_64.restype = c_result_p
-def sg_db_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_profile_32.restype = c_result_p
-def sg_db_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_profile_16.restype = c_result_p
-def sg_db_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_profile_8.restype = c_result_p
-def sg_db_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_striped_profile_sat.restype = c_result_p
-def sg_db_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_profile_64.restype = c_result_p
-def sg_db_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_profile_32.restype = c_result_p
-def sg_db_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_profile_16.restype = c_result_p
-def sg_db_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_profile_8.restype = c_result_p
-def sg_db_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_scan_profile_sat.restype = c_result_p
-def sg_db_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_profile_64.restype = c_result_p
-def sg_db_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_profile_32.restype = c_result_p
-def sg_db_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_profile_16.restype = c_result_p
-def sg_db_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_profile_8.restype = c_result_p
-def sg_db_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_table_striped_profile_sat.restype = c_result_p
-def sg_db_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_db_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_db_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_db_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_db_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_db_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_db_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_db_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_db_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_db_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_db_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_db_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_db_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_db_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_scan_profile_64.restype = c_result_p
-def sg_de_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_scan_profile_32.restype = c_result_p
-def sg_de_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_scan_profile_16.restype = c_result_p
-def sg_de_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_scan_profile_8.restype = c_result_p
-def sg_de_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_scan_profile_sat.restype = c_result_p
-def sg_de_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_striped_profile_64.restype = c_result_p
-def sg_de_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_striped_profile_32.restype = c_result_p
-def sg_de_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_striped_profile_16.restype = c_result_p
-def sg_de_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_striped_profile_8.restype = c_result_p
-def sg_de_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_striped_profile_sat.restype = c_result_p
-def sg_de_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_profile_64.restype = c_result_p
-def sg_de_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_profile_32.restype = c_result_p
-def sg_de_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_profile_16.restype = c_result_p
-def sg_de_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_profile_8.restype = c_result_p
-def sg_de_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_table_scan_profile_sat.restype = c_result_p
-def sg_de_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_profile_64.restype = c_result_p
-def sg_de_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_profile_32.restype = c_result_p
-def sg_de_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_profile_16.restype = c_result_p
-def sg_de_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_profile_8.restype = c_result_p
-def sg_de_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_table_striped_profile_sat.restype = c_result_p
-def sg_de_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_profile_64.restype = c_result_p
-def sg_de_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_profile_32.restype = c_result_p
-def sg_de_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_profile_16.restype = c_result_p
-def sg_de_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_profile_8.restype = c_result_p
-def sg_de_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_scan_profile_sat.restype = c_result_p
-def sg_de_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_profile_64.restype = c_result_p
-def sg_de_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_profile_32.restype = c_result_p
-def sg_de_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_profile_16.restype = c_result_p
-def sg_de_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_profile_8.restype = c_result_p
-def sg_de_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_rowcol_striped_profile_sat.restype = c_result_p
-def sg_de_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_profile_64.restype = c_result_p
-def sg_de_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_profile_32.restype = c_result_p
-def sg_de_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_profile_16.restype = c_result_p
-def sg_de_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_profile_8.restype = c_result_p
-def sg_de_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_trace_scan_profile_sat.restype = c_result_p
-def sg_de_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_profile_64.restype = c_result_p
-def sg_de_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_profile_32.restype = c_result_p
-def sg_de_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_profile_16.restype = c_result_p
-def sg_de_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_profile_8.restype = c_result_p
-def sg_de_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_trace_striped_profile_sat.restype = c_result_p
-def sg_de_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_de_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_profile_64.restype = c_result_p
-def sg_de_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_profile_32.restype = c_result_p
-def sg_de_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_profile_16.restype = c_result_p
-def sg_de_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_profile_8.restype = c_result_p
-def sg_de_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_scan_profile_sat.restype = c_result_p
-def sg_de_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_profile_64.restype = c_result_p
-def sg_de_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_profile_32.restype = c_result_p
-def sg_de_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_profile_16.restype = c_result_p
-def sg_de_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_profile_8.restype = c_result_p
-def sg_de_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_striped_profile_sat.restype = c_result_p
-def sg_de_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_profile_64.restype = c_result_p
-def sg_de_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_profile_32.restype = c_result_p
-def sg_de_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_profile_16.restype = c_result_p
-def sg_de_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_profile_8.restype = c_result_p
-def sg_de_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_scan_profile_sat.restype = c_result_p
-def sg_de_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_profile_64.restype = c_result_p
-def sg_de_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_profile_32.restype = c_result_p
-def sg_de_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_profile_16.restype = c_result_p
-def sg_de_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_profile_8.restype = c_result_p
-def sg_de_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_table_striped_profile_sat.restype = c_result_p
-def sg_de_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_de_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_de_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_de_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_de_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_de_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_de_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_de_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_de_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_de_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_de_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_de_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_de_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_de_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_profile_64.restype = c_result_p
-def sg_dx_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_profile_32.restype = c_result_p
-def sg_dx_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_profile_16.restype = c_result_p
-def sg_dx_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_profile_8.restype = c_result_p
-def sg_dx_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_scan_profile_sat.restype = c_result_p
-def sg_dx_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_profile_64.restype = c_result_p
-def sg_dx_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_profile_32.restype = c_result_p
-def sg_dx_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_profile_16.restype = c_result_p
-def sg_dx_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_profile_8.restype = c_result_p
-def sg_dx_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_striped_profile_sat.restype = c_result_p
-def sg_dx_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_profile_64.restype = c_result_p
-def sg_dx_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_profile_32.restype = c_result_p
-def sg_dx_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_profile_16.restype = c_result_p
-def sg_dx_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_profile_8.restype = c_result_p
-def sg_dx_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_table_scan_profile_sat.restype = c_result_p
-def sg_dx_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_profile_64.restype = c_result_p
-def sg_dx_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_profile_32.restype = c_result_p
-def sg_dx_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_profile_16.restype = c_result_p
-def sg_dx_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_profile_8.restype = c_result_p
-def sg_dx_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_table_striped_profile_sat.restype = c_result_p
-def sg_dx_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_profile_64.restype = c_result_p
-def sg_dx_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_profile_32.restype = c_result_p
-def sg_dx_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_profile_16.restype = c_result_p
-def sg_dx_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_profile_8.restype = c_result_p
-def sg_dx_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_scan_profile_sat.restype = c_result_p
-def sg_dx_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_profile_64.restype = c_result_p
-def sg_dx_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_profile_32.restype = c_result_p
-def sg_dx_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_profile_16.restype = c_result_p
-def sg_dx_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_profile_8.restype = c_result_p
-def sg_dx_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_rowcol_striped_profile_sat.restype = c_result_p
-def sg_dx_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_profile_64.restype = c_result_p
-def sg_dx_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_profile_32.restype = c_result_p
-def sg_dx_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_profile_16.restype = c_result_p
-def sg_dx_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_profile_8.restype = c_result_p
-def sg_dx_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_scan_profile_sat.restype = c_result_p
-def sg_dx_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_profile_64.restype = c_result_p
-def sg_dx_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_profile_32.restype = c_result_p
-def sg_dx_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_profile_16.restype = c_result_p
-def sg_dx_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_profile_8.restype = c_result_p
-def sg_dx_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_trace_striped_profile_sat.restype = c_result_p
-def sg_dx_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_dx_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_profile_64.restype = c_result_p
-def sg_dx_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_profile_32.restype = c_result_p
-def sg_dx_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_profile_16.restype = c_result_p
-def sg_dx_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_profile_8.restype = c_result_p
-def sg_dx_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_scan_profile_sat.restype = c_result_p
-def sg_dx_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_profile_64.restype = c_result_p
-def sg_dx_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_profile_32.restype = c_result_p
-def sg_dx_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_profile_16.restype = c_result_p
-def sg_dx_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_profile_8.restype = c_result_p
-def sg_dx_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_striped_profile_sat.restype = c_result_p
-def sg_dx_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_profile_64.restype = c_result_p
-def sg_dx_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_profile_32.restype = c_result_p
-def sg_dx_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_profile_16.restype = c_result_p
-def sg_dx_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_profile_8.restype = c_result_p
-def sg_dx_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_scan_profile_sat.restype = c_result_p
-def sg_dx_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_profile_64.restype = c_result_p
-def sg_dx_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_profile_32.restype = c_result_p
-def sg_dx_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_profile_16.restype = c_result_p
-def sg_dx_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_profile_8.restype = c_result_p
-def sg_dx_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_table_striped_profile_sat.restype = c_result_p
-def sg_dx_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_dx_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_dx_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_dx_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_dx_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_dx_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_dx_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_dx_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_dx_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_dx_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_dx_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_dx_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_dx_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_profile_64.restype = c_result_p
-def sg_qb_de_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_profile_32.restype = c_result_p
-def sg_qb_de_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_profile_16.restype = c_result_p
-def sg_qb_de_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_profile_8.restype = c_result_p
-def sg_qb_de_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_scan_profile_sat.restype = c_result_p
-def sg_qb_de_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_profile_64.restype = c_result_p
-def sg_qb_de_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_profile_32.restype = c_result_p
-def sg_qb_de_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_profile_16.restype = c_result_p
-def sg_qb_de_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_profile_8.restype = c_result_p
-def sg_qb_de_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_striped_profile_sat.restype = c_result_p
-def sg_qb_de_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_profile_64.restype = c_result_p
-def sg_qb_de_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_profile_32.restype = c_result_p
-def sg_qb_de_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_profile_16.restype = c_result_p
-def sg_qb_de_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_profile_8.restype = c_result_p
-def sg_qb_de_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_scan_profile_sat.restype = c_result_p
-def sg_qb_de_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_profile_64.restype = c_result_p
-def sg_qb_de_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_profile_32.restype = c_result_p
-def sg_qb_de_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_profile_16.restype = c_result_p
-def sg_qb_de_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_profile_8.restype = c_result_p
-def sg_qb_de_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_table_striped_profile_sat.restype = c_result_p
-def sg_qb_de_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_profile_64.restype = c_result_p
-def sg_qb_de_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_profile_32.restype = c_result_p
-def sg_qb_de_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_profile_16.restype = c_result_p
-def sg_qb_de_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_profile_8.restype = c_result_p
-def sg_qb_de_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qb_de_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_profile_64.restype = c_result_p
-def sg_qb_de_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_profile_32.restype = c_result_p
-def sg_qb_de_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_profile_16.restype = c_result_p
-def sg_qb_de_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_profile_8.restype = c_result_p
-def sg_qb_de_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qb_de_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_profile_64.restype = c_result_p
-def sg_qb_de_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_profile_32.restype = c_result_p
-def sg_qb_de_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_profile_16.restype = c_result_p
-def sg_qb_de_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_profile_8.restype = c_result_p
-def sg_qb_de_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_scan_profile_sat.restype = c_result_p
-def sg_qb_de_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_profile_64.restype = c_result_p
-def sg_qb_de_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_profile_32.restype = c_result_p
-def sg_qb_de_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_profile_16.restype = c_result_p
-def sg_qb_de_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_profile_8.restype = c_result_p
-def sg_qb_de_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_trace_striped_profile_sat.restype = c_result_p
-def sg_qb_de_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qb_de_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_profile_64.restype = c_result_p
-def sg_qb_de_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_profile_32.restype = c_result_p
-def sg_qb_de_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_profile_16.restype = c_result_p
-def sg_qb_de_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_profile_8.restype = c_result_p
-def sg_qb_de_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_scan_profile_sat.restype = c_result_p
-def sg_qb_de_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_profile_64.restype = c_result_p
-def sg_qb_de_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_profile_32.restype = c_result_p
-def sg_qb_de_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_profile_16.restype = c_result_p
-def sg_qb_de_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_profile_8.restype = c_result_p
-def sg_qb_de_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_striped_profile_sat.restype = c_result_p
-def sg_qb_de_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_profile_64.restype = c_result_p
-def sg_qb_de_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_profile_32.restype = c_result_p
-def sg_qb_de_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_profile_16.restype = c_result_p
-def sg_qb_de_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_profile_8.restype = c_result_p
-def sg_qb_de_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_scan_profile_sat.restype = c_result_p
-def sg_qb_de_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_profile_64.restype = c_result_p
-def sg_qb_de_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_profile_32.restype = c_result_p
-def sg_qb_de_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_profile_16.restype = c_result_p
-def sg_qb_de_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_profile_8.restype = c_result_p
-def sg_qb_de_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_table_striped_profile_sat.restype = c_result_p
-def sg_qb_de_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qb_de_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qb_de_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qb_de_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_profile_64.restype = c_result_p
-def sg_qe_db_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_profile_32.restype = c_result_p
-def sg_qe_db_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_profile_16.restype = c_result_p
-def sg_qe_db_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_profile_8.restype = c_result_p
-def sg_qe_db_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_scan_profile_sat.restype = c_result_p
-def sg_qe_db_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_profile_64.restype = c_result_p
-def sg_qe_db_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_profile_32.restype = c_result_p
-def sg_qe_db_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_profile_16.restype = c_result_p
-def sg_qe_db_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_profile_8.restype = c_result_p
-def sg_qe_db_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_striped_profile_sat.restype = c_result_p
-def sg_qe_db_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_profile_64.restype = c_result_p
-def sg_qe_db_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_profile_32.restype = c_result_p
-def sg_qe_db_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_profile_16.restype = c_result_p
-def sg_qe_db_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_profile_8.restype = c_result_p
-def sg_qe_db_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_scan_profile_sat.restype = c_result_p
-def sg_qe_db_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_profile_64.restype = c_result_p
-def sg_qe_db_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_profile_32.restype = c_result_p
-def sg_qe_db_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_profile_16.restype = c_result_p
-def sg_qe_db_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_profile_8.restype = c_result_p
-def sg_qe_db_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_table_striped_profile_sat.restype = c_result_p
-def sg_qe_db_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_profile_64.restype = c_result_p
-def sg_qe_db_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_profile_32.restype = c_result_p
-def sg_qe_db_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_profile_16.restype = c_result_p
-def sg_qe_db_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_profile_8.restype = c_result_p
-def sg_qe_db_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qe_db_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_profile_64.restype = c_result_p
-def sg_qe_db_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_profile_32.restype = c_result_p
-def sg_qe_db_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_profile_16.restype = c_result_p
-def sg_qe_db_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_profile_8.restype = c_result_p
-def sg_qe_db_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qe_db_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_trace_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_profile_64.restype = c_result_p
-def sg_qe_db_trace_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_profile_32.restype = c_result_p
-def sg_qe_db_trace_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_profile_16.restype = c_result_p
-def sg_qe_db_trace_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_profile_8.restype = c_result_p
-def sg_qe_db_trace_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_scan_profile_sat.restype = c_result_p
-def sg_qe_db_trace_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_profile_64.restype = c_result_p
-def sg_qe_db_trace_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_profile_32.restype = c_result_p
-def sg_qe_db_trace_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_profile_16.restype = c_result_p
-def sg_qe_db_trace_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_profile_8.restype = c_result_p
-def sg_qe_db_trace_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_trace_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_trace_striped_profile_sat.restype = c_result_p
-def sg_qe_db_trace_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_trace_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2), profile.s1, s2, profile.matrix)
-
-_lib.parasail_sg_qe_db_stats_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_profile_64.restype = c_result_p
-def sg_qe_db_stats_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_profile_32.restype = c_result_p
-def sg_qe_db_stats_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_profile_16.restype = c_result_p
-def sg_qe_db_stats_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_profile_8.restype = c_result_p
-def sg_qe_db_stats_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_scan_profile_sat.restype = c_result_p
-def sg_qe_db_stats_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_profile_64.restype = c_result_p
-def sg_qe_db_stats_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_profile_32.restype = c_result_p
-def sg_qe_db_stats_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_profile_16.restype = c_result_p
-def sg_qe_db_stats_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_profile_8.restype = c_result_p
-def sg_qe_db_stats_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_striped_profile_sat.restype = c_result_p
-def sg_qe_db_stats_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_profile_64.restype = c_result_p
-def sg_qe_db_stats_table_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_profile_32.restype = c_result_p
-def sg_qe_db_stats_table_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_profile_16.restype = c_result_p
-def sg_qe_db_stats_table_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_profile_8.restype = c_result_p
-def sg_qe_db_stats_table_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_scan_profile_sat.restype = c_result_p
-def sg_qe_db_stats_table_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_profile_64.restype = c_result_p
-def sg_qe_db_stats_table_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_profile_32.restype = c_result_p
-def sg_qe_db_stats_table_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_profile_16.restype = c_result_p
-def sg_qe_db_stats_table_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_profile_8.restype = c_result_p
-def sg_qe_db_stats_table_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_table_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_table_striped_profile_sat.restype = c_result_p
-def sg_qe_db_stats_table_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_table_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_64.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_32.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_16.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_8.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_sat.restype = c_result_p
-def sg_qe_db_stats_rowcol_scan_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_scan_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_64.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_64.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_profile_64(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_64(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_32.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_32.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_profile_32(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_32(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_16.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_16.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_profile_16(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_16(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_8.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_8.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_profile_8(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_8(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
-
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_sat.argtypes = _argtypes
-_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_sat.restype = c_result_p
-def sg_qe_db_stats_rowcol_striped_profile_sat(profile, s2, open, extend):
-    return Result(_lib.parasail_sg_qe_db_stats_rowcol_striped_profile_sat(
-        profile, b(s2), len(s2), open, extend),
-        len(profile.s1), len(s2))
+_pair_names = """
+nw nw_table nw_rowcol nw_trace nw_stats nw_stats_table
+nw_stats_rowcol sg sg_table sg_rowcol sg_trace sg_stats
+sg_stats_table sg_stats_rowcol sw sw_table sw_rowcol sw_trace
+sw_stats sw_stats_table sw_stats_rowcol sg_qb sg_qb_table sg_qb_rowcol
+sg_qb_trace sg_qb_stats sg_qb_stats_table sg_qb_stats_rowcol sg_qe sg_qe_table
+sg_qe_rowcol sg_qe_trace sg_qe_stats sg_qe_stats_table sg_qe_stats_rowcol sg_qx
+sg_qx_table sg_qx_rowcol sg_qx_trace sg_qx_stats sg_qx_stats_table sg_qx_stats_rowcol
+sg_db sg_db_table sg_db_rowcol sg_db_trace sg_db_stats sg_db_stats_table
+sg_db_stats_rowcol sg_de sg_de_table sg_de_rowcol sg_de_trace sg_de_stats
+sg_de_stats_table sg_de_stats_rowcol sg_dx sg_dx_table sg_dx_rowcol sg_dx_trace
+sg_dx_stats sg_dx_stats_table sg_dx_stats_rowcol sg_qb_de sg_qb_de_table sg_qb_de_rowcol
+sg_qb_de_trace sg_qb_de_stats sg_qb_de_stats_table sg_qb_de_stats_rowcol sg_qe_db sg_qe_db_table
+sg_qe_db_rowcol sg_qe_db_trace sg_qe_db_stats sg_qe_db_stats_table sg_qe_db_stats_rowcol nw_scan
+nw_table_scan nw_rowcol_scan nw_trace_scan nw_stats_scan nw_stats_table_scan nw_stats_rowcol_scan
+sg_scan sg_table_scan sg_rowcol_scan sg_trace_scan sg_stats_scan sg_stats_table_scan
+sg_stats_rowcol_scan sw_scan sw_table_scan sw_rowcol_scan sw_trace_scan sw_stats_scan
+sw_stats_table_scan sw_stats_rowcol_scan sg_qb_scan sg_qb_table_scan sg_qb_rowcol_scan sg_qb_trace_scan
+sg_qb_stats_scan sg_qb_stats_table_scan sg_qb_stats_rowcol_scan sg_qe_scan sg_qe_table_scan sg_qe_rowcol_scan
+sg_qe_trace_scan sg_qe_stats_scan sg_qe_stats_table_scan sg_qe_stats_rowcol_scan sg_qx_scan sg_qx_table_scan
+sg_qx_rowcol_scan sg_qx_trace_scan sg_qx_stats_scan sg_qx_stats_table_scan sg_qx_stats_rowcol_scan sg_db_scan
+sg_db_table_scan sg_db_rowcol_scan sg_db_trace_scan sg_db_stats_scan sg_db_stats_table_scan sg_db_stats_rowcol_scan
+sg_de_scan sg_de_table_scan sg_de_rowcol_scan sg_de_trace_scan sg_de_stats_scan sg_de_stats_table_scan
+sg_de_stats_rowcol_scan sg_dx_scan sg_dx_table_scan sg_dx_rowcol_scan sg_dx_trace_scan sg_dx_stats_scan
+sg_dx_stats_table_scan sg_dx_stats_rowcol_scan sg_qb_de_scan sg_qb_de_table_scan sg_qb_de_rowcol_scan sg_qb_de_trace_scan
+sg_qb_de_stats_scan sg_qb_de_stats_table_scan sg_qb_de_stats_rowcol_scan sg_qe_db_scan sg_qe_db_table_scan sg_qe_db_rowcol_scan
+sg_qe_db_trace_scan sg_qe_db_stats_scan sg_qe_db_stats_table_scan sg_qe_db_stats_rowcol_scan nw_scan_64 nw_scan_32
+nw_scan_16 nw_scan_8 nw_scan_sat nw_striped_64 nw_striped_32 nw_striped_16
+nw_striped_8 nw_striped_sat nw_diag_64 nw_diag_32 nw_diag_16 nw_diag_8
+nw_diag_sat nw_table_scan_64 nw_table_scan_32 nw_table_scan_16 nw_table_scan_8 nw_table_scan_sat
+nw_table_striped_64 nw_table_striped_32 nw_table_striped_16 nw_table_striped_8 nw_table_striped_sat nw_table_diag_64
+nw_table_diag_32 nw_table_diag_16 nw_table_diag_8 nw_table_diag_sat nw_rowcol_scan_64 nw_rowcol_scan_32
+nw_rowcol_scan_16 nw_rowcol_scan_8 nw_rowcol_scan_sat nw_rowcol_striped_64 nw_rowcol_striped_32 nw_rowcol_striped_16
+nw_rowcol_striped_8 nw_rowcol_striped_sat nw_rowcol_diag_64 nw_rowcol_diag_32 nw_rowcol_diag_16 nw_rowcol_diag_8
+nw_rowcol_diag_sat nw_trace_scan_64 nw_trace_scan_32 nw_trace_scan_16 nw_trace_scan_8 nw_trace_scan_sat
+nw_trace_striped_64 nw_trace_striped_32 nw_trace_striped_16 nw_trace_striped_8 nw_trace_striped_sat nw_trace_diag_64
+nw_trace_diag_32 nw_trace_diag_16 nw_trace_diag_8 nw_trace_diag_sat nw_stats_scan_64 nw_stats_scan_32
+nw_stats_scan_16 nw_stats_scan_8 nw_stats_scan_sat nw_stats_striped_64 nw_stats_striped_32 nw_stats_striped_16
+nw_stats_striped_8 nw_stats_striped_sat nw_stats_diag_64 nw_stats_diag_32 nw_stats_diag_16 nw_stats_diag_8
+nw_stats_diag_sat nw_stats_table_scan_64 nw_stats_table_scan_32 nw_stats_table_scan_16 nw_stats_table_scan_8 nw_stats_table_scan_sat
+nw_stats_table_striped_64 nw_stats_table_striped_32 nw_stats_table_striped_16 nw_stats_table_striped_8 nw_stats_table_striped_sat nw_stats_table_diag_64
+nw_stats_table_diag_32 nw_stats_table_diag_16 nw_stats_table_diag_8 nw_stats_table_diag_sat nw_stats_rowcol_scan_64 nw_stats_rowcol_scan_32
+nw_stats_rowcol_scan_16 nw_stats_rowcol_scan_8 nw_stats_rowcol_scan_sat nw_stats_rowcol_striped_64 nw_stats_rowcol_striped_32 nw_stats_rowcol_striped_16
+nw_stats_rowcol_striped_8 nw_stats_rowcol_striped_sat nw_stats_rowcol_diag_64 nw_stats_rowcol_diag_32 nw_stats_rowcol_diag_16 nw_stats_rowcol_diag_8
+nw_stats_rowcol_diag_sat sg_scan_64 sg_scan_32 sg_scan_16 sg_scan_8 sg_scan_sat
+sg_striped_64 sg_striped_32 sg_striped_16 sg_striped_8 sg_striped_sat sg_diag_64
+sg_diag_32 sg_diag_16 sg_diag_8 sg_diag_sat sg_table_scan_64 sg_table_scan_32
+sg_table_scan_16 sg_table_scan_8 sg_table_scan_sat sg_table_striped_64 sg_table_striped_32 sg_table_striped_16
+sg_table_striped_8 sg_table_striped_sat sg_table_diag_64 sg_table_diag_32 sg_table_diag_16 sg_table_diag_8
+sg_table_diag_sat sg_rowcol_scan_64 sg_rowcol_scan_32 sg_rowcol_scan_16 sg_rowcol_scan_8 sg_rowcol_scan_sat
+sg_rowcol_striped_64 sg_rowcol_striped_32 sg_rowcol_striped_16 sg_rowcol_striped_8 sg_rowcol_striped_sat sg_rowcol_diag_64
+sg_rowcol_diag_32 sg_rowcol_diag_16 sg_rowcol_diag_8 sg_rowcol_diag_sat sg_trace_scan_64 sg_trace_scan_32
+sg_trace_scan_16 sg_trace_scan_8 sg_trace_scan_sat sg_trace_striped_64 sg_trace_striped_32 sg_trace_striped_16
+sg_trace_striped_8 sg_trace_striped_sat sg_trace_diag_64 sg_trace_diag_32 sg_trace_diag_16 sg_trace_diag_8
+sg_trace_diag_sat sg_stats_scan_64 sg_stats_scan_32 sg_stats_scan_16 sg_stats_scan_8 sg_stats_scan_sat
+sg_stats_striped_64 sg_stats_striped_32 sg_stats_striped_16 sg_stats_striped_8 sg_stats_striped_sat sg_stats_diag_64
+sg_stats_diag_32 sg_stats_diag_16 sg_stats_diag_8 sg_stats_diag_sat sg_stats_table_scan_64 sg_stats_table_scan_32
+sg_stats_table_scan_16 sg_stats_table_scan_8 sg_stats_table_scan_sat sg_stats_table_striped_64 sg_stats_table_striped_32 sg_stats_table_striped_16
+sg_stats_table_striped_8 sg_stats_table_striped_sat sg_stats_table_diag_64 sg_stats_table_diag_32 sg_stats_table_diag_16 sg_stats_table_diag_8
+sg_stats_table_diag_sat sg_stats_rowcol_scan_64 sg_stats_rowcol_scan_32 sg_stats_rowcol_scan_16 sg_stats_rowcol_scan_8 sg_stats_rowcol_scan_sat
+sg_stats_rowcol_striped_64 sg_stats_rowcol_striped_32 sg_stats_rowcol_striped_16 sg_stats_rowcol_striped_8 sg_stats_rowcol_striped_sat sg_stats_rowcol_diag_64
+sg_stats_rowcol_diag_32 sg_stats_rowcol_diag_16 sg_stats_rowcol_diag_8 sg_stats_rowcol_diag_sat sw_scan_64 sw_scan_32
+sw_scan_16 sw_scan_8 sw_scan_sat sw_striped_64 sw_striped_32 sw_striped_16
+sw_striped_8 sw_striped_sat sw_diag_64 sw_diag_32 sw_diag_16 sw_diag_8
+sw_diag_sat sw_table_scan_64 sw_table_scan_32 sw_table_scan_16 sw_table_scan_8 sw_table_scan_sat
+sw_table_striped_64 sw_table_striped_32 sw_table_striped_16 sw_table_striped_8 sw_table_striped_sat sw_table_diag_64
+sw_table_diag_32 sw_table_diag_16 sw_table_diag_8 sw_table_diag_sat sw_rowcol_scan_64 sw_rowcol_scan_32
+sw_rowcol_scan_16 sw_rowcol_scan_8 sw_rowcol_scan_sat sw_rowcol_striped_64 sw_rowcol_striped_32 sw_rowcol_striped_16
+sw_rowcol_striped_8 sw_rowcol_striped_sat sw_rowcol_diag_64 sw_rowcol_diag_32 sw_rowcol_diag_16 sw_rowcol_diag_8
+sw_rowcol_diag_sat sw_trace_scan_64 sw_trace_scan_32 sw_trace_scan_16 sw_trace_scan_8 sw_trace_scan_sat
+sw_trace_striped_64 sw_trace_striped_32 sw_trace_striped_16 sw_trace_striped_8 sw_trace_striped_sat sw_trace_diag_64
+sw_trace_diag_32 sw_trace_diag_16 sw_trace_diag_8 sw_trace_diag_sat sw_stats_scan_64 sw_stats_scan_32
+sw_stats_scan_16 sw_stats_scan_8 sw_stats_scan_sat sw_stats_striped_64 sw_stats_striped_32 sw_stats_striped_16
+sw_stats_striped_8 sw_stats_striped_sat sw_stats_diag_64 sw_stats_diag_32 sw_stats_diag_16 sw_stats_diag_8
+sw_stats_diag_sat sw_stats_table_scan_64 sw_stats_table_scan_32 sw_stats_table_scan_16 sw_stats_table_scan_8 sw_stats_table_scan_sat
+sw_stats_table_striped_64 sw_stats_table_striped_32 sw_stats_table_striped_16 sw_stats_table_striped_8 sw_stats_table_striped_sat sw_stats_table_diag_64
+sw_stats_table_diag_32 sw_stats_table_diag_16 sw_stats_table_diag_8 sw_stats_table_diag_sat sw_stats_rowcol_scan_64 sw_stats_rowcol_scan_32
+sw_stats_rowcol_scan_16 sw_stats_rowcol_scan_8 sw_stats_rowcol_scan_sat sw_stats_rowcol_striped_64 sw_stats_rowcol_striped_32 sw_stats_rowcol_striped_16
+sw_stats_rowcol_striped_8 sw_stats_rowcol_striped_sat sw_stats_rowcol_diag_64 sw_stats_rowcol_diag_32 sw_stats_rowcol_diag_16 sw_stats_rowcol_diag_8
+sw_stats_rowcol_diag_sat sg_qb_scan_64 sg_qb_scan_32 sg_qb_scan_16 sg_qb_scan_8 sg_qb_scan_sat
+sg_qb_striped_64 sg_qb_striped_32 sg_qb_striped_16 sg_qb_striped_8 sg_qb_striped_sat sg_qb_diag_64
+sg_qb_diag_32 sg_qb_diag_16 sg_qb_diag_8 sg_qb_diag_sat sg_qb_table_scan_64 sg_qb_table_scan_32
+sg_qb_table_scan_16 sg_qb_table_scan_8 sg_qb_table_scan_sat sg_qb_table_striped_64 sg_qb_table_striped_32 sg_qb_table_striped_16
+sg_qb_table_striped_8 sg_qb_table_striped_sat sg_qb_table_diag_64 sg_qb_table_diag_32 sg_qb_table_diag_16 sg_qb_table_diag_8
+sg_qb_table_diag_sat sg_qb_rowcol_scan_64 sg_qb_rowcol_scan_32 sg_qb_rowcol_scan_16 sg_qb_rowcol_scan_8 sg_qb_rowcol_scan_sat
+sg_qb_rowcol_striped_64 sg_qb_rowcol_striped_32 sg_qb_rowcol_striped_16 sg_qb_rowcol_striped_8 sg_qb_rowcol_striped_sat sg_qb_rowcol_diag_64
+sg_qb_rowcol_diag_32 sg_qb_rowcol_diag_16 sg_qb_rowcol_diag_8 sg_qb_rowcol_diag_sat sg_qb_trace_scan_64 sg_qb_trace_scan_32
+sg_qb_trace_scan_16 sg_qb_trace_scan_8 sg_qb_trace_scan_sat sg_qb_trace_striped_64 sg_qb_trace_striped_32 sg_qb_trace_striped_16
+sg_qb_trace_striped_8 sg_qb_trace_striped_sat sg_qb_trace_diag_64 sg_qb_trace_diag_32 sg_qb_trace_diag_16 sg_qb_trace_diag_8
+sg_qb_trace_diag_sat sg_qb_stats_scan_64 sg_qb_stats_scan_32 sg_qb_stats_scan_16 sg_qb_stats_scan_8 sg_qb_stats_scan_sat
+sg_qb_stats_striped_64 sg_qb_stats_striped_32 sg_qb_stats_striped_16 sg_qb_stats_striped_8 sg_qb_stats_striped_sat sg_qb_stats_diag_64
+sg_qb_stats_diag_32 sg_qb_stats_diag_16 sg_qb_stats_diag_8 sg_qb_stats_diag_sat sg_qb_stats_table_scan_64 sg_qb_stats_table_scan_32
+sg_qb_stats_table_scan_16 sg_qb_stats_table_scan_8 sg_qb_stats_table_scan_sat sg_qb_stats_table_striped_64 sg_qb_stats_table_striped_32 sg_qb_stats_table_striped_16
+sg_qb_stats_table_striped_8 sg_qb_stats_table_striped_sat sg_qb_stats_table_diag_64 sg_qb_stats_table_diag_32 sg_qb_stats_table_diag_16 sg_qb_stats_table_diag_8
+sg_qb_stats_table_diag_sat sg_qb_stats_rowcol_scan_64 sg_qb_stats_rowcol_scan_32 sg_qb_stats_rowcol_scan_16 sg_qb_stats_rowcol_scan_8 sg_qb_stats_rowcol_scan_sat
+sg_qb_stats_rowcol_striped_64 sg_qb_stats_rowcol_striped_32 sg_qb_stats_rowcol_striped_16 sg_qb_stats_rowcol_striped_8 sg_qb_stats_rowcol_striped_sat sg_qb_stats_rowcol_diag_64
+sg_qb_stats_rowcol_diag_32 sg_qb_stats_rowcol_diag_16 sg_qb_stats_rowcol_diag_8 sg_qb_stats_rowcol_diag_sat sg_qe_scan_64 sg_qe_scan_32
+sg_qe_scan_16 sg_qe_scan_8 sg_qe_scan_sat sg_qe_striped_64 sg_qe_striped_32 sg_qe_striped_16
+sg_qe_striped_8 sg_qe_striped_sat sg_qe_diag_64 sg_qe_diag_32 sg_qe_diag_16 sg_qe_diag_8
+sg_qe_diag_sat sg_qe_table_scan_64 sg_qe_table_scan_32 sg_qe_table_scan_16 sg_qe_table_scan_8 sg_qe_table_scan_sat
+sg_qe_table_striped_64 sg_qe_table_striped_32 sg_qe_table_striped_16 sg_qe_table_striped_8 sg_qe_table_striped_sat sg_qe_table_diag_64
+sg_qe_table_diag_32 sg_qe_table_diag_16 sg_qe_table_diag_8 sg_qe_table_diag_sat sg_qe_rowcol_scan_64 sg_qe_rowcol_scan_32
+sg_qe_rowcol_scan_16 sg_qe_rowcol_scan_8 sg_qe_rowcol_scan_sat sg_qe_rowcol_striped_64 sg_qe_rowcol_striped_32 sg_qe_rowcol_striped_16
+sg_qe_rowcol_striped_8 sg_qe_rowcol_striped_sat sg_qe_rowcol_diag_64 sg_qe_rowcol_diag_32 sg_qe_rowcol_diag_16 sg_qe_rowcol_diag_8
+sg_qe_rowcol_diag_sat sg_qe_trace_scan_64 sg_qe_trace_scan_32 sg_qe_trace_scan_16 sg_qe_trace_scan_8 sg_qe_trace_scan_sat
+sg_qe_trace_striped_64 sg_qe_trace_striped_32 sg_qe_trace_striped_16 sg_qe_trace_striped_8 sg_qe_trace_striped_sat sg_qe_trace_diag_64
+sg_qe_trace_diag_32 sg_qe_trace_diag_16 sg_qe_trace_diag_8 sg_qe_trace_diag_sat sg_qe_stats_scan_64 sg_qe_stats_scan_32
+sg_qe_stats_scan_16 sg_qe_stats_scan_8 sg_qe_stats_scan_sat sg_qe_stats_striped_64 sg_qe_stats_striped_32 sg_qe_stats_striped_16
+sg_qe_stats_striped_8 sg_qe_stats_striped_sat sg_qe_stats_diag_64 sg_qe_stats_diag_32 sg_qe_stats_diag_16 sg_qe_stats_diag_8
+sg_qe_stats_diag_sat sg_qe_stats_table_scan_64 sg_qe_stats_table_scan_32 sg_qe_stats_table_scan_16 sg_qe_stats_table_scan_8 sg_qe_stats_table_scan_sat
+sg_qe_stats_table_striped_64 sg_qe_stats_table_striped_32 sg_qe_stats_table_striped_16 sg_qe_stats_table_striped_8 sg_qe_stats_table_striped_sat sg_qe_stats_table_diag_64
+sg_qe_stats_table_diag_32 sg_qe_stats_table_diag_16 sg_qe_stats_table_diag_8 sg_qe_stats_table_diag_sat sg_qe_stats_rowcol_scan_64 sg_qe_stats_rowcol_scan_32
+sg_qe_stats_rowcol_scan_16 sg_qe_stats_rowcol_scan_8 sg_qe_stats_rowcol_scan_sat sg_qe_stats_rowcol_striped_64 sg_qe_stats_rowcol_striped_32 sg_qe_stats_rowcol_striped_16
+sg_qe_stats_rowcol_striped_8 sg_qe_stats_rowcol_striped_sat sg_qe_stats_rowcol_diag_64 sg_qe_stats_rowcol_diag_32 sg_qe_stats_rowcol_diag_16 sg_qe_stats_rowcol_diag_8
+sg_qe_stats_rowcol_diag_sat sg_qx_scan_64 sg_qx_scan_32 sg_qx_scan_16 sg_qx_scan_8 sg_qx_scan_sat
+sg_qx_striped_64 sg_qx_striped_32 sg_qx_striped_16 sg_qx_striped_8 sg_qx_striped_sat sg_qx_diag_64
+sg_qx_diag_32 sg_qx_diag_16 sg_qx_diag_8 sg_qx_diag_sat sg_qx_table_scan_64 sg_qx_table_scan_32
+sg_qx_table_scan_16 sg_qx_table_scan_8 sg_qx_table_scan_sat sg_qx_table_striped_64 sg_qx_table_striped_32 sg_qx_table_striped_16
+sg_qx_table_striped_8 sg_qx_table_striped_sat sg_qx_table_diag_64 sg_qx_table_diag_32 sg_qx_table_diag_16 sg_qx_table_diag_8
+sg_qx_table_diag_sat sg_qx_rowcol_scan_64 sg_qx_rowcol_scan_32 sg_qx_rowcol_scan_16 sg_qx_rowcol_scan_8 sg_qx_rowcol_scan_sat
+sg_qx_rowcol_striped_64 sg_qx_rowcol_striped_32 sg_qx_rowcol_striped_16 sg_qx_rowcol_striped_8 sg_qx_rowcol_striped_sat sg_qx_rowcol_diag_64
+sg_qx_rowcol_diag_32 sg_qx_rowcol_diag_16 sg_qx_rowcol_diag_8 sg_qx_rowcol_diag_sat sg_qx_trace_scan_64 sg_qx_trace_scan_32
+sg_qx_trace_scan_16 sg_qx_trace_scan_8 sg_qx_trace_scan_sat sg_qx_trace_striped_64 sg_qx_trace_striped_32 sg_qx_trace_striped_16
+sg_qx_trace_striped_8 sg_qx_trace_striped_sat sg_qx_trace_diag_64 sg_qx_trace_diag_32 sg_qx_trace_diag_16 sg_qx_trace_diag_8
+sg_qx_trace_diag_sat sg_qx_stats_scan_64 sg_qx_stats_scan_32 sg_qx_stats_scan_16 sg_qx_stats_scan_8 sg_qx_stats_scan_sat
+sg_qx_stats_striped_64 sg_qx_stats_striped_32 sg_qx_stats_striped_16 sg_qx_stats_striped_8 sg_qx_stats_striped_sat sg_qx_stats_diag_64
+sg_qx_stats_diag_32 sg_qx_stats_diag_16 sg_qx_stats_diag_8 sg_qx_stats_diag_sat sg_qx_stats_table_scan_64 sg_qx_stats_table_scan_32
+sg_qx_stats_table_scan_16 sg_qx_stats_table_scan_8 sg_qx_stats_table_scan_sat sg_qx_stats_table_striped_64 sg_qx_stats_table_striped_32 sg_qx_stats_table_striped_16
+sg_qx_stats_table_striped_8 sg_qx_stats_table_striped_sat sg_qx_stats_table_diag_64 sg_qx_stats_table_diag_32 sg_qx_stats_table_diag_16 sg_qx_stats_table_diag_8
+sg_qx_stats_table_diag_sat sg_qx_stats_rowcol_scan_64 sg_qx_stats_rowcol_scan_32 sg_qx_stats_rowcol_scan_16 sg_qx_stats_rowcol_scan_8 sg_qx_stats_rowcol_scan_sat
+sg_qx_stats_rowcol_striped_64 sg_qx_stats_rowcol_striped_32 sg_qx_stats_rowcol_striped_16 sg_qx_stats_rowcol_striped_8 sg_qx_stats_rowcol_striped_sat sg_qx_stats_rowcol_diag_64
+sg_qx_stats_rowcol_diag_32 sg_qx_stats_rowcol_diag_16 sg_qx_stats_rowcol_diag_8 sg_qx_stats_rowcol_diag_sat sg_db_scan_64 sg_db_scan_32
+sg_db_scan_16 sg_db_scan_8 sg_db_scan_sat sg_db_striped_64 sg_db_striped_32 sg_db_striped_16
+sg_db_striped_8 sg_db_striped_sat sg_db_diag_64 sg_db_diag_32 sg_db_diag_16 sg_db_diag_8
+sg_db_diag_sat sg_db_table_scan_64 sg_db_table_scan_32 sg_db_table_scan_16 sg_db_table_scan_8 sg_db_table_scan_sat
+sg_db_table_striped_64 sg_db_table_striped_32 sg_db_table_striped_16 sg_db_table_striped_8 sg_db_table_striped_sat sg_db_table_diag_64
+sg_db_table_diag_32 sg_db_table_diag_16 sg_db_table_diag_8 sg_db_table_diag_sat sg_db_rowcol_scan_64 sg_db_rowcol_scan_32
+sg_db_rowcol_scan_16 sg_db_rowcol_scan_8 sg_db_rowcol_scan_sat sg_db_rowcol_striped_64 sg_db_rowcol_striped_32 sg_db_rowcol_striped_16
+sg_db_rowcol_striped_8 sg_db_rowcol_striped_sat sg_db_rowcol_diag_64 sg_db_rowcol_diag_32 sg_db_rowcol_diag_16 sg_db_rowcol_diag_8
+sg_db_rowcol_diag_sat sg_db_trace_scan_64 sg_db_trace_scan_32 sg_db_trace_scan_16 sg_db_trace_scan_8 sg_db_trace_scan_sat
+sg_db_trace_striped_64 sg_db_trace_striped_32 sg_db_trace_striped_16 sg_db_trace_striped_8 sg_db_trace_striped_sat sg_db_trace_diag_64
+sg_db_trace_diag_32 sg_db_trace_diag_16 sg_db_trace_diag_8 sg_db_trace_diag_sat sg_db_stats_scan_64 sg_db_stats_scan_32
+sg_db_stats_scan_16 sg_db_stats_scan_8 sg_db_stats_scan_sat sg_db_stats_striped_64 sg_db_stats_striped_32 sg_db_stats_striped_16
+sg_db_stats_striped_8 sg_db_stats_striped_sat sg_db_stats_diag_64 sg_db_stats_diag_32 sg_db_stats_diag_16 sg_db_stats_diag_8
+sg_db_stats_diag_sat sg_db_stats_table_scan_64 sg_db_stats_table_scan_32 sg_db_stats_table_scan_16 sg_db_stats_table_scan_8 sg_db_stats_table_scan_sat
+sg_db_stats_table_striped_64 sg_db_stats_table_striped_32 sg_db_stats_table_striped_16 sg_db_stats_table_striped_8 sg_db_stats_table_striped_sat sg_db_stats_table_diag_64
+sg_db_stats_table_diag_32 sg_db_stats_table_diag_16 sg_db_stats_table_diag_8 sg_db_stats_table_diag_sat sg_db_stats_rowcol_scan_64 sg_db_stats_rowcol_scan_32
+sg_db_stats_rowcol_scan_16 sg_db_stats_rowcol_scan_8 sg_db_stats_rowcol_scan_sat sg_db_stats_rowcol_striped_64 sg_db_stats_rowcol_striped_32 sg_db_stats_rowcol_striped_16
+sg_db_stats_rowcol_striped_8 sg_db_stats_rowcol_striped_sat sg_db_stats_rowcol_diag_64 sg_db_stats_rowcol_diag_32 sg_db_stats_rowcol_diag_16 sg_db_stats_rowcol_diag_8
+sg_db_stats_rowcol_diag_sat sg_de_scan_64 sg_de_scan_32 sg_de_scan_16 sg_de_scan_8 sg_de_scan_sat
+sg_de_striped_64 sg_de_striped_32 sg_de_striped_16 sg_de_striped_8 sg_de_striped_sat sg_de_diag_64
+sg_de_diag_32 sg_de_diag_16 sg_de_diag_8 sg_de_diag_sat sg_de_table_scan_64 sg_de_table_scan_32
+sg_de_table_scan_16 sg_de_table_scan_8 sg_de_table_scan_sat sg_de_table_striped_64 sg_de_table_striped_32 sg_de_table_striped_16
+sg_de_table_striped_8 sg_de_table_striped_sat sg_de_table_diag_64 sg_de_table_diag_32 sg_de_table_diag_16 sg_de_table_diag_8
+sg_de_table_diag_sat sg_de_rowcol_scan_64 sg_de_rowcol_scan_32 sg_de_rowcol_scan_16 sg_de_rowcol_scan_8 sg_de_rowcol_scan_sat
+sg_de_rowcol_striped_64 sg_de_rowcol_striped_32 sg_de_rowcol_striped_16 sg_de_rowcol_striped_8 sg_de_rowcol_striped_sat sg_de_rowcol_diag_64
+sg_de_rowcol_diag_32 sg_de_rowcol_diag_16 sg_de_rowcol_diag_8 sg_de_rowcol_diag_sat sg_de_trace_scan_64 sg_de_trace_scan_32
+sg_de_trace_scan_16 sg_de_trace_scan_8 sg_de_trace_scan_sat sg_de_trace_striped_64 sg_de_trace_striped_32 sg_de_trace_striped_16
+sg_de_trace_striped_8 sg_de_trace_striped_sat sg_de_trace_diag_64 sg_de_trace_diag_32 sg_de_trace_diag_16 sg_de_trace_diag_8
+sg_de_trace_diag_sat sg_de_stats_scan_64 sg_de_stats_scan_32 sg_de_stats_scan_16 sg_de_stats_scan_8 sg_de_stats_scan_sat
+sg_de_stats_striped_64 sg_de_stats_striped_32 sg_de_stats_striped_16 sg_de_stats_striped_8 sg_de_stats_striped_sat sg_de_stats_diag_64
+sg_de_stats_diag_32 sg_de_stats_diag_16 sg_de_stats_diag_8 sg_de_stats_diag_sat sg_de_stats_table_scan_64 sg_de_stats_table_scan_32
+sg_de_stats_table_scan_16 sg_de_stats_table_scan_8 sg_de_stats_table_scan_sat sg_de_stats_table_striped_64 sg_de_stats_table_striped_32 sg_de_stats_table_striped_16
+sg_de_stats_table_striped_8 sg_de_stats_table_striped_sat sg_de_stats_table_diag_64 sg_de_stats_table_diag_32 sg_de_stats_table_diag_16 sg_de_stats_table_diag_8
+sg_de_stats_table_diag_sat sg_de_stats_rowcol_scan_64 sg_de_stats_rowcol_scan_32 sg_de_stats_rowcol_scan_16 sg_de_stats_rowcol_scan_8 sg_de_stats_rowcol_scan_sat
+sg_de_stats_rowcol_striped_64 sg_de_stats_rowcol_striped_32 sg_de_stats_rowcol_striped_16 sg_de_stats_rowcol_striped_8 sg_de_stats_rowcol_striped_sat sg_de_stats_rowcol_diag_64
+sg_de_stats_rowcol_diag_32 sg_de_stats_rowcol_diag_16 sg_de_stats_rowcol_diag_8 sg_de_stats_rowcol_diag_sat sg_dx_scan_64 sg_dx_scan_32
+sg_dx_scan_16 sg_dx_scan_8 sg_dx_scan_sat sg_dx_striped_64 sg_dx_striped_32 sg_dx_striped_16
+sg_dx_striped_8 sg_dx_striped_sat sg_dx_diag_64 sg_dx_diag_32 sg_dx_diag_16 sg_dx_diag_8
+sg_dx_diag_sat sg_dx_table_scan_64 sg_dx_table_scan_32 sg_dx_table_scan_16 sg_dx_table_scan_8 sg_dx_table_scan_sat
+sg_dx_table_striped_64 sg_dx_table_striped_32 sg_dx_table_striped_16 sg_dx_table_striped_8 sg_dx_table_striped_sat sg_dx_table_diag_64
+sg_dx_table_diag_32 sg_dx_table_diag_16 sg_dx_table_diag_8 sg_dx_table_diag_sat sg_dx_rowcol_scan_64 sg_dx_rowcol_scan_32
+sg_dx_rowcol_scan_16 sg_dx_rowcol_scan_8 sg_dx_rowcol_scan_sat sg_dx_rowcol_striped_64 sg_dx_rowcol_striped_32 sg_dx_rowcol_striped_16
+sg_dx_rowcol_striped_8 sg_dx_rowcol_striped_sat sg_dx_rowcol_diag_64 sg_dx_rowcol_diag_32 sg_dx_rowcol_diag_16 sg_dx_rowcol_diag_8
+sg_dx_rowcol_diag_sat sg_dx_trace_scan_64 sg_dx_trace_scan_32 sg_dx_trace_scan_16 sg_dx_trace_scan_8 sg_dx_trace_scan_sat
+sg_dx_trace_striped_64 sg_dx_trace_striped_32 sg_dx_trace_striped_16 sg_dx_trace_striped_8 sg_dx_trace_striped_sat sg_dx_trace_diag_64
+sg_dx_trace_diag_32 sg_dx_trace_diag_16 sg_dx_trace_diag_8 sg_dx_trace_diag_sat sg_dx_stats_scan_64 sg_dx_stats_scan_32
+sg_dx_stats_scan_16 sg_dx_stats_scan_8 sg_dx_stats_scan_sat sg_dx_stats_striped_64 sg_dx_stats_striped_32 sg_dx_stats_striped_16
+sg_dx_stats_striped_8 sg_dx_stats_striped_sat sg_dx_stats_diag_64 sg_dx_stats_diag_32 sg_dx_stats_diag_16 sg_dx_stats_diag_8
+sg_dx_stats_diag_sat sg_dx_stats_table_scan_64 sg_dx_stats_table_scan_32 sg_dx_stats_table_scan_16 sg_dx_stats_table_scan_8 sg_dx_stats_table_scan_sat
+sg_dx_stats_table_striped_64 sg_dx_stats_table_striped_32 sg_dx_stats_table_striped_16 sg_dx_stats_table_striped_8 sg_dx_stats_table_striped_sat sg_dx_stats_table_diag_64
+sg_dx_stats_table_diag_32 sg_dx_stats_table_diag_16 sg_dx_stats_table_diag_8 sg_dx_stats_table_diag_sat sg_dx_stats_rowcol_scan_64 sg_dx_stats_rowcol_scan_32
+sg_dx_stats_rowcol_scan_16 sg_dx_stats_rowcol_scan_8 sg_dx_stats_rowcol_scan_sat sg_dx_stats_rowcol_striped_64 sg_dx_stats_rowcol_striped_32 sg_dx_stats_rowcol_striped_16
+sg_dx_stats_rowcol_striped_8 sg_dx_stats_rowcol_striped_sat sg_dx_stats_rowcol_diag_64 sg_dx_stats_rowcol_diag_32 sg_dx_stats_rowcol_diag_16 sg_dx_stats_rowcol_diag_8
+sg_dx_stats_rowcol_diag_sat sg_qb_de_scan_64 sg_qb_de_scan_32 sg_qb_de_scan_16 sg_qb_de_scan_8 sg_qb_de_scan_sat
+sg_qb_de_striped_64 sg_qb_de_striped_32 sg_qb_de_striped_16 sg_qb_de_striped_8 sg_qb_de_striped_sat sg_qb_de_diag_64
+sg_qb_de_diag_32 sg_qb_de_diag_16 sg_qb_de_diag_8 sg_qb_de_diag_sat sg_qb_de_table_scan_64 sg_qb_de_table_scan_32
+sg_qb_de_table_scan_16 sg_qb_de_table_scan_8 sg_qb_de_table_scan_sat sg_qb_de_table_striped_64 sg_qb_de_table_striped_32 sg_qb_de_table_striped_16
+sg_qb_de_table_striped_8 sg_qb_de_table_striped_sat sg_qb_de_table_diag_64 sg_qb_de_table_diag_32 sg_qb_de_table_diag_16 sg_qb_de_table_diag_8
+sg_qb_de_table_diag_sat sg_qb_de_rowcol_scan_64 sg_qb_de_rowcol_scan_32 sg_qb_de_rowcol_scan_16 sg_qb_de_rowcol_scan_8 sg_qb_de_rowcol_scan_sat
+sg_qb_de_rowcol_striped_64 sg_qb_de_rowcol_striped_32 sg_qb_de_rowcol_striped_16 sg_qb_de_rowcol_striped_8 sg_qb_de_rowcol_striped_sat sg_qb_de_rowcol_diag_64
+sg_qb_de_rowcol_diag_32 sg_qb_de_rowcol_diag_16 sg_qb_de_rowcol_diag_8 sg_qb_de_rowcol_diag_sat sg_qb_de_trace_scan_64 sg_qb_de_trace_scan_32
+sg_qb_de_trace_scan_16 sg_qb_de_trace_scan_8 sg_qb_de_trace_scan_sat sg_qb_de_trace_striped_64 sg_qb_de_trace_striped_32 sg_qb_de_trace_striped_16
+sg_qb_de_trace_striped_8 sg_qb_de_trace_striped_sat sg_qb_de_trace_diag_64 sg_qb_de_trace_diag_32 sg_qb_de_trace_diag_16 sg_qb_de_trace_diag_8
+sg_qb_de_trace_diag_sat sg_qb_de_stats_scan_64 sg_qb_de_stats_scan_32 sg_qb_de_stats_scan_16 sg_qb_de_stats_scan_8 sg_qb_de_stats_scan_sat
+sg_qb_de_stats_striped_64 sg_qb_de_stats_striped_32 sg_qb_de_stats_striped_16 sg_qb_de_stats_striped_8 sg_qb_de_stats_striped_sat sg_qb_de_stats_diag_64
+sg_qb_de_stats_diag_32 sg_qb_de_stats_diag_16 sg_qb_de_stats_diag_8 sg_qb_de_stats_diag_sat sg_qb_de_stats_table_scan_64 sg_qb_de_stats_table_scan_32
+sg_qb_de_stats_table_scan_16 sg_qb_de_stats_table_scan_8 sg_qb_de_stats_table_scan_sat sg_qb_de_stats_table_striped_64 sg_qb_de_stats_table_striped_32 sg_qb_de_stats_table_striped_16
+sg_qb_de_stats_table_striped_8 sg_qb_de_stats_table_striped_sat sg_qb_de_stats_table_diag_64 sg_qb_de_stats_table_diag_32 sg_qb_de_stats_table_diag_16 sg_qb_de_stats_table_diag_8
+sg_qb_de_stats_table_diag_sat sg_qb_de_stats_rowcol_scan_64 sg_qb_de_stats_rowcol_scan_32 sg_qb_de_stats_rowcol_scan_16 sg_qb_de_stats_rowcol_scan_8 sg_qb_de_stats_rowcol_scan_sat
+sg_qb_de_stats_rowcol_striped_64 sg_qb_de_stats_rowcol_striped_32 sg_qb_de_stats_rowcol_striped_16 sg_qb_de_stats_rowcol_striped_8 sg_qb_de_stats_rowcol_striped_sat sg_qb_de_stats_rowcol_diag_64
+sg_qb_de_stats_rowcol_diag_32 sg_qb_de_stats_rowcol_diag_16 sg_qb_de_stats_rowcol_diag_8 sg_qb_de_stats_rowcol_diag_sat sg_qe_db_scan_64 sg_qe_db_scan_32
+sg_qe_db_scan_16 sg_qe_db_scan_8 sg_qe_db_scan_sat sg_qe_db_striped_64 sg_qe_db_striped_32 sg_qe_db_striped_16
+sg_qe_db_striped_8 sg_qe_db_striped_sat sg_qe_db_diag_64 sg_qe_db_diag_32 sg_qe_db_diag_16 sg_qe_db_diag_8
+sg_qe_db_diag_sat sg_qe_db_table_scan_64 sg_qe_db_table_scan_32 sg_qe_db_table_scan_16 sg_qe_db_table_scan_8 sg_qe_db_table_scan_sat
+sg_qe_db_table_striped_64 sg_qe_db_table_striped_32 sg_qe_db_table_striped_16 sg_qe_db_table_striped_8 sg_qe_db_table_striped_sat sg_qe_db_table_diag_64
+sg_qe_db_table_diag_32 sg_qe_db_table_diag_16 sg_qe_db_table_diag_8 sg_qe_db_table_diag_sat sg_qe_db_rowcol_scan_64 sg_qe_db_rowcol_scan_32
+sg_qe_db_rowcol_scan_16 sg_qe_db_rowcol_scan_8 sg_qe_db_rowcol_scan_sat sg_qe_db_rowcol_striped_64 sg_qe_db_rowcol_striped_32 sg_qe_db_rowcol_striped_16
+sg_qe_db_rowcol_striped_8 sg_qe_db_rowcol_striped_sat sg_qe_db_rowcol_diag_64 sg_qe_db_rowcol_diag_32 sg_qe_db_rowcol_diag_16 sg_qe_db_rowcol_diag_8
+sg_qe_db_rowcol_diag_sat sg_qe_db_trace_scan_64 sg_qe_db_trace_scan_32 sg_qe_db_trace_scan_16 sg_qe_db_trace_scan_8 sg_qe_db_trace_scan_sat
+sg_qe_db_trace_striped_64 sg_qe_db_trace_striped_32 sg_qe_db_trace_striped_16 sg_qe_db_trace_striped_8 sg_qe_db_trace_striped_sat sg_qe_db_trace_diag_64
+sg_qe_db_trace_diag_32 sg_qe_db_trace_diag_16 sg_qe_db_trace_diag_8 sg_qe_db_trace_diag_sat sg_qe_db_stats_scan_64 sg_qe_db_stats_scan_32
+sg_qe_db_stats_scan_16 sg_qe_db_stats_scan_8 sg_qe_db_stats_scan_sat sg_qe_db_stats_striped_64 sg_qe_db_stats_striped_32 sg_qe_db_stats_striped_16
+sg_qe_db_stats_striped_8 sg_qe_db_stats_striped_sat sg_qe_db_stats_diag_64 sg_qe_db_stats_diag_32 sg_qe_db_stats_diag_16 sg_qe_db_stats_diag_8
+sg_qe_db_stats_diag_sat sg_qe_db_stats_table_scan_64 sg_qe_db_stats_table_scan_32 sg_qe_db_stats_table_scan_16 sg_qe_db_stats_table_scan_8 sg_qe_db_stats_table_scan_sat
+sg_qe_db_stats_table_striped_64 sg_qe_db_stats_table_striped_32 sg_qe_db_stats_table_striped_16 sg_qe_db_stats_table_striped_8 sg_qe_db_stats_table_striped_sat sg_qe_db_stats_table_diag_64
+sg_qe_db_stats_table_diag_32 sg_qe_db_stats_table_diag_16 sg_qe_db_stats_table_diag_8 sg_qe_db_stats_table_diag_sat sg_qe_db_stats_rowcol_scan_64 sg_qe_db_stats_rowcol_scan_32
+sg_qe_db_stats_rowcol_scan_16 sg_qe_db_stats_rowcol_scan_8 sg_qe_db_stats_rowcol_scan_sat sg_qe_db_stats_rowcol_striped_64 sg_qe_db_stats_rowcol_striped_32 sg_qe_db_stats_rowcol_striped_16
+sg_qe_db_stats_rowcol_striped_8 sg_qe_db_stats_rowcol_striped_sat sg_qe_db_stats_rowcol_diag_64 sg_qe_db_stats_rowcol_diag_32 sg_qe_db_stats_rowcol_diag_16 sg_qe_db_stats_rowcol_diag_8
+sg_qe_db_stats_rowcol_diag_sat
+""".split()
+
+_profile_names = """
+nw_scan_profile_64 nw_scan_profile_32 nw_scan_profile_16 nw_scan_profile_8 nw_scan_profile_sat nw_striped_profile_64
+nw_striped_profile_32 nw_striped_profile_16 nw_striped_profile_8 nw_striped_profile_sat nw_table_scan_profile_64 nw_table_scan_profile_32
+nw_table_scan_profile_16 nw_table_scan_profile_8 nw_table_scan_profile_sat nw_table_striped_profile_64 nw_table_striped_profile_32 nw_table_striped_profile_16
+nw_table_striped_profile_8 nw_table_striped_profile_sat nw_rowcol_scan_profile_64 nw_rowcol_scan_profile_32 nw_rowcol_scan_profile_16 nw_rowcol_scan_profile_8
+nw_rowcol_scan_profile_sat nw_rowcol_striped_profile_64 nw_rowcol_striped_profile_32 nw_rowcol_striped_profile_16 nw_rowcol_striped_profile_8 nw_rowcol_striped_profile_sat
+nw_trace_scan_profile_64 nw_trace_scan_profile_32 nw_trace_scan_profile_16 nw_trace_scan_profile_8 nw_trace_scan_profile_sat nw_trace_striped_profile_64
+nw_trace_striped_profile_32 nw_trace_striped_profile_16 nw_trace_striped_profile_8 nw_trace_striped_profile_sat nw_stats_scan_profile_64 nw_stats_scan_profile_32
+nw_stats_scan_profile_16 nw_stats_scan_profile_8 nw_stats_scan_profile_sat nw_stats_striped_profile_64 nw_stats_striped_profile_32 nw_stats_striped_profile_16
+nw_stats_striped_profile_8 nw_stats_striped_profile_sat nw_stats_table_scan_profile_64 nw_stats_table_scan_profile_32 nw_stats_table_scan_profile_16 nw_stats_table_scan_profile_8
+nw_stats_table_scan_profile_sat nw_stats_table_striped_profile_64 nw_stats_table_striped_profile_32 nw_stats_table_striped_profile_16 nw_stats_table_striped_profile_8 nw_stats_table_striped_profile_sat
+nw_stats_rowcol_scan_profile_64 nw_stats_rowcol_scan_profile_32 nw_stats_rowcol_scan_profile_16 nw_stats_rowcol_scan_profile_8 nw_stats_rowcol_scan_profile_sat nw_stats_rowcol_striped_profile_64
+nw_stats_rowcol_striped_profile_32 nw_stats_rowcol_striped_profile_16 nw_stats_rowcol_striped_profile_8 nw_stats_rowcol_striped_profile_sat sg_scan_profile_64 sg_scan_profile_32
+sg_scan_profile_16 sg_scan_profile_8 sg_scan_profile_sat sg_striped_profile_64 sg_striped_profile_32 sg_striped_profile_16
+sg_striped_profile_8 sg_striped_profile_sat sg_table_scan_profile_64 sg_table_scan_profile_32 sg_table_scan_profile_16 sg_table_scan_profile_8
+sg_table_scan_profile_sat sg_table_striped_profile_64 sg_table_striped_profile_32 sg_table_striped_profile_16 sg_table_striped_profile_8 sg_table_striped_profile_sat
+sg_rowcol_scan_profile_64 sg_rowcol_scan_profile_32 sg_rowcol_scan_profile_16 sg_rowcol_scan_profile_8 sg_rowcol_scan_profile_sat sg_rowcol_striped_profile_64
+sg_rowcol_striped_profile_32 sg_rowcol_striped_profile_16 sg_rowcol_striped_profile_8 sg_rowcol_striped_profile_sat sg_trace_scan_profile_64 sg_trace_scan_profile_32
+sg_trace_scan_profile_16 sg_trace_scan_profile_8 sg_trace_scan_profile_sat sg_trace_striped_profile_64 sg_trace_striped_profile_32 sg_trace_striped_profile_16
+sg_trace_striped_profile_8 sg_trace_striped_profile_sat sg_stats_scan_profile_64 sg_stats_scan_profile_32 sg_stats_scan_profile_16 sg_stats_scan_profile_8
+sg_stats_scan_profile_sat sg_stats_striped_profile_64 sg_stats_striped_profile_32 sg_stats_striped_profile_16 sg_stats_striped_profile_8 sg_stats_striped_profile_sat
+sg_stats_table_scan_profile_64 sg_stats_table_scan_profile_32 sg_stats_table_scan_profile_16 sg_stats_table_scan_profile_8 sg_stats_table_scan_profile_sat sg_stats_table_striped_profile_64
+sg_stats_table_striped_profile_32 sg_stats_table_striped_profile_16 sg_stats_table_striped_profile_8 sg_stats_table_striped_profile_sat sg_stats_rowcol_scan_profile_64 sg_stats_rowcol_scan_profile_32
+sg_stats_rowcol_scan_profile_16 sg_stats_rowcol_scan_profile_8 sg_stats_rowcol_scan_profile_sat sg_stats_rowcol_striped_profile_64 sg_stats_rowcol_striped_profile_32 sg_stats_rowcol_striped_profile_16
+sg_stats_rowcol_striped_profile_8 sg_stats_rowcol_striped_profile_sat sw_scan_profile_64 sw_scan_profile_32 sw_scan_profile_16 sw_scan_profile_8
+sw_scan_profile_sat sw_striped_profile_64 sw_striped_profile_32 sw_striped_profile_16 sw_striped_profile_8 sw_striped_profile_sat
+sw_table_scan_profile_64 sw_table_scan_profile_32 sw_table_scan_profile_16 sw_table_scan_profile_8 sw_table_scan_profile_sat sw_table_striped_profile_64
+sw_table_striped_profile_32 sw_table_striped_profile_16 sw_table_striped_profile_8 sw_table_striped_profile_sat sw_rowcol_scan_profile_64 sw_rowcol_scan_profile_32
+sw_rowcol_scan_profile_16 sw_rowcol_scan_profile_8 sw_rowcol_scan_profile_sat sw_rowcol_striped_profile_64 sw_rowcol_striped_profile_32 sw_rowcol_striped_profile_16
+sw_rowcol_striped_profile_8 sw_rowcol_striped_profile_sat sw_trace_scan_profile_64 sw_trace_scan_profile_32 sw_trace_scan_profile_16 sw_trace_scan_profile_8
+sw_trace_scan_profile_sat sw_trace_striped_profile_64 sw_trace_striped_profile_32 sw_trace_striped_profile_16 sw_trace_striped_profile_8 sw_trace_striped_profile_sat
+sw_stats_scan_profile_64 sw_stats_scan_profile_32 sw_stats_scan_profile_16 sw_stats_scan_profile_8 sw_stats_scan_profile_sat sw_stats_striped_profile_64
+sw_stats_striped_profile_32 sw_stats_striped_profile_16 sw_stats_striped_profile_8 sw_stats_striped_profile_sat sw_stats_table_scan_profile_64 sw_stats_table_scan_profile_32
+sw_stats_table_scan_profile_16 sw_stats_table_scan_profile_8 sw_stats_table_scan_profile_sat sw_stats_table_striped_profile_64 sw_stats_table_striped_profile_32 sw_stats_table_striped_profile_16
+sw_stats_table_striped_profile_8 sw_stats_table_striped_profile_sat sw_stats_rowcol_scan_profile_64 sw_stats_rowcol_scan_profile_32 sw_stats_rowcol_scan_profile_16 sw_stats_rowcol_scan_profile_8
+sw_stats_rowcol_scan_profile_sat sw_stats_rowcol_striped_profile_64 sw_stats_rowcol_striped_profile_32 sw_stats_rowcol_striped_profile_16 sw_stats_rowcol_striped_profile_8 sw_stats_rowcol_striped_profile_sat
+sg_qb_scan_profile_64 sg_qb_scan_profile_32 sg_qb_scan_profile_16 sg_qb_scan_profile_8 sg_qb_scan_profile_sat sg_qb_striped_profile_64
+sg_qb_striped_profile_32 sg_qb_striped_profile_16 sg_qb_striped_profile_8 sg_qb_striped_profile_sat sg_qb_table_scan_profile_64 sg_qb_table_scan_profile_32
+sg_qb_table_scan_profile_16 sg_qb_table_scan_profile_8 sg_qb_table_scan_profile_sat sg_qb_table_striped_profile_64 sg_qb_table_striped_profile_32 sg_qb_table_striped_profile_16
+sg_qb_table_striped_profile_8 sg_qb_table_striped_profile_sat sg_qb_rowcol_scan_profile_64 sg_qb_rowcol_scan_profile_32 sg_qb_rowcol_scan_profile_16 sg_qb_rowcol_scan_profile_8
+sg_qb_rowcol_scan_profile_sat sg_qb_rowcol_striped_profile_64 sg_qb_rowcol_striped_profile_32 sg_qb_rowcol_striped_profile_16 sg_qb_rowcol_striped_profile_8 sg_qb_rowcol_striped_profile_sat
+sg_qb_trace_scan_profile_64 sg_qb_trace_scan_profile_32 sg_qb_trace_scan_profile_16 sg_qb_trace_scan_profile_8 sg_qb_trace_scan_profile_sat sg_qb_trace_striped_profile_64
+sg_qb_trace_striped_profile_32 sg_qb_trace_striped_profile_16 sg_qb_trace_striped_profile_8 sg_qb_trace_striped_profile_sat sg_qb_stats_scan_profile_64 sg_qb_stats_scan_profile_32
+sg_qb_stats_scan_profile_16 sg_qb_stats_scan_profile_8 sg_qb_stats_scan_profile_sat sg_qb_stats_striped_profile_64 sg_qb_stats_striped_profile_32 sg_qb_stats_striped_profile_16
+sg_qb_stats_striped_profile_8 sg_qb_stats_striped_profile_sat sg_qb_stats_table_scan_profile_64 sg_qb_stats_table_scan_profile_32 sg_qb_stats_table_scan_profile_16 sg_qb_stats_table_scan_profile_8
+sg_qb_stats_table_scan_profile_sat sg_qb_stats_table_striped_profile_64 sg_qb_stats_table_striped_profile_32 sg_qb_stats_table_striped_profile_16 sg_qb_stats_table_striped_profile_8 sg_qb_stats_table_striped_profile_sat
+sg_qb_stats_rowcol_scan_profile_64 sg_qb_stats_rowcol_scan_profile_32 sg_qb_stats_rowcol_scan_profile_16 sg_qb_stats_rowcol_scan_profile_8 sg_qb_stats_rowcol_scan_profile_sat sg_qb_stats_rowcol_striped_profile_64
+sg_qb_stats_rowcol_striped_profile_32 sg_qb_stats_rowcol_striped_profile_16 sg_qb_stats_rowcol_striped_profile_8 sg_qb_stats_rowcol_striped_profile_sat sg_qe_scan_profile_64 sg_qe_scan_profile_32
+sg_qe_scan_profile_16 sg_qe_scan_profile_8 sg_qe_scan_profile_sat sg_qe_striped_profile_64 sg_qe_striped_profile_32 sg_qe_striped_profile_16
+sg_qe_striped_profile_8 sg_qe_striped_profile_sat sg_qe_table_scan_profile_64 sg_qe_table_scan_profile_32 sg_qe_table_scan_profile_16 sg_qe_table_scan_profile_8
+sg_qe_table_scan_profile_sat sg_qe_table_striped_profile_64 sg_qe_table_striped_profile_32 sg_qe_table_striped_profile_16 sg_qe_table_striped_profile_8 sg_qe_table_striped_profile_sat
+sg_qe_rowcol_scan_profile_64 sg_qe_rowcol_scan_profile_32 sg_qe_rowcol_scan_profile_16 sg_qe_rowcol_scan_profile_8 sg_qe_rowcol_scan_profile_sat sg_qe_rowcol_striped_profile_64
+sg_qe_rowcol_striped_profile_32 sg_qe_rowcol_striped_profile_16 sg_qe_rowcol_striped_profile_8 sg_qe_rowcol_striped_profile_sat sg_qe_trace_scan_profile_64 sg_qe_trace_scan_profile_32
+sg_qe_trace_scan_profile_16 sg_qe_trace_scan_profile_8 sg_qe_trace_scan_profile_sat sg_qe_trace_striped_profile_64 sg_qe_trace_striped_profile_32 sg_qe_trace_striped_profile_16
+sg_qe_trace_striped_profile_8 sg_qe_trace_striped_profile_sat sg_qe_stats_scan_profile_64 sg_qe_stats_scan_profile_32 sg_qe_stats_scan_profile_16 sg_qe_stats_scan_profile_8
+sg_qe_stats_scan_profile_sat sg_qe_stats_striped_profile_64 sg_qe_stats_striped_profile_32 sg_qe_stats_striped_profile_16 sg_qe_stats_striped_profile_8 sg_qe_stats_striped_profile_sat
+sg_qe_stats_table_scan_profile_64 sg_qe_stats_table_scan_profile_32 sg_qe_stats_table_scan_profile_16 sg_qe_stats_table_scan_profile_8 sg_qe_stats_table_scan_profile_sat sg_qe_stats_table_striped_profile_64
+sg_qe_stats_table_striped_profile_32 sg_qe_stats_table_striped_profile_16 sg_qe_stats_table_striped_profile_8 sg_qe_stats_table_striped_profile_sat sg_qe_stats_rowcol_scan_profile_64 sg_qe_stats_rowcol_scan_profile_32
+sg_qe_stats_rowcol_scan_profile_16 sg_qe_stats_rowcol_scan_profile_8 sg_qe_stats_rowcol_scan_profile_sat sg_qe_stats_rowcol_striped_profile_64 sg_qe_stats_rowcol_striped_profile_32 sg_qe_stats_rowcol_striped_profile_16
+sg_qe_stats_rowcol_striped_profile_8 sg_qe_stats_rowcol_striped_profile_sat sg_qx_scan_profile_64 sg_qx_scan_profile_32 sg_qx_scan_profile_16 sg_qx_scan_profile_8
+sg_qx_scan_profile_sat sg_qx_striped_profile_64 sg_qx_striped_profile_32 sg_qx_striped_profile_16 sg_qx_striped_profile_8 sg_qx_striped_profile_sat
+sg_qx_table_scan_profile_64 sg_qx_table_scan_profile_32 sg_qx_table_scan_profile_16 sg_qx_table_scan_profile_8 sg_qx_table_scan_profile_sat sg_qx_table_striped_profile_64
+sg_qx_table_striped_profile_32 sg_qx_table_striped_profile_16 sg_qx_table_striped_profile_8 sg_qx_table_striped_profile_sat sg_qx_rowcol_scan_profile_64 sg_qx_rowcol_scan_profile_32
+sg_qx_rowcol_scan_profile_16 sg_qx_rowcol_scan_profile_8 sg_qx_rowcol_scan_profile_sat sg_qx_rowcol_striped_profile_64 sg_qx_rowcol_striped_profile_32 sg_qx_rowcol_striped_profile_16
+sg_qx_rowcol_striped_profile_8 sg_qx_rowcol_striped_profile_sat sg_qx_trace_scan_profile_64 sg_qx_trace_scan_profile_32 sg_qx_trace_scan_profile_16 sg_qx_trace_scan_profile_8
+sg_qx_trace_scan_profile_sat sg_qx_trace_striped_profile_64 sg_qx_trace_striped_profile_32 sg_qx_trace_striped_profile_16 sg_qx_trace_striped_profile_8 sg_qx_trace_striped_profile_sat
+sg_qx_stats_scan_profile_64 sg_qx_stats_scan_profile_32 sg_qx_stats_scan_profile_16 sg_qx_stats_scan_profile_8 sg_qx_stats_scan_profile_sat sg_qx_stats_striped_profile_64
+sg_qx_stats_striped_profile_32 sg_qx_stats_striped_profile_16 sg_qx_stats_striped_profile_8 sg_qx_stats_striped_profile_sat sg_qx_stats_table_scan_profile_64 sg_qx_stats_table_scan_profile_32
+sg_qx_stats_table_scan_profile_16 sg_qx_stats_table_scan_profile_8 sg_qx_stats_table_scan_profile_sat sg_qx_stats_table_striped_profile_64 sg_qx_stats_table_striped_profile_32 sg_qx_stats_table_striped_profile_16
+sg_qx_stats_table_striped_profile_8 sg_qx_stats_table_striped_profile_sat sg_qx_stats_rowcol_scan_profile_64 sg_qx_stats_rowcol_scan_profile_32 sg_qx_stats_rowcol_scan_profile_16 sg_qx_stats_rowcol_scan_profile_8
+sg_qx_stats_rowcol_scan_profile_sat sg_qx_stats_rowcol_striped_profile_64 sg_qx_stats_rowcol_striped_profile_32 sg_qx_stats_rowcol_striped_profile_16 sg_qx_stats_rowcol_striped_profile_8 sg_qx_stats_rowcol_striped_profile_sat
+sg_db_scan_profile_64 sg_db_scan_profile_32 sg_db_scan_profile_16 sg_db_scan_profile_8 sg_db_scan_profile_sat sg_db_striped_profile_64
+sg_db_striped_profile_32 sg_db_striped_profile_16 sg_db_striped_profile_8 sg_db_striped_profile_sat sg_db_table_scan_profile_64 sg_db_table_scan_profile_32
+sg_db_table_scan_profile_16 sg_db_table_scan_profile_8 sg_db_table_scan_profile_sat sg_db_table_striped_profile_64 sg_db_table_striped_profile_32 sg_db_table_striped_profile_16
+sg_db_table_striped_profile_8 sg_db_table_striped_profile_sat sg_db_rowcol_scan_profile_64 sg_db_rowcol_scan_profile_32 sg_db_rowcol_scan_profile_16 sg_db_rowcol_scan_profile_8
+sg_db_rowcol_scan_profile_sat sg_db_rowcol_striped_profile_64 sg_db_rowcol_striped_profile_32 sg_db_rowcol_striped_profile_16 sg_db_rowcol_striped_profile_8 sg_db_rowcol_striped_profile_sat
+sg_db_trace_scan_profile_64 sg_db_trace_scan_profile_32 sg_db_trace_scan_profile_16 sg_db_trace_scan_profile_8 sg_db_trace_scan_profile_sat sg_db_trace_striped_profile_64
+sg_db_trace_striped_profile_32 sg_db_trace_striped_profile_16 sg_db_trace_striped_profile_8 sg_db_trace_striped_profile_sat sg_db_stats_scan_profile_64 sg_db_stats_scan_profile_32
+sg_db_stats_scan_profile_16 sg_db_stats_scan_profile_8 sg_db_stats_scan_profile_sat sg_db_stats_striped_profile_64 sg_db_stats_striped_profile_32 sg_db_stats_striped_profile_16
+sg_db_stats_striped_profile_8 sg_db_stats_striped_profile_sat sg_db_stats_table_scan_profile_64 sg_db_stats_table_scan_profile_32 sg_db_stats_table_scan_profile_16 sg_db_stats_table_scan_profile_8
+sg_db_stats_table_scan_profile_sat sg_db_stats_table_striped_profile_64 sg_db_stats_table_striped_profile_32 sg_db_stats_table_striped_profile_16 sg_db_stats_table_striped_profile_8 sg_db_stats_table_striped_profile_sat
+sg_db_stats_rowcol_scan_profile_64 sg_db_stats_rowcol_scan_profile_32 sg_db_stats_rowcol_scan_profile_16 sg_db_stats_rowcol_scan_profile_8 sg_db_stats_rowcol_scan_profile_sat sg_db_stats_rowcol_striped_profile_64
+sg_db_stats_rowcol_striped_profile_32 sg_db_stats_rowcol_striped_profile_16 sg_db_stats_rowcol_striped_profile_8 sg_db_stats_rowcol_striped_profile_sat sg_de_scan_profile_64 sg_de_scan_profile_32
+sg_de_scan_profile_16 sg_de_scan_profile_8 sg_de_scan_profile_sat sg_de_striped_profile_64 sg_de_striped_profile_32 sg_de_striped_profile_16
+sg_de_striped_profile_8 sg_de_striped_profile_sat sg_de_table_scan_profile_64 sg_de_table_scan_profile_32 sg_de_table_scan_profile_16 sg_de_table_scan_profile_8
+sg_de_table_scan_profile_sat sg_de_table_striped_profile_64 sg_de_table_striped_profile_32 sg_de_table_striped_profile_16 sg_de_table_striped_profile_8 sg_de_table_striped_profile_sat
+sg_de_rowcol_scan_profile_64 sg_de_rowcol_scan_profile_32 sg_de_rowcol_scan_profile_16 sg_de_rowcol_scan_profile_8 sg_de_rowcol_scan_profile_sat sg_de_rowcol_striped_profile_64
+sg_de_rowcol_striped_profile_32 sg_de_rowcol_striped_profile_16 sg_de_rowcol_striped_profile_8 sg_de_rowcol_striped_profile_sat sg_de_trace_scan_profile_64 sg_de_trace_scan_profile_32
+sg_de_trace_scan_profile_16 sg_de_trace_scan_profile_8 sg_de_trace_scan_profile_sat sg_de_trace_striped_profile_64 sg_de_trace_striped_profile_32 sg_de_trace_striped_profile_16
+sg_de_trace_striped_profile_8 sg_de_trace_striped_profile_sat sg_de_stats_scan_profile_64 sg_de_stats_scan_profile_32 sg_de_stats_scan_profile_16 sg_de_stats_scan_profile_8
+sg_de_stats_scan_profile_sat sg_de_stats_striped_profile_64 sg_de_stats_striped_profile_32 sg_de_stats_striped_profile_16 sg_de_stats_striped_profile_8 sg_de_stats_striped_profile_sat
+sg_de_stats_table_scan_profile_64 sg_de_stats_table_scan_profile_32 sg_de_stats_table_scan_profile_16 sg_de_stats_table_scan_profile_8 sg_de_stats_table_scan_profile_sat sg_de_stats_table_striped_profile_64
+sg_de_stats_table_striped_profile_32 sg_de_stats_table_striped_profile_16 sg_de_stats_table_striped_profile_8 sg_de_stats_table_striped_profile_sat sg_de_stats_rowcol_scan_profile_64 sg_de_stats_rowcol_scan_profile_32
+sg_de_stats_rowcol_scan_profile_16 sg_de_stats_rowcol_scan_profile_8 sg_de_stats_rowcol_scan_profile_sat sg_de_stats_rowcol_striped_profile_64 sg_de_stats_rowcol_striped_profile_32 sg_de_stats_rowcol_striped_profile_16
+sg_de_stats_rowcol_striped_profile_8 sg_de_stats_rowcol_striped_profile_sat sg_dx_scan_profile_64 sg_dx_scan_profile_32 sg_dx_scan_profile_16 sg_dx_scan_profile_8
+sg_dx_scan_profile_sat sg_dx_striped_profile_64 sg_dx_striped_profile_32 sg_dx_striped_profile_16 sg_dx_striped_profile_8 sg_dx_striped_profile_sat
+sg_dx_table_scan_profile_64 sg_dx_table_scan_profile_32 sg_dx_table_scan_profile_16 sg_dx_table_scan_profile_8 sg_dx_table_scan_profile_sat sg_dx_table_striped_profile_64
+sg_dx_table_striped_profile_32 sg_dx_table_striped_profile_16 sg_dx_table_striped_profile_8 sg_dx_table_striped_profile_sat sg_dx_rowcol_scan_profile_64 sg_dx_rowcol_scan_profile_32
+sg_dx_rowcol_scan_profile_16 sg_dx_rowcol_scan_profile_8 sg_dx_rowcol_scan_profile_sat sg_dx_rowcol_striped_profile_64 sg_dx_rowcol_striped_profile_32 sg_dx_rowcol_striped_profile_16
+sg_dx_rowcol_striped_profile_8 sg_dx_rowcol_striped_profile_sat sg_dx_trace_scan_profile_64 sg_dx_trace_scan_profile_32 sg_dx_trace_scan_profile_16 sg_dx_trace_scan_profile_8
+sg_dx_trace_scan_profile_sat sg_dx_trace_striped_profile_64 sg_dx_trace_striped_profile_32 sg_dx_trace_striped_profile_16 sg_dx_trace_striped_profile_8 sg_dx_trace_striped_profile_sat
+sg_dx_stats_scan_profile_64 sg_dx_stats_scan_profile_32 sg_dx_stats_scan_profile_16 sg_dx_stats_scan_profile_8 sg_dx_stats_scan_profile_sat sg_dx_stats_striped_profile_64
+sg_dx_stats_striped_profile_32 sg_dx_stats_striped_profile_16 sg_dx_stats_striped_profile_8 sg_dx_stats_striped_profile_sat sg_dx_stats_table_scan_profile_64 sg_dx_stats_table_scan_profile_32
+sg_dx_stats_table_scan_profile_16 sg_dx_stats_table_scan_profile_8 sg_dx_stats_table_scan_profile_sat sg_dx_stats_table_striped_profile_64 sg_dx_stats_table_striped_profile_32 sg_dx_stats_table_striped_profile_16
+sg_dx_stats_table_striped_profile_8 sg_dx_stats_table_striped_profile_sat sg_dx_stats_rowcol_scan_profile_64 sg_dx_stats_rowcol_scan_profile_32 sg_dx_stats_rowcol_scan_profile_16 sg_dx_stats_rowcol_scan_profile_8
+sg_dx_stats_rowcol_scan_profile_sat sg_dx_stats_rowcol_striped_profile_64 sg_dx_stats_rowcol_striped_profile_32 sg_dx_stats_rowcol_striped_profile_16 sg_dx_stats_rowcol_striped_profile_8 sg_dx_stats_rowcol_striped_profile_sat
+sg_qb_de_scan_profile_64 sg_qb_de_scan_profile_32 sg_qb_de_scan_profile_16 sg_qb_de_scan_profile_8 sg_qb_de_scan_profile_sat sg_qb_de_striped_profile_64
+sg_qb_de_striped_profile_32 sg_qb_de_striped_profile_16 sg_qb_de_striped_profile_8 sg_qb_de_striped_profile_sat sg_qb_de_table_scan_profile_64 sg_qb_de_table_scan_profile_32
+sg_qb_de_table_scan_profile_16 sg_qb_de_table_scan_profile_8 sg_qb_de_table_scan_profile_sat sg_qb_de_table_striped_profile_64 sg_qb_de_table_striped_profile_32 sg_qb_de_table_striped_profile_16
+sg_qb_de_table_striped_profile_8 sg_qb_de_table_striped_profile_sat sg_qb_de_rowcol_scan_profile_64 sg_qb_de_rowcol_scan_profile_32 sg_qb_de_rowcol_scan_profile_16 sg_qb_de_rowcol_scan_profile_8
+sg_qb_de_rowcol_scan_profile_sat sg_qb_de_rowcol_striped_profile_64 sg_qb_de_rowcol_striped_profile_32 sg_qb_de_rowcol_striped_profile_16 sg_qb_de_rowcol_striped_profile_8 sg_qb_de_rowcol_striped_profile_sat
+sg_qb_de_trace_scan_profile_64 sg_qb_de_trace_scan_profile_32 sg_qb_de_trace_scan_profile_16 sg_qb_de_trace_scan_profile_8 sg_qb_de_trace_scan_profile_sat sg_qb_de_trace_striped_profile_64
+sg_qb_de_trace_striped_profile_32 sg_qb_de_trace_striped_profile_16 sg_qb_de_trace_striped_profile_8 sg_qb_de_trace_striped_profile_sat sg_qb_de_stats_scan_profile_64 sg_qb_de_stats_scan_profile_32
+sg_qb_de_stats_scan_profile_16 sg_qb_de_stats_scan_profile_8 sg_qb_de_stats_scan_profile_sat sg_qb_de_stats_striped_profile_64 sg_qb_de_stats_striped_profile_32 sg_qb_de_stats_striped_profile_16
+sg_qb_de_stats_striped_profile_8 sg_qb_de_stats_striped_profile_sat sg_qb_de_stats_table_scan_profile_64 sg_qb_de_stats_table_scan_profile_32 sg_qb_de_stats_table_scan_profile_16 sg_qb_de_stats_table_scan_profile_8
+sg_qb_de_stats_table_scan_profile_sat sg_qb_de_stats_table_striped_profile_64 sg_qb_de_stats_table_striped_profile_32 sg_qb_de_stats_table_striped_profile_16 sg_qb_de_stats_table_striped_profile_8 sg_qb_de_stats_table_striped_profile_sat
+sg_qb_de_stats_rowcol_scan_profile_64 sg_qb_de_stats_rowcol_scan_profile_32 sg_qb_de_stats_rowcol_scan_profile_16 sg_qb_de_stats_rowcol_scan_profile_8 sg_qb_de_stats_rowcol_scan_profile_sat sg_qb_de_stats_rowcol_striped_profile_64
+sg_qb_de_stats_rowcol_striped_profile_32 sg_qb_de_stats_rowcol_striped_profile_16 sg_qb_de_stats_rowcol_striped_profile_8 sg_qb_de_stats_rowcol_striped_profile_sat sg_qe_db_scan_profile_64 sg_qe_db_scan_profile_32
+sg_qe_db_scan_profile_16 sg_qe_db_scan_profile_8 sg_qe_db_scan_profile_sat sg_qe_db_striped_profile_64 sg_qe_db_striped_profile_32 sg_qe_db_striped_profile_16
+sg_qe_db_striped_profile_8 sg_qe_db_striped_profile_sat sg_qe_db_table_scan_profile_64 sg_qe_db_table_scan_profile_32 sg_qe_db_table_scan_profile_16 sg_qe_db_table_scan_profile_8
+sg_qe_db_table_scan_profile_sat sg_qe_db_table_striped_profile_64 sg_qe_db_table_striped_profile_32 sg_qe_db_table_striped_profile_16 sg_qe_db_table_striped_profile_8 sg_qe_db_table_striped_profile_sat
+sg_qe_db_rowcol_scan_profile_64 sg_qe_db_rowcol_scan_profile_32 sg_qe_db_rowcol_scan_profile_16 sg_qe_db_rowcol_scan_profile_8 sg_qe_db_rowcol_scan_profile_sat sg_qe_db_rowcol_striped_profile_64
+sg_qe_db_rowcol_striped_profile_32 sg_qe_db_rowcol_striped_profile_16 sg_qe_db_rowcol_striped_profile_8 sg_qe_db_rowcol_striped_profile_sat sg_qe_db_trace_scan_profile_64 sg_qe_db_trace_scan_profile_32
+sg_qe_db_trace_scan_profile_16 sg_qe_db_trace_scan_profile_8 sg_qe_db_trace_scan_profile_sat sg_qe_db_trace_striped_profile_64 sg_qe_db_trace_striped_profile_32 sg_qe_db_trace_striped_profile_16
+sg_qe_db_trace_striped_profile_8 sg_qe_db_trace_striped_profile_sat sg_qe_db_stats_scan_profile_64 sg_qe_db_stats_scan_profile_32 sg_qe_db_stats_scan_profile_16 sg_qe_db_stats_scan_profile_8
+sg_qe_db_stats_scan_profile_sat sg_qe_db_stats_striped_profile_64 sg_qe_db_stats_striped_profile_32 sg_qe_db_stats_striped_profile_16 sg_qe_db_stats_striped_profile_8 sg_qe_db_stats_striped_profile_sat
+sg_qe_db_stats_table_scan_profile_64 sg_qe_db_stats_table_scan_profile_32 sg_qe_db_stats_table_scan_profile_16 sg_qe_db_stats_table_scan_profile_8 sg_qe_db_stats_table_scan_profile_sat sg_qe_db_stats_table_striped_profile_64
+sg_qe_db_stats_table_striped_profile_32 sg_qe_db_stats_table_striped_profile_16 sg_qe_db_stats_table_striped_profile_8 sg_qe_db_stats_table_striped_profile_sat sg_qe_db_stats_rowcol_scan_profile_64 sg_qe_db_stats_rowcol_scan_profile_32
+sg_qe_db_stats_rowcol_scan_profile_16 sg_qe_db_stats_rowcol_scan_profile_8 sg_qe_db_stats_rowcol_scan_profile_sat sg_qe_db_stats_rowcol_striped_profile_64 sg_qe_db_stats_rowcol_striped_profile_32 sg_qe_db_stats_rowcol_striped_profile_16
+sg_qe_db_stats_rowcol_striped_profile_8 sg_qe_db_stats_rowcol_striped_profile_sat
+""".split()
+
+_binders = dict.fromkeys(_pair_names, _bind_pair)
+_binders.update(dict.fromkeys(_profile_names, _bind_profile))
+
+# module __getattr__ needs Python 3.7, so bind everything up front before that
+if sys.version_info < (3, 7):
+    for _name in _binders:
+        _bind(_name)
+    for _name in _builtin_matrices:
+        _builtin_matrix(_name)
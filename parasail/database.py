@@ -0,0 +1,140 @@
+import mmap
+import os
+import struct
+
+import numpy
+
+from parasail.seqio import SequenceBatch, iter_sequences
+
+# File layout, all integers little-endian:
+#   header      magic, version, matrix size, record count, residue bytes,
+#               name bytes, matrix name
+#   mapper      256 int32, the mapper of the matrix used to build the file
+#   residues    uint8, padded to a multiple of 8 bytes
+#   offsets     count+1 int64 into residues
+#   name ends   count+1 int64 into names
+#   names       utf-8
+_MAGIC = b"PARASLDB"
+_VERSION = 1
+_HEADER = struct.Struct("<8sIiqqq32s")
+_MAPPER_BYTES = 256 * 4
+
+def _canonical(mapper):
+    # One byte per matrix row, preferring upper case letters, so that
+    # residues which score identically are stored identically.
+    mapper = numpy.asarray(mapper)
+    order = list(range(ord("A"), ord("Z") + 1)) + list(range(256))
+    chosen = {}
+    for c in order:
+        chosen.setdefault(int(mapper[c]), c)
+    return numpy.array([chosen[int(mapper[c])] for c in range(256)], numpy.uint8)
+
+def _pad(fp):
+    fp.write(b"\0" * (-fp.tell() % 8))
+
+class _Names:
+    # names decoded on access from the mapped file
+    def __init__(self, blob, ends):
+        self._blob = blob
+        self._ends = ends
+    def __len__(self):
+        return len(self._ends) - 1
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key = key + len(self)
+        if key < 0 or key >= len(self):
+            raise IndexError('Index out of range')
+        return bytes(self._blob[self._ends[key]:self._ends[key+1]]).decode("utf-8")
+
+class Database(SequenceBatch):
+    # A reference set stored in a binary file that is memory-mapped, so
+    # opening it costs no parsing and its pages are shared by every
+    # process that opens the same file.  Residues are pre-mapped with the
+    # matrix given to build: each is replaced by one representative
+    # character of its matrix row, which folds case and unknown characters
+    # and leaves alignment scores unchanged.  A Database is a
+    # SequenceBatch, so it can be passed directly as align_many targets.
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size + _MAPPER_BYTES or self._mmap[:8] != _MAGIC:
+            self.close()
+            raise ValueError("'{}' is not a parasail database".format(filename))
+        magic, version, size, count, nresidues, nnames, name = _HEADER.unpack_from(self._mmap)
+        if version != _VERSION:
+            self.close()
+            raise ValueError("unsupported parasail database version {}".format(version))
+        self.matrix_name = name.rstrip(b"\0").decode("utf-8")
+        self.matrix_size = size
+        pos = _HEADER.size
+        self.mapper = numpy.frombuffer(self._mmap, "<i4", 256, pos)
+        pos += _MAPPER_BYTES
+        residues = numpy.frombuffer(self._mmap, numpy.uint8, nresidues, pos)
+        pos += nresidues + (-nresidues % 8)
+        offsets = numpy.frombuffer(self._mmap, "<i8", count + 1, pos)
+        pos += (count + 1) * 8
+        ends = numpy.frombuffer(self._mmap, "<i8", count + 1, pos)
+        pos += (count + 1) * 8
+        names = _Names(memoryview(self._mmap)[pos:pos+nnames], ends)
+        SequenceBatch.__init__(self, names, residues, offsets)
+    def close(self):
+        # raises BufferError while sequences from the database are alive
+        self.names = self.residues = self.offsets = self.mapper = None
+        self._mmap.close()
+        self._file.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+    def check_matrix(self, matrix):
+        # raise ValueError unless matrix maps residues like the build matrix
+        if matrix.size != self.matrix_size or (numpy.asarray(matrix.mapper) != self.mapper).any():
+            raise ValueError("database '{}' was built for matrix '{}'".format(
+                self.filename, self.matrix_name))
+    @staticmethod
+    def open(filename, matrix=None):
+        database = Database(filename)
+        if matrix is not None:
+            try:
+                database.check_matrix(matrix)
+            except ValueError:
+                database.close()
+                raise
+        return database
+    @staticmethod
+    def build(path, matrix, output=None, chunk_size=100000):
+        # Convert the FASTA or FASTQ file path, optionally gzip or bgzip
+        # compressed, into a database at output, by default path + ".pdb".
+        # The input is streamed, so only the lengths and names are held in
+        # memory.  Returns the opened Database.
+        output = output or path + ".pdb"
+        mapper = numpy.asarray(matrix.mapper, "<i4")
+        canonical = _canonical(mapper)
+        name = matrix.name or b""
+        if not isinstance(name, bytes):
+            name = name.encode("utf-8")
+        lengths = [numpy.zeros(1, numpy.int64)]
+        names = []
+        with open(output + ".tmp", "wb") as fp:
+            fp.write(b"\0" * _HEADER.size)
+            fp.write(mapper.tobytes())
+            for batch in iter_sequences(path, chunk_size):
+                fp.write(canonical[batch.residues].tobytes())
+                lengths.append(batch.lengths)
+                names.extend(n.encode("utf-8") for n in batch.names)
+            nresidues = fp.tell() - _HEADER.size - _MAPPER_BYTES
+            _pad(fp)
+            fp.write(numpy.cumsum(numpy.concatenate(lengths)).astype("<i8").tobytes())
+            ends = numpy.zeros(len(names) + 1, "<i8")
+            numpy.cumsum([len(n) for n in names], out=ends[1:])
+            fp.write(ends.tobytes())
+            names = b"".join(names)
+            fp.write(names)
+            fp.seek(0)
+            fp.write(_HEADER.pack(_MAGIC, _VERSION, matrix.size, len(ends) - 1,
+                    nresidues, len(names), name[:32]))
+        getattr(os, "replace", os.rename)(output + ".tmp", output)
+        return Database(output)
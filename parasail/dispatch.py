@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import platform
+import random
+import time
+
+import numpy
+
+from parasail import bindings_v2 as _bindings
+from parasail import version
+from parasail.search import DEFAULT_TABLE
+
+try:
+    _clock = time.perf_counter
+except AttributeError:
+    _clock = time.time
+
+DEFAULT_LENGTHS = (16, 64, 256, 1024, 4096)
+
+_wider = {"8": "16", "16": "32"}
+
+# tuned tables by (mode, matrix) key, loaded from the tune file on demand
+_tables = None
+
+def _cpu_signature():
+    # A tune file is only trusted on a host whose CPU and library match
+    # the ones it was measured on.
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "version": ".".join(str(x) for x in version()),
+        "avx2": _bindings.can_use_avx2(),
+        "sse41": _bindings.can_use_sse41(),
+        "sse2": _bindings.can_use_sse2(),
+        "altivec": _bindings.can_use_altivec(),
+        "neon": _bindings.can_use_neon(),
+    }
+
+def tune_filename():
+    filename = os.environ.get("PARASAIL_TUNE_FILE")
+    if filename:
+        return filename
+    host = platform.node() or "localhost"
+    return os.path.join(os.path.expanduser("~"), ".cache", "parasail",
+            "tune-{}.json".format(host))
+
+def _key(matrix, mode):
+    # Built-in matrices by name.  Matrices from matrix_create, from_numpy
+    # or a file have no name, so they are told apart by their scores and
+    # mapper.
+    name = _bindings.s(matrix.name)
+    if not name:
+        digest = hashlib.sha1(numpy.ascontiguousarray(matrix.matrix, numpy.int32).tobytes())
+        digest.update(numpy.ascontiguousarray(matrix.mapper, numpy.int32).tobytes())
+        name = "sha1-" + digest.hexdigest()
+    return "{}:{}:{}".format(mode, name, matrix.size)
+
+def _load(filename):
+    try:
+        with open(filename) as fp:
+            data = json.load(fp)
+    except (IOError, OSError, ValueError):
+        return {}
+    if data.get("cpu") != _cpu_signature():
+        return {}
+    return dict((key, tuple(tuple(row) for row in rows))
+            for key, rows in data.get("tables", {}).items())
+
+def _save(filename, tables):
+    directory = os.path.dirname(filename)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    data = {"cpu": _cpu_signature(),
+            "tables": dict((key, [list(row) for row in rows]) for key, rows in tables.items())}
+    with open(filename + ".tmp", "w") as fp:
+        json.dump(data, fp, indent=1, sort_keys=True)
+    getattr(os, "replace", os.rename)(filename + ".tmp", filename)
+
+def _get_tables():
+    global _tables
+    if _tables is None:
+        _tables = _load(tune_filename())
+    return _tables
+
+def tuned_table(matrix, mode="sw"):
+    # The tuned table for mode and matrix, or DEFAULT_TABLE if tune has
+    # not been run for them on this host.
+    return _get_tables().get(_key(matrix, mode), DEFAULT_TABLE)
+
+def _alphabet(matrix):
+    # one letter for each row of the matrix, so random sequences score
+    # like real ones
+    mapper = matrix.mapper
+    letters = {}
+    for c in range(ord("A"), ord("Z") + 1):
+        letters.setdefault(int(mapper[c]), chr(c))
+    return "".join(letters.values())
+
+def _time(func, query, targets, open, extend, matrix, repeat):
+    best = None
+    for i in range(repeat):
+        start = _clock()
+        for target in targets:
+            func(query, target, open, extend, matrix)
+        elapsed = _clock() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def tune(matrix=None, mode="sw", lengths=DEFAULT_LENGTHS,
+        families=("striped", "scan", "diag"), widths=("8", "16", "32"),
+        open=10, extend=1, pairs=4, repeat=3, save=True, seed=0):
+    # Time every family and width on random sequences of each length and
+    # return a table of (longest length, family, width) rows for the
+    # fastest kernels, usable by align and align_bucketed.  Widths that
+    # saturate on a benchmark pair are not considered for that length.
+    # The table is remembered for align and, if save is true, written to
+    # tune_filename() for later processes on this host.
+    if matrix is None:
+        matrix = _bindings.blosum62
+    lengths = sorted(lengths)
+    rng = random.Random(seed)
+    alphabet = _alphabet(matrix)
+    winners = []
+    for length in lengths:
+        sequences = ["".join(rng.choice(alphabet) for i in range(length))
+                for j in range(pairs + 1)]
+        query, targets = sequences[0], sequences[1:]
+        best = None
+        for family in families:
+            for width in widths:
+                func = getattr(_bindings, "{}_{}_{}".format(mode, family, width), None)
+                if func is None:
+                    continue
+                if any(func(query, t, open, extend, matrix).saturated for t in targets):
+                    continue
+                elapsed = _time(func, query, targets, open, extend, matrix, repeat)
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, family, width)
+        if best is None:
+            raise ValueError("no '{}' functions to tune".format(mode))
+        winners.append(best[1:])
+    # each winner covers lengths up to the geometric midpoint with the next
+    table = []
+    for i, (family, width) in enumerate(winners):
+        limit = None
+        if i + 1 < len(lengths):
+            limit = int((lengths[i] * lengths[i+1]) ** 0.5)
+        if table and table[-1][1:] == (family, width):
+            table[-1] = (limit, family, width)
+        else:
+            table.append((limit, family, width))
+    table = tuple(table)
+    tables = _get_tables()
+    tables[_key(matrix, mode)] = table
+    if save:
+        filename = tune_filename()
+        saved = _load(filename)
+        saved[_key(matrix, mode)] = table
+        _save(filename, saved)
+    return table
+
+def align(s1, s2, open, extend, matrix, mode="sw"):
+    # Align with the kernel the tuned table picks for the length of s1.
+    # Results that saturate an 8- or 16-bit kernel are recomputed with
+    # the next wider one.
+    length = len(s1)
+    for limit, family, width in tuned_table(matrix, mode):
+        if limit is None or length <= limit:
+            break
+    while True:
+        func = getattr(_bindings, "{}_{}_{}".format(mode, family, width), None)
+        if func is None:
+            raise ValueError("unknown alignment mode '{}'".format(mode))
+        result = func(s1, s2, open, extend, matrix)
+        if not result.saturated or width not in _wider:
+            return result
+        width = _wider[width]
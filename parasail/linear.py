@@ -0,0 +1,331 @@
+import numpy
+
+from parasail import bindings_v2 as _bindings
+from parasail.bindings_v2 import Traceback
+from parasail.search import _residues
+
+# Subproblems with at most this many cells are aligned by the traceback
+# kernels directly; larger ones are split in two.  The traceback table
+# of a subproblem this size takes a few megabytes.
+DEFAULT_MAX_CELLS = 1 << 22
+
+# 32-bit kernels, so long alignments do not saturate
+_KERNEL = "scan_32"
+
+_ops = "MIDNSHP=X"
+
+def _function(alg):
+    return getattr(_bindings, "{}_{}".format(alg, _KERNEL))
+
+def _align(alg, s1, s2, open, extend, matrix):
+    result = _function(alg)(s1, s2, open, extend, matrix)
+    if result.saturated:
+        raise OverflowError("alignment score does not fit in 32 bits")
+    return result
+
+def _append(runs, op, length):
+    if length > 0:
+        if runs and runs[-1][0] == op:
+            runs[-1][1] += length
+        else:
+            runs.append([op, length])
+
+def _trace_runs(alg, q, r, open, extend, matrix, runs):
+    # Align with the traceback kernel and append its cigar to runs, with
+    # = and X merged into M.  Returns the cigar begin offsets.
+    cigar = _align(alg + "_trace", q, r, open, extend, matrix).cigar
+    for x in cigar.seq:
+        op = _ops[x & 0xf]
+        _append(runs, "M" if op in "=X" else op, int(x >> 4))
+    return cigar.beg_query, cigar.beg_ref
+
+def _gap(open, extend, length):
+    return -(open + (length - 1) * extend)
+
+def _last_row(q, r, open, extend, matrix):
+    # H for the last row of q against every prefix of r, including the
+    # empty one
+    result = _align("nw_rowcol", q, r, open, extend, matrix)
+    row = numpy.empty(len(r) + 1, numpy.int64)
+    row[0] = _gap(open, extend, len(q))
+    row[1:] = result.score_row
+    return row
+
+# below any score a kernel can return
+_NEG = -(1 << 50)
+
+def _sweep(q, r, open, extend, matrix, stop=None):
+    # Global (Gotoh) alignment of q against r a row at a time, in memory
+    # linear in len(r).  Returns, for the last row, H, E (the best score
+    # ending in a gap in r, i.e. I ops) and the row each such gap opened
+    # after.  With stop, returns instead the first cell (i, j), i and j
+    # from 1, where H reaches stop, or None.
+    values = numpy.asarray(matrix.matrix, numpy.int64)
+    mapper = numpy.asarray(matrix.mapper)
+    q_index, r_index = mapper[q], mapper[r]
+    n = len(r)
+    columns = numpy.arange(n + 1, dtype=numpy.int64)
+    # reopening a gap is never worse than extending it when open < extend
+    step = min(open, extend)
+    H = -(open + (columns - 1) * extend)
+    H[0] = 0
+    E = numpy.full(n + 1, _NEG, numpy.int64)
+    E_start = numpy.zeros(n + 1, numpy.int64)
+    F_ramp = columns * step
+    F_base = open + (columns[1:] - 1) * step
+    for i in range(1, len(q) + 1):
+        opened = H - open
+        extended = E - extend
+        from_H = opened >= extended
+        E = numpy.maximum(opened, extended)
+        E_start[from_H] = i - 1
+        G = numpy.empty(n + 1, numpy.int64)
+        G[0] = -(open + (i - 1) * extend)
+        numpy.maximum(H[:-1] + values[q_index[i-1], r_index], E[1:], out=G[1:])
+        # F[j] is the best G[k] - open - (j-k-1)*step over k < j
+        best = numpy.maximum.accumulate(G + F_ramp)
+        H = G
+        numpy.maximum(G[1:], best[:-1] - F_base, out=H[1:])
+        if stop is not None:
+            hits = numpy.flatnonzero(H[1:] == stop)
+            if len(hits):
+                return i, int(hits[0]) + 1
+    if stop is not None:
+        return None
+    return H, E, E_start
+
+def _split(q, r, row, score, open, extend, matrix):
+    # The column at which an optimal path leaves row, with the scores of
+    # the two halves, or None if no optimal path enters row from the
+    # previous one outside a gap in r.  Only H is known at the row, so
+    # paths crossing it within a gap are charged the gap open twice.
+    forward = _last_row(q[:row], r, open, extend, matrix)
+    reverse = _last_row(q[row:][::-1], r[::-1], open, extend, matrix)[::-1]
+    total = forward + reverse
+    column = int(numpy.argmax(total))
+    if total[column] != score:
+        return None
+    return column, int(forward[column]), int(reverse[column])
+
+def _gap_split(q, r, row, open, extend, matrix):
+    # Myers and Miller's split of row, which also joins a gap in r that
+    # crosses it.  Returns (top rows, column, top score, gap length,
+    # bottom start, bottom score): an optimal path aligns q[:top rows]
+    # with r[:column], then inserts the gap length residues of q that
+    # follow as one run of I, then aligns q[bottom start:] with r[column:].
+    m = len(q)
+    H, E, E_start = _sweep(q[:row], r, open, extend, matrix)
+    H_rev, E_rev, E_start_rev = [x[::-1] for x in
+            _sweep(q[row:][::-1], r[::-1], open, extend, matrix)]
+    through = H + H_rev
+    crossing = E + E_rev + open - extend
+    column = int(numpy.argmax(through))
+    gap_column = int(numpy.argmax(crossing))
+    if through[column] >= crossing[gap_column]:
+        return row, column, int(H[column]), 0, row, int(H_rev[column])
+    column = gap_column
+    top = int(E_start[column])
+    bottom = m - int(E_start_rev[column])
+    top_score = int(E[column]) - _gap(open, extend, row - top)
+    bottom_score = int(E_rev[column]) - _gap(open, extend, bottom - row)
+    return top, column, top_score, bottom - top, bottom, bottom_score
+
+def _global(q, r, score, open, extend, matrix, max_cells, runs):
+    # Append to runs an optimal global alignment of q and r, whose score
+    # is known, in space linear in their lengths.  Each piece larger than
+    # max_cells is split at its middle row, by the last-row kernels when
+    # an optimal path crosses the row outside a gap and by _gap_split
+    # otherwise, so the pieces halve at every level.  Pieces and gap runs
+    # wait on a stack in reverse order.
+    stack = [(q, r, score)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item[0], str):
+            _append(runs, *item)
+            continue
+        q, r, score = item
+        m, n = len(q), len(r)
+        if m == 0:
+            _append(runs, "D", n)
+            continue
+        if n == 0:
+            _append(runs, "I", m)
+            continue
+        if m == 1 or m * n <= max_cells:
+            _trace_runs("nw", q, r, open, extend, matrix, runs)
+            continue
+        row = m // 2
+        split = _split(q, r, row, score, open, extend, matrix)
+        if split is not None:
+            column, top, bottom = split
+            stack.append((q[row:], r[column:], bottom))
+            stack.append((q[:row], r[:column], top))
+            continue
+        top_rows, column, top, gap, bottom_start, bottom = _gap_split(
+                q, r, row, open, extend, matrix)
+        stack.append((q[bottom_start:], r[column:], bottom))
+        stack.append(("I", gap))
+        stack.append((q[:top_rows], r[:column], top))
+
+def _equal(a, b, case_sensitive, alphabet_aliases):
+    # compare residues the way the library does for = and X
+    table = numpy.arange(256, dtype=numpy.uint8)
+    if not _bindings._option(case_sensitive, "case_sensitive"):
+        table[ord("a"):ord("z")+1] -= ord("a") - ord("A")
+    equal = table[a] == table[b]
+    aliases = _bindings.b(_bindings._option(alphabet_aliases, "alphabet_aliases") or "")
+    aliases = numpy.frombuffer(aliases, numpy.uint8)
+    for x, y in zip(aliases[0::2], aliases[1::2]):
+        equal |= ((a == x) & (b == y)) | ((a == y) & (b == x))
+    return equal
+
+class _StringTraceback(Traceback):
+    # a Traceback over strings built in Python rather than by the library
+    __slots__ = ("_query", "_comp", "_ref")
+    def __init__(self, query, comp, ref):
+        self.pointer = None
+        self._query = query
+        self._comp = comp
+        self._ref = ref
+    def __del__(self):
+        pass
+    @property
+    def query(self):
+        return self._query
+    @property
+    def comp(self):
+        return self._comp
+    @property
+    def ref(self):
+        return self._ref
+
+class LinearResult:
+    # The result of a linear space traceback alignment.  It has the
+    # score, end and length attributes of Result, and its cigar and
+    # traceback are the same Cigar and Traceback types.
+    saturated = False
+    def __init__(self, score, query, ref, matrix, runs, beg_query, beg_ref,
+            end_query, end_ref):
+        self.score = score
+        self.query = query
+        self.ref = ref
+        self.matrix = matrix
+        self.len_query = len(query)
+        self.len_ref = len(ref)
+        self.end_query = end_query
+        self.end_ref = end_ref
+        self.beg_query = beg_query
+        self.beg_ref = beg_ref
+        self._runs = runs
+        self._cigar = None
+        self._cigar_args = None
+        self._traceback = None
+        self._traceback_args = None
+    def _columns(self, case_sensitive, alphabet_aliases):
+        # one op per alignment column, M resolved to = or X, and the
+        # query and reference residue of each column
+        ops = numpy.repeat(numpy.array([ord(op) for op, length in self._runs], numpy.uint8),
+                [length for op, length in self._runs])
+        qi = self.beg_query + numpy.cumsum(ops != ord("D")) - 1
+        ri = self.beg_ref + numpy.cumsum(ops != ord("I")) - 1
+        qc = self.query[numpy.clip(qi, 0, None)]
+        rc = self.ref[numpy.clip(ri, 0, None)]
+        diagonal = ops == ord("M")
+        equal = _equal(qc, rc, case_sensitive, alphabet_aliases)
+        ops[diagonal & equal] = ord("=")
+        ops[diagonal & ~equal] = ord("X")
+        return ops, qc, rc
+    def get_cigar(self, case_sensitive=None, alphabet_aliases=None):
+        args = (case_sensitive, alphabet_aliases)
+        if self._cigar is None or self._cigar_args != args:
+            ops = self._columns(case_sensitive, alphabet_aliases)[0]
+            starts = numpy.flatnonzero(numpy.diff(ops, prepend=0) != 0) if len(ops) else []
+            lengths = numpy.diff(numpy.append(starts, len(ops)))
+            text = "".join("{}{}".format(int(length), chr(ops[start]))
+                    for start, length in zip(starts, lengths))
+            self._cigar = _bindings._cigar_create(text, self.beg_query, self.beg_ref)
+            self._cigar_args = args
+        return self._cigar
+    @property
+    def cigar(self):
+        return self.get_cigar()
+    def get_traceback(self, mch='|', sim=':', neg='.', case_sensitive=None, alphabet_aliases=None):
+        args = (mch, sim, neg, case_sensitive, alphabet_aliases)
+        if self._traceback is None or self._traceback_args != args:
+            ops, qc, rc = self._columns(case_sensitive, alphabet_aliases)
+            mapper = numpy.asarray(self.matrix.mapper)
+            scores = numpy.asarray(self.matrix.matrix)[mapper[qc], mapper[rc]]
+            comp = numpy.full(len(ops), ord(" "), numpy.uint8)
+            comp[ops == ord("=")] = ord(mch)
+            comp[(ops == ord("X")) & (scores > 0)] = ord(sim)
+            comp[(ops == ord("X")) & (scores <= 0)] = ord(neg)
+            query = numpy.where(ops == ord("D"), ord("-"), qc).astype(numpy.uint8)
+            ref = numpy.where(ops == ord("I"), ord("-"), rc).astype(numpy.uint8)
+            self._traceback = _StringTraceback(*[_bindings.s(x.tobytes()) for x in (query, comp, ref)])
+            self._traceback_args = args
+        return self._traceback
+    @property
+    def traceback(self):
+        return self.get_traceback()
+
+def nw_trace_linear(s1, s2, open, extend, matrix, max_cells=DEFAULT_MAX_CELLS):
+    # Global alignment with traceback, like nw_trace, in memory linear in
+    # the sequence lengths instead of proportional to their product.  The
+    # alignment is split by Hirschberg's method, using the last-row
+    # kernels, until the pieces have at most max_cells cells; those are
+    # aligned by the traceback kernels.  It takes about three times as
+    # long as a score-only alignment, more when long gaps cross the split
+    # rows, since those rows are found again by a numpy sweep.
+    q, r = _residues(s1), _residues(s2)
+    score = _align("nw", q, r, open, extend, matrix).score
+    runs = []
+    _global(q, r, score, open, extend, matrix, max_cells, runs)
+    return LinearResult(score, q, r, matrix, runs, 0, 0, len(q) - 1, len(r) - 1)
+
+def sg_trace_linear(s1, s2, open, extend, matrix, max_cells=DEFAULT_MAX_CELLS):
+    # Semi-global alignment with traceback in linear memory.  The end is
+    # found by a score-only alignment.  The alignment begins in the first
+    # row or column, so its start is where the reversed prefixes, aligned
+    # from the end with free end gaps in one of them, reach the score;
+    # the region between start and end is aligned globally.
+    q, r = _residues(s1), _residues(s2)
+    result = _align("sg", q, r, open, extend, matrix)
+    score, end_query, end_ref = result.score, result.end_query, result.end_ref
+    prefix_query, prefix_ref = q[:end_query+1][::-1], r[:end_ref+1][::-1]
+    reverse = max((_align(alg, prefix_query, prefix_ref, open, extend, matrix)
+            for alg in ("sg_de", "sg_qe")), key=lambda x: x.score)
+    beg_query = end_query - reverse.end_query
+    beg_ref = end_ref - reverse.end_ref
+    runs = []
+    _append(runs, "I", beg_query)
+    _append(runs, "D", beg_ref)
+    _global(q[beg_query:end_query+1], r[beg_ref:end_ref+1], score,
+            open, extend, matrix, max_cells, runs)
+    _append(runs, "I", len(q) - end_query - 1)
+    _append(runs, "D", len(r) - end_ref - 1)
+    return LinearResult(score, q, r, matrix, runs, 0, 0, end_query, end_ref)
+
+def sw_trace_linear(s1, s2, open, extend, matrix, max_cells=DEFAULT_MAX_CELLS):
+    # Local alignment with traceback in linear memory.  The end is found
+    # by a score-only alignment and the start by aligning the reversed
+    # prefixes; the region between them is aligned globally.
+    q, r = _residues(s1), _residues(s2)
+    result = _align("sw", q, r, open, extend, matrix)
+    score, end_query, end_ref = result.score, result.end_query, result.end_ref
+    if score <= 0:
+        return LinearResult(score, q, r, matrix, [], 0, 0, end_query, end_ref)
+    prefix_query, prefix_ref = q[:end_query+1], r[:end_ref+1]
+    reverse = _align("sw", prefix_query[::-1], prefix_ref[::-1], open, extend, matrix)
+    beg_query = end_query - reverse.end_query
+    beg_ref = end_ref - reverse.end_ref
+    if _align("nw", prefix_query[beg_query:], prefix_ref[beg_ref:],
+            open, extend, matrix).score != score:
+        # The reverse pass found a different alignment of the same score.
+        # Sweep back from the end, which is fixed, until some alignment
+        # ending there reaches the score; it begins at that cell.
+        i, j = _sweep(prefix_query[::-1], prefix_ref[::-1], open, extend, matrix, score)
+        beg_query, beg_ref = end_query + 1 - i, end_ref + 1 - j
+    runs = []
+    _global(prefix_query[beg_query:], prefix_ref[beg_ref:], score,
+            open, extend, matrix, max_cells, runs)
+    return LinearResult(score, q, r, matrix, runs, beg_query, beg_ref, end_query, end_ref)
@@ -0,0 +1,141 @@
+# A process pool that searches one set of targets with a single copy of
+# the data.  The packed target residues, their offsets and the scoring
+# matrix are copied once into a multiprocessing.shared_memory block;
+# worker processes map it and rebuild a SequenceBatch and Matrix over it
+# instead of each reading the database and creating its own matrix.
+# Python 3.8+ only; import it as 'from parasail import parallel'.
+#
+#     with parallel.Pool(database, parasail.blosum62) as pool:
+#         batch = pool.align_many(query, 10, 1)
+
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy
+
+from parasail import bindings_v2 as _bindings
+from parasail.bindings_v2 import Matrix, ResultBatch
+from parasail.search import _residues
+from parasail.seqio import SequenceBatch
+
+def _pack(targets, offsets=None):
+    # the residues and int64 offsets of targets, with offsets from 0
+    if offsets is not None:
+        return numpy.asarray(targets, numpy.uint8), numpy.asarray(offsets, numpy.int64)
+    if hasattr(targets, "residues") and hasattr(targets, "offsets"):
+        offsets = numpy.asarray(targets.offsets, numpy.int64)
+        residues = numpy.asarray(targets.residues, numpy.uint8)
+        return residues[offsets[0]:offsets[-1]], offsets - offsets[0]
+    arrays = [_residues(t) for t in targets]
+    offsets = numpy.zeros(len(arrays) + 1, numpy.int64)
+    numpy.cumsum([len(x) for x in arrays], out=offsets[1:])
+    residues = numpy.concatenate(arrays) if arrays else numpy.zeros(0, numpy.uint8)
+    return residues, offsets
+
+def _layout(nresidues, count, size):
+    # byte offsets of the offsets, matrix values and mapper in the block,
+    # each 8-byte aligned after the residues, and the block size
+    offsets = nresidues + (-nresidues % 8)
+    values = offsets + (count + 1) * 8
+    mapper = values + size * size * 4
+    mapper += -mapper % 8
+    return offsets, values, mapper, mapper + 256 * 4
+
+def _views(buffer, nresidues, count, size):
+    offsets, values, mapper, end = _layout(nresidues, count, size)
+    return (numpy.frombuffer(buffer, numpy.uint8, nresidues, 0),
+            numpy.frombuffer(buffer, numpy.int64, count + 1, offsets),
+            numpy.frombuffer(buffer, numpy.int32, size * size, values).reshape(size, size),
+            numpy.frombuffer(buffer, numpy.int32, 256, mapper))
+
+# the shared data, as seen by a worker process
+_worker = None
+
+def _worker_init(name, nresidues, count, size):
+    global _worker
+    block = shared_memory.SharedMemory(name)
+    residues, offsets, values, mapper = _views(block.buf, nresidues, count, size)
+    targets = SequenceBatch(range(count), residues, offsets)
+    _worker = (block, targets, Matrix._from_arrays(values, mapper))
+
+def _worker_align(task):
+    # align query number i against targets[start:stop] and return the
+    # result columns
+    i, query, open, extend, func, start, stop = task
+    block, targets, matrix = _worker
+    batch = _bindings.align_many(query, targets[start:stop], open, extend, matrix, func)
+    columns = [batch.score, batch.end_query, batch.end_ref, batch.flag]
+    if batch.stats:
+        columns += [batch.matches, batch.similar, batch.length]
+    return i, start, stop, columns, batch.escalated
+
+class Pool:
+    # A pool of processes sharing one copy of targets and matrix.  targets
+    # is a SequenceBatch or Database, the result of sequences_from_file, a
+    # list of sequences, or a numpy uint8 buffer of packed residues with
+    # their offsets given separately.  The data is copied into shared
+    # memory once; the block is freed by close().
+    def __init__(self, targets, matrix, processes=None, offsets=None, context=None):
+        residues, offsets = _pack(targets, offsets)
+        self.count = len(offsets) - 1
+        self.processes = processes or os.cpu_count() or 1
+        size = matrix.size
+        end = _layout(len(residues), self.count, size)[-1]
+        self._block = shared_memory.SharedMemory(create=True, size=max(end, 1))
+        try:
+            shared = _views(self._block.buf, len(residues), self.count, size)
+            for view, array in zip(shared, (residues, offsets, matrix.matrix, matrix.mapper)):
+                view[...] = numpy.asarray(array).reshape(view.shape)
+            del shared, view
+            context = context or multiprocessing.get_context()
+            self._pool = context.Pool(self.processes, _worker_init,
+                    (self._block.name, len(residues), self.count, size))
+        except BaseException:
+            self._block.close()
+            self._block.unlink()
+            raise
+    def __len__(self):
+        return self.count
+    def _chunks(self, chunk_size):
+        if chunk_size is None:
+            chunk_size = max(1, -(-self.count // (4 * self.processes)))
+        return [(start, min(start + chunk_size, self.count))
+                for start in range(0, self.count, chunk_size)]
+    def align_many(self, query, open, extend, func="sw_striped_16", chunk_size=None):
+        # align_many of query against every target, with chunks of
+        # chunk_size targets handed out to the processes; by default each
+        # process gets about four chunks.  Returns one ResultBatch in
+        # target order.
+        return self.align_queries([query], open, extend, func, chunk_size)[0]
+    def align_queries(self, queries, open, extend, func="sw_striped_16", chunk_size=None):
+        # align_many for each query, with the chunks of all queries
+        # queued at once.  Returns a list of ResultBatch.
+        name = _bindings._batch_name(func)
+        stats = "_stats" in name
+        queries = [_residues(q).tobytes() for q in queries]
+        batches = [ResultBatch.empty(self.count, stats) for q in queries]
+        tasks = [(i, q, open, extend, name, start, stop)
+                for i, q in enumerate(queries) for start, stop in self._chunks(chunk_size)]
+        for i, start, stop, columns, escalated in self._pool.imap_unordered(_worker_align, tasks):
+            batch = batches[i]
+            arrays = [batch.score, batch.end_query, batch.end_ref, batch.flag]
+            if stats:
+                arrays += [batch._matches, batch._similar, batch._length]
+            for array, column in zip(arrays, columns):
+                array[start:stop] = column
+            for width, count in escalated.items():
+                batch.escalated[width] = batch.escalated.get(width, 0) + count
+        return batches
+    def close(self):
+        # stop the processes and free the shared memory
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._block.close()
+            self._block.unlink()
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
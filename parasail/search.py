@@ -0,0 +1,181 @@
+import collections
+import re
+
+import numpy
+
+from parasail import bindings_v2
+from parasail.bindings_v2 import ResultBatch, align_many
+
+# Rows of (longest target length, kernel family, width), sorted by length.
+# A length of None covers every longer target.  Short targets are cheap
+# enough that the anti-diagonal kernels win; longer targets use the
+# striped and scan profile kernels with 'sat' so pairs that overflow
+# 8 bits are re-run at 16 and then 32 bits.
+DEFAULT_TABLE = (
+    (64, "diag", "16"),
+    (4096, "striped", "sat"),
+    (None, "scan", "sat"),
+)
+
+def _target_lengths(targets):
+    lengths = getattr(targets, "lengths", None)
+    if lengths is None:
+        lengths = [len(t) for t in targets]
+    return numpy.asarray(lengths, numpy.int64)
+
+def length_buckets(lengths, table=DEFAULT_TABLE):
+    # Split target indices by length according to table.  Yields one
+    # (func suffix, indices) pair per non-empty bucket, shortest bucket
+    # first, with the indices of each bucket ordered by target length.
+    lengths = numpy.asarray(lengths, numpy.int64)
+    limits = [limit for limit, family, width in table if limit is not None]
+    if len(limits) != len(table) - (table[-1][0] is None):
+        raise ValueError("only the last row of the table may have no length limit")
+    if list(limits) != sorted(limits):
+        raise ValueError("table rows must be sorted by length")
+    order = numpy.argsort(lengths, kind="mergesort")
+    bounds = numpy.searchsorted(lengths[order], limits, side="right")
+    start = 0
+    for (limit, family, width), stop in zip(table, list(bounds) + [len(order)]):
+        if stop > start:
+            yield "{}_{}".format(family, width), order[start:stop]
+        start = max(start, stop)
+    if start < len(order):
+        raise ValueError("target of length {} is longer than the table allows".format(
+            int(lengths[order[-1]])))
+
+_wider = {"8": "16", "16": "32"}
+
+def align_bucketed(query, targets, open, extend, matrix, mode="sw", table=DEFAULT_TABLE):
+    # Align query against every target, choosing the kernel for each
+    # length bucket from table.  mode is the function prefix, e.g. "sw",
+    # "nw", "sg" or "sw_stats".  Targets that saturate a fixed 8- or
+    # 16-bit width are aligned again with the next wider one, as 'sat'
+    # does.  Results are returned in target order.
+    lengths = _target_lengths(targets)
+    batch = ResultBatch.empty(len(lengths), "_stats" in mode)
+    for suffix, indices in length_buckets(lengths, table):
+        family, width = suffix.rsplit("_", 1)
+        while True:
+            _align_part(query, targets, open, extend, matrix,
+                    "{}_{}_{}".format(mode, family, width), indices, batch)
+            if width not in _wider:
+                break
+            indices = indices[(batch.flag[indices] & bindings_v2._FLAG_SATURATED) != 0]
+            if len(indices) == 0:
+                break
+            width = _wider[width]
+            batch.escalated[int(width)] = batch.escalated.get(int(width), 0) + len(indices)
+    return batch
+
+def _align_part(query, targets, open, extend, matrix, func, indices, batch):
+    # align_many over targets[indices], stored into batch at indices
+    part = align_many(query, [targets[int(i)] for i in indices],
+            open, extend, matrix, func)
+    batch.score[indices] = part.score
+    batch.end_query[indices] = part.end_query
+    batch.end_ref[indices] = part.end_ref
+    batch.flag[indices] = part.flag
+    if batch.stats:
+        batch._matches[indices] = part.matches
+        batch._similar[indices] = part.similar
+        batch._length[indices] = part.length
+    for width, count in part.escalated.items():
+        batch.escalated[width] = batch.escalated.get(width, 0) + count
+
+Hit = collections.namedtuple("Hit", ["index", "score", "result"])
+
+_vector_suffix_re = re.compile("^(.*?)((?:_scan|_striped|_diag)(?:_8|_16|_32|_64|_sat)?)?$")
+
+def _trace_name(name):
+    # sw_striped_16 -> sw_trace_striped_16, sw -> sw_trace
+    if "_stats" in name:
+        raise ValueError("'{}' has no traceback variant".format(name))
+    alg, suffix = _vector_suffix_re.match(name).groups()
+    return alg + "_trace" + (suffix or "")
+
+def top_hits(query, targets, open, extend, matrix, func="sw_striped_16",
+        top_k=None, min_score=None, trace=False, chunk_size=10000):
+    # Score query against every target and return a Hit for each of the
+    # top_k best scoring targets with at least min_score, best first and
+    # ties in target order.  Targets are scored in chunks with align_many
+    # and only the surviving candidates are kept between chunks, so
+    # memory is bounded by chunk_size + top_k rather than by the number
+    # of targets.  A Result is created only for the hits, by aligning
+    # them again with func, or with its traceback variant if trace is
+    # true so that the Result has a cigar.
+    name = bindings_v2._batch_name(func)
+    rerun = getattr(bindings_v2, _trace_name(name) if trace else name)
+    best_index = numpy.zeros(0, numpy.int64)
+    best_score = numpy.zeros(0, numpy.intc)
+    for start in range(0, len(targets), chunk_size):
+        stop = min(start + chunk_size, len(targets))
+        score = align_many(query, [targets[i] for i in range(start, stop)],
+                open, extend, matrix, name).score
+        index = numpy.arange(start, stop)
+        if min_score is not None:
+            keep = score >= min_score
+            score, index = score[keep], index[keep]
+        best_score = numpy.concatenate([best_score, score])
+        best_index = numpy.concatenate([best_index, index])
+        if top_k is not None and len(best_score) > top_k:
+            keep = numpy.lexsort((best_index, -best_score))[:top_k]
+            best_score, best_index = best_score[keep], best_index[keep]
+    order = numpy.lexsort((best_index, -best_score))
+    return [Hit(int(best_index[i]), int(best_score[i]),
+                rerun(query, targets[int(best_index[i])], open, extend, matrix))
+            for i in order]
+
+TracedHit = collections.namedtuple("TracedHit",
+        ["index", "score", "result", "query_begin", "ref_begin"])
+
+def _residues(x):
+    # a uint8 array over any accepted sequence type, for slicing
+    if isinstance(x, numpy.ndarray):
+        return x
+    try:
+        return numpy.frombuffer(bindings_v2.b(x), numpy.uint8)
+    except TypeError:
+        return numpy.frombuffer(bindings_v2.b(str(x)), numpy.uint8)
+
+def score_then_trace(query, targets, open, extend, matrix, func="sw_striped_16",
+        min_score=None, restrict=False):
+    # Score every target with the score-only func, then align the targets
+    # scoring at least min_score again with the traceback variant of func.
+    # Returns a TracedHit per such target, in target order.
+    #
+    # With restrict, which needs a local (sw) func, the traceback is
+    # computed only over the region holding the alignment, so its table
+    # is the size of the alignment rather than of the whole pair.  The
+    # region ends at end_query and end_ref from the first pass; its start
+    # is found by aligning the reversed prefixes with the score-only func.
+    # The result then describes the region, and query_begin and ref_begin
+    # give its offset in query and target.
+    name = bindings_v2._batch_name(func)
+    if restrict and not name.startswith("sw"):
+        raise ValueError("restrict needs a local alignment function, not '{}'".format(name))
+    trace = getattr(bindings_v2, _trace_name(name))
+    score_only = getattr(bindings_v2, name)
+    batch = align_many(query, targets, open, extend, matrix, name)
+    survivors = numpy.arange(len(batch))
+    if min_score is not None:
+        survivors = survivors[batch.score >= min_score]
+    hits = []
+    query_residues = _residues(query) if restrict else None
+    for i in survivors:
+        i = int(i)
+        score = int(batch.score[i])
+        if not restrict or score <= 0:
+            result = trace(query, targets[i], open, extend, matrix)
+            hits.append(TracedHit(i, score, result, 0, 0))
+            continue
+        end_query = int(batch.end_query[i])
+        end_ref = int(batch.end_ref[i])
+        prefix_query = query_residues[:end_query+1]
+        prefix_ref = _residues(targets[i])[:end_ref+1]
+        reverse = score_only(prefix_query[::-1], prefix_ref[::-1], open, extend, matrix)
+        query_begin = end_query - reverse.end_query
+        ref_begin = end_ref - reverse.end_ref
+        result = trace(prefix_query[query_begin:], prefix_ref[ref_begin:], open, extend, matrix)
+        hits.append(TracedHit(i, score, result, query_begin, ref_begin))
+    return hits
@@ -0,0 +1,244 @@
+import collections
+import gzip
+import mmap
+import os
+
+import numpy
+
+SequenceRecord = collections.namedtuple("SequenceRecord", ["name", "seq", "qual"])
+
+class SequenceFile:
+    # A FASTA or FASTQ file opened through mmap with a samtools-style .fai
+    # index of NAME, LENGTH, OFFSET, LINEBASES, LINEWIDTH[, QUALOFFSET].
+    # The index is built on first use and written next to the file; it is
+    # rebuilt whenever the sequence file is newer than the index.
+    # Sequences and qualities stored on a single line are returned as
+    # zero-copy memoryviews of the mapped file.  Sequences wrapped over
+    # several lines are joined into bytes on access.
+    def __init__(self, filename, index=None):
+        self.filename = filename
+        self.index_filename = index or filename + ".fai"
+        self._file = open(filename, "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mmap = b""
+        self._view = memoryview(self._mmap)
+        if self._index_is_current():
+            self._read_index()
+        else:
+            self._build_index()
+            self._write_index()
+        self._lookup = dict((name, i) for i, name in enumerate(self.names))
+    def close(self):
+        # raises BufferError while returned memoryviews are still alive
+        self._view = None
+        if not isinstance(self._mmap, bytes):
+            self._mmap.close()
+        self._file.close()
+    def __enter__(self):
+        return self
+    def __exit__(self, *args):
+        self.close()
+    def __len__(self):
+        return len(self.names)
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    def __contains__(self, name):
+        return name in self._lookup
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._lookup[key]
+        elif isinstance(key, (int, numpy.integer)):
+            if key < 0:
+                key = key + len(self)
+            if key < 0 or key >= len(self):
+                raise IndexError('Index out of range')
+        else:
+            raise TypeError('Index must be int or str, not {}'.format(type(key).__name__))
+        qual = b""
+        if self.qualoffsets is not None:
+            qual = self._region(self.qualoffsets[key], key)
+        return SequenceRecord(self.names[key], self._region(self.offsets[key], key), qual)
+    def _region(self, offset, key):
+        length = int(self.lengths[key])
+        offset = int(offset)
+        if length <= self.linebases[key]:
+            return self._view[offset:offset+length]
+        # wrapped record; skip the line terminators
+        lines = (length - 1) // int(self.linebases[key]) + 1
+        end = offset + length + lines * int(self.linewidths[key] - self.linebases[key])
+        return self._mmap[offset:end].replace(b"\n", b"").replace(b"\r", b"")[:length]
+    def _index_is_current(self):
+        try:
+            return os.path.getmtime(self.index_filename) >= os.path.getmtime(self.filename)
+        except OSError:
+            return False
+    def _read_index(self):
+        rows = []
+        with open(self.index_filename) as fp:
+            for line in fp:
+                if line.strip():
+                    rows.append(line.rstrip("\n").split("\t"))
+        self._set_index(rows)
+    def _write_index(self):
+        try:
+            with open(self.index_filename, "w") as fp:
+                for i, name in enumerate(self.names):
+                    row = [name, self.lengths[i], self.offsets[i], self.linebases[i], self.linewidths[i]]
+                    if self.qualoffsets is not None:
+                        row.append(self.qualoffsets[i])
+                    fp.write("\t".join(str(x) for x in row) + "\n")
+        except (IOError, OSError):
+            # the index is an optimization; read-only locations still work
+            pass
+    def _set_index(self, rows):
+        self.names = [row[0] for row in rows]
+        columns = numpy.array([[int(x) for x in row[1:]] for row in rows], numpy.int64).reshape(len(rows), -1)
+        self.lengths = columns[:,0]
+        self.offsets = columns[:,1]
+        self.linebases = columns[:,2]
+        self.linewidths = columns[:,3]
+        self.qualoffsets = columns[:,4] if columns.shape[1] > 4 else None
+    def _build_index(self):
+        data = self._mmap
+        size = len(data)
+        rows = []
+        if size and data[0:1] == b"@":
+            pos = 0
+            while pos < size:
+                name, seq = self._header(pos)
+                seq_end = self._line_end(seq)
+                plus = self._next_line(seq_end)
+                qual = self._next_line(self._line_end(plus))
+                qual_end = self._line_end(qual)
+                length = seq_end - seq
+                width = self._next_line(seq_end) - seq
+                rows.append([name, length, seq, length, width, qual])
+                pos = self._next_line(qual_end)
+        elif size:
+            if data[0:1] != b">":
+                raise ValueError("'{}' is not a FASTA or FASTQ file".format(self.filename))
+            array = numpy.frombuffer(data, numpy.uint8)
+            pos = 0
+            while pos < size:
+                name, seq = self._header(pos)
+                end = data.find(b"\n>", seq - 1)
+                end = size if end < 0 else end + 1
+                first_end = self._line_end(seq)
+                linebases = first_end - seq
+                linewidth = self._next_line(first_end) - seq
+                region = array[seq:end]
+                length = len(region) - numpy.count_nonzero(region == 10) - numpy.count_nonzero(region == 13)
+                rows.append([name, length, seq, linebases, linewidth])
+                pos = end
+        self._set_index(rows)
+    def _header(self, pos):
+        end = self._line_end(pos)
+        header = self._mmap[pos+1:end].decode("latin_1")
+        return (header.split() or [""])[0], self._next_line(end)
+    def _line_end(self, pos):
+        end = self._mmap.find(b"\n", pos)
+        if end < 0:
+            end = len(self._mmap)
+        if end > pos and self._mmap[end-1:end] == b"\r":
+            end -= 1
+        return end
+    def _next_line(self, line_end):
+        if self._mmap[line_end:line_end+1] == b"\r":
+            line_end += 1
+        return min(line_end + 1, len(self._mmap))
+
+class SequenceBatch:
+    # A chunk of sequences packed into one contiguous uint8 array.  Record
+    # i occupies residues[offsets[i]:offsets[i]+lengths[i]]; indexing
+    # returns that zero-copy slice, so a batch can be passed as the targets
+    # of align_many and align_matrix.
+    def __init__(self, names, residues, offsets, quals=None):
+        self.names = names
+        self.residues = residues
+        self.offsets = offsets
+        self.quals = quals
+    @property
+    def lengths(self):
+        return numpy.diff(self.offsets)
+    def __len__(self):
+        return len(self.names)
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    def __getitem__(self, key):
+        if isinstance(key, (int, numpy.integer)):
+            if key < 0:
+                key = key + len(self)
+            if key < 0 or key >= len(self):
+                raise IndexError('Index out of range')
+            return self.residues[self.offsets[key]:self.offsets[key+1]]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('slice step must be 1')
+            stop = max(start, stop)
+            return SequenceBatch(self.names[start:stop], self.residues,
+                    self.offsets[start:stop+1], self.quals)
+        raise TypeError('Index must be int or slice, not {}'.format(type(key).__name__))
+    def qual(self, key):
+        if self.quals is None:
+            return self.residues[0:0]
+        return self.quals[self.offsets[key]:self.offsets[key+1]]
+    @staticmethod
+    def pack(names, seqs, quals=None):
+        offsets = numpy.zeros(len(seqs)+1, numpy.int64)
+        numpy.cumsum([len(x) for x in seqs], out=offsets[1:])
+        residues = numpy.frombuffer(b"".join(seqs), numpy.uint8)
+        if quals is not None:
+            quals = numpy.frombuffer(b"".join(quals), numpy.uint8)
+        return SequenceBatch(names, residues, offsets, quals)
+
+def _open_sequences(filename):
+    # gzip and bgzip (a series of gzip members) are detected by magic number
+    with open(filename, "rb") as fp:
+        magic = fp.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(filename, "rb")
+    return open(filename, "rb")
+
+def _read_records(fp):
+    line = fp.readline()
+    while line:
+        if line[:1] == b">":
+            name = (line[1:].decode("latin_1").split() or [""])[0]
+            seq = []
+            line = fp.readline()
+            while line and line[:1] != b">":
+                seq.append(line.rstrip(b"\r\n"))
+                line = fp.readline()
+            yield name, b"".join(seq), None
+        elif line[:1] == b"@":
+            name = (line[1:].decode("latin_1").split() or [""])[0]
+            seq = fp.readline().rstrip(b"\r\n")
+            fp.readline()
+            qual = fp.readline().rstrip(b"\r\n")
+            yield name, seq, qual
+            line = fp.readline()
+        elif not line.strip():
+            line = fp.readline()
+        else:
+            raise ValueError("input is not in FASTA or FASTQ format")
+
+def iter_sequences(filename, chunk_size=10000):
+    # Stream a FASTA or FASTQ file, optionally gzip or bgzip compressed,
+    # as SequenceBatch chunks of at most chunk_size records.  Only one
+    # chunk is held in memory at a time.
+    with _open_sequences(filename) as fp:
+        names, seqs, quals = [], [], []
+        for name, seq, qual in _read_records(fp):
+            names.append(name)
+            seqs.append(seq)
+            quals.append(qual)
+            if len(names) == chunk_size:
+                yield SequenceBatch.pack(names, seqs, None if qual is None else quals)
+                names, seqs, quals = [], [], []
+        if names:
+            yield SequenceBatch.pack(names, seqs, None if quals[0] is None else quals)
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+asyncio = pytest.importorskip("asyncio")
+if not hasattr(asyncio, "run"):
+    pytest.skip("parasail.aio needs Python 3.7", allow_module_level=True)
+from parasail import aio
+
+def test1():
+    # coroutines return the same results as the functions
+    matrix = parasail.blosum62
+    result = asyncio.run(aio.sw_trace_striped_16("HEAGAWGHEE", "PAWHEAE", 10, 1, matrix))
+    expected = parasail.sw_trace_striped_16("HEAGAWGHEE", "PAWHEAE", 10, 1, matrix)
+    assert result.score == expected.score
+    assert result.cigar.decode == expected.cigar.decode
+    result = asyncio.run(aio.align("nw_scan_16", "HEAGAWGHEE", "PAWHEAE", 10, 1, matrix))
+    assert result.score == parasail.nw_scan_16("HEAGAWGHEE", "PAWHEAE", 10, 1, matrix).score
+    profile = parasail.profile_create_16("HEAGAWGHEE", matrix)
+    result = asyncio.run(aio.sw_striped_profile_16(profile, "PAWHEAE", 10, 1))
+    assert result.score == expected.score
+    with pytest.raises(AttributeError):
+        aio.no_such_function
+
+def test2():
+    # chunks are reassembled in target order
+    matrix = parasail.blosum62
+    targets = ["PAWHEAE" * (i % 7 + 1) for i in range(50)]
+    with aio.Pool(2) as pool:
+        batch = asyncio.run(aio.align_many("HEAGAWGHEE", targets, 10, 1, matrix,
+                "sw_striped_sat", chunk_size=7, pool=pool))
+    expected = parasail.align_many("HEAGAWGHEE", targets, 10, 1, matrix, "sw_striped_sat")
+    assert list(batch.score) == list(expected.score)
+    assert list(batch.end_ref) == list(expected.end_ref)
+
+def test3():
+    # no more than max_pending calls are submitted at once, and
+    # cancelled calls that have not started never run
+    release = threading.Event()
+    started = []
+    def blocked(i):
+        started.append(i)
+        release.wait()
+        return i
+    async def main(pool):
+        tasks = [asyncio.ensure_future(pool.run(blocked, i)) for i in range(10)]
+        await asyncio.sleep(0.2)
+        assert len(started) == 1
+        assert pool._executor._work_queue.qsize() == 1
+        for task in tasks[1:]:
+            task.cancel()
+        await asyncio.sleep(0.1)
+        release.set()
+        assert await tasks[0] == 0
+        await asyncio.sleep(0.1)
+        return [task.cancelled() for task in tasks]
+    with aio.Pool(max_workers=1, max_pending=2) as pool:
+        cancelled = asyncio.run(main(pool))
+    assert cancelled == [False] + [True] * 9
+    assert started == [0]
+
+def test4():
+    # the event loop keeps running while an alignment runs
+    matrix = parasail.blosum62
+    query = "HEAGAWGHEE" * 300
+    async def main():
+        ticks = 0
+        task = asyncio.ensure_future(aio.sw_striped_16(query, query, 10, 1, matrix))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0)
+        return ticks, task.result()
+    ticks, result = asyncio.run(main())
+    assert ticks > 1
+    assert result.score == parasail.sw_striped_16(query, query, 10, 1, matrix).score
+
+def test5():
+    # workers use the settings of the calling thread
+    matrix = parasail.blosum62
+    async def main():
+        result = await aio.sw_trace_striped_16("HEAGAWGHEE", "heagawghee", 10, 1, matrix)
+        return result.cigar.decode
+    with parasail.settings(case_sensitive=True):
+        assert asyncio.run(main()) == b'10X'
+    with parasail.settings(case_sensitive=False):
+        assert asyncio.run(main()) == b'10='
@@ -0,0 +1,87 @@
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+targets = ["asdf", "asdfasdf", "qwerty", "sdfa", "a"]
+
+def test1():
+    for func in ["sw_striped_16", "sw_scan_32", "nw_striped_8", "sw_stats_striped_16", "sw"]:
+        batch = parasail.align_many(
+                "asdf", targets, 10, 1, parasail.blosum62, func=func)
+        assert(len(batch) == len(targets))
+        for i, target in enumerate(targets):
+            result = getattr(parasail, func)("asdf", target, 10, 1, parasail.blosum62)
+            assert(batch.score[i] == result.score)
+            assert(batch.end_query[i] == result.end_query)
+            assert(batch.end_ref[i] == result.end_ref)
+            assert(batch[i].score == result.score)
+            assert(batch[i].saturated == result.saturated)
+            if "stats" in func:
+                assert(batch[i].matches == result.matches)
+                assert(batch[i].similar == result.similar)
+                assert(batch[i].length == result.length)
+
+def test2():
+    batch = parasail.align_many(
+            "asdf", targets, 10, 1, parasail.blosum62, func=parasail.sw_diag_16)
+    assert(batch[0].score == 20)
+    assert(batch[-1].score == batch.score[-1])
+    with pytest.raises(IndexError):
+        batch[len(targets)]
+    with pytest.raises(AttributeError):
+        batch.matches
+    hits = batch[batch.score > 10]
+    assert(len(hits) == 3)
+    assert(all(hits.score > 10))
+    assert(not any(hits.saturated))
+
+def test3():
+    with pytest.raises(ValueError):
+        parasail.align_many("asdf", targets, 10, 1, parasail.blosum62, func="sw_trace_striped_16")
+    with pytest.raises(ValueError):
+        parasail.align_many("asdf", targets, 10, 1, parasail.blosum62, func="not_a_function")
+
+def test4():
+    queries = ["asdf", "qwer", "sdfasdf"]
+    for threads in [1, 2, None]:
+        score = parasail.align_matrix(queries, targets, 10, 1, parasail.blosum62, threads=threads)
+        assert(score.shape == (len(queries), len(targets)))
+        for i, query in enumerate(queries):
+            for j, target in enumerate(targets):
+                result = parasail.sw_striped_16(query, target, 10, 1, parasail.blosum62)
+                assert(score[i,j] == result.score)
+
+def test5():
+    long_targets = ["asdf"*100, "asdf", "asdf"*10, "qwer"]
+    batch = parasail.align_many("asdf"*100, long_targets, 10, 1, parasail.blosum62, func="sw_striped_sat")
+    for i, target in enumerate(long_targets):
+        result = parasail.sw_striped_32("asdf"*100, target, 10, 1, parasail.blosum62)
+        assert(batch.score[i] == result.score)
+        assert(not batch[i].saturated)
+    assert(batch.escalated[16] >= 1)
+    assert(batch.escalated[16] < len(long_targets))
+
+def test6(capfd):
+    # saturated 8-bit results have no stats to read before escalating
+    long_targets = ["ACDE"*100, "ACDE"]
+    batch = parasail.align_many("ACDE"*100, long_targets, 10, 1, parasail.blosum62, func="sw_stats_striped_sat")
+    for i, target in enumerate(long_targets):
+        result = parasail.sw_stats_striped_32("ACDE"*100, target, 10, 1, parasail.blosum62)
+        assert(batch.score[i] == result.score)
+        assert(batch.matches[i] == result.matches)
+        assert(batch.length[i] == result.length)
+    assert("assert" not in capfd.readouterr().err)
+
+if __name__ == '__main__':
+    print("running tests")
+    test1()
+    test2()
+    test3()
+    test4()
+    test5()
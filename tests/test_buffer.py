@@ -0,0 +1,51 @@
+import numpy
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+blob = b"xxasdfyyqwerzz"
+
+def inputs():
+    return [
+        "asdf",
+        b"asdf",
+        bytearray(b"asdf"),
+        memoryview(blob)[2:6],
+        numpy.frombuffer(blob, numpy.uint8)[2:6],
+        numpy.array([ord(c) for c in "asdf"], numpy.uint8),
+    ]
+
+def test1():
+    for s1 in inputs():
+        for s2 in inputs():
+            result = parasail.sw_striped_16(s1, s2, 10, 1, parasail.blosum62)
+            assert(result.score == 20)
+            result = parasail.nw(s1, s2, 10, 1, parasail.blosum62)
+            assert(result.score == 20)
+
+def test2():
+    for s1 in inputs():
+        profile = parasail.profile_create_16(s1, parasail.blosum62)
+        assert(profile.s1 == "asdf")
+        assert(profile.s1Len == 4)
+        result = parasail.sw_trace_striped_profile_16(profile, memoryview(blob)[2:6], 10, 1)
+        assert(result.score == 20)
+        assert(result.cigar.len == 1)
+        result = parasail.sw_trace(s1, numpy.frombuffer(blob, numpy.uint8)[2:6], 10, 1, parasail.blosum62)
+        assert(result.traceback.query == "asdf")
+
+def test3():
+    view = memoryview(blob)
+    batch = parasail.align_many(view[2:6], [view[2:6], view[8:12]], 10, 1, parasail.blosum62)
+    assert(batch.score[0] == 20)
+
+if __name__ == '__main__':
+    print("running tests")
+    test1()
+    test2()
+    test3()
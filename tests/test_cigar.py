@@ -1,3 +1,5 @@
+import numpy
+
 try:
     import parasail
 except ImportError:
@@ -49,9 +51,50 @@ def test3():
     traceback = result.traceback
     print_traceback_attributes(traceback)
 
+def test4():
+    result = parasail.sw_trace_scan_32("XXHEAGAWGHEE","PAWHEAEYY",10,1,parasail.blosum62)
+    cigar = result.cigar
+    assert cigar.sam == '2=1I2='
+    assert list(cigar.ops) == [7, 1, 7]
+    assert list(cigar.lengths) == [2, 1, 2]
+    assert list(parasail.Cigar.decode_op(cigar.seq)) == [b'=', b'I', b'=']
+    assert list(parasail.Cigar.decode_len(cigar.seq)) == [2, 1, 2]
+    for x in cigar.seq:
+        assert parasail.Cigar.decode_op(numpy.array([x]))[0] == parasail.Cigar.decode_op(int(x))
+    assert parasail.bindings_v2._cigar_string(cigar.seq) == cigar.sam
+
+def test5():
+    result = parasail.sw_trace_scan_32("XXHEAGAWGHEE","PAWHEAEYY",10,1,parasail.blosum62)
+    query, ref = result.cigar.aligned_pairs()
+    assert list(query) == [6, 7, 8, 9, 10]
+    assert list(ref) == [1, 2, -1, 3, 4]
+    query, ref = result.cigar.aligned_pairs(matches_only=True)
+    assert list(query) == [6, 7, 9, 10]
+    assert list(ref) == [1, 2, 3, 4]
+
+def test6():
+    results = [parasail.nw_trace_scan_32(s1, s2, 10, 1, parasail.blosum62)
+            for s1, s2 in [("XXHEAGAWGHEE","PAWHEAEYY"), ("asdf","asdf"), ("HEAGAWGHEE","HEAGAWGHEE")]]
+    stats = parasail.cigar_stats(results)
+    for i, result in enumerate(results):
+        traceback = result.traceback
+        assert stats.matches[i] == traceback.comp.count('|')
+        assert stats.length[i] == len(traceback.comp)
+        assert stats.insertions[i] == traceback.ref.count('-')
+        assert stats.deletions[i] == traceback.query.count('-')
+        assert stats.query_coverage[i] == 1.0
+        assert stats.ref_coverage[i] == 1.0
+    assert stats.identity[2] == 1.0
+    stats = parasail.cigar_stats([x.cigar for x in results])
+    assert stats.query_coverage is None
+    assert len(parasail.cigar_stats([]).matches) == 0
+
 if __name__ == '__main__':
     print("running tests")
     test0()
     test1()
     test2()
     test3()
+    test4()
+    test5()
+    test6()
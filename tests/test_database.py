@@ -0,0 +1,50 @@
+import gzip
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+FASTA = b'>a first\nACGTACGTNN\n>b\nacgt\nac\n>c\n\n>d\nTTTTXT\n'
+
+def test1(tmpdir):
+    filename = tmpdir.join('ref.fa').strpath
+    with open(filename, 'wb') as fp:
+        fp.write(FASTA)
+    database = parasail.Database.build(filename, parasail.nuc44)
+    assert database.filename == filename + '.pdb'
+    assert database.matrix_name == 'nuc44'
+    assert len(database) == 4
+    assert list(database.names) == ['a', 'b', 'c', 'd']
+    assert list(database.lengths) == [10, 6, 0, 6]
+    # residues are stored folded to one character per matrix row
+    assert database[1].tobytes() == b'ACGTAC'
+    database.close()
+    with parasail.Database.open(filename + '.pdb', parasail.nuc44) as database:
+        targets = ['ACGTACGTNN', 'acgtac', 'TTTTXT']
+        subset = database[0:2]
+        scores = parasail.align_many('ACGTAC', subset, 10, 1, parasail.nuc44).score
+        assert list(scores) == [parasail.sw('ACGTAC', t, 10, 1, parasail.nuc44).score
+                                for t in targets[:2]]
+        assert (parasail.sw('TTTTAT', database[3], 10, 1, parasail.nuc44).score ==
+                parasail.sw('TTTTAT', targets[2], 10, 1, parasail.nuc44).score)
+        del subset, scores
+    with pytest.raises(ValueError):
+        parasail.Database.open(filename + '.pdb', parasail.blosum62)
+    with pytest.raises(ValueError):
+        parasail.Database.open(filename)
+
+def test2(tmpdir):
+    filename = tmpdir.join('ref.fa.gz').strpath
+    with gzip.open(filename, 'wb') as fp:
+        fp.write(FASTA)
+    output = tmpdir.join('ref.pdb').strpath
+    database = parasail.Database.build(filename, parasail.nuc44, output, chunk_size=1)
+    assert list(database.offsets) == [0, 10, 16, 16, 22]
+    assert database.names[1:3] == ['b', 'c']
+    database.close()
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+import parasail.dispatch
+
+@pytest.fixture
+def tune_file(tmpdir, monkeypatch):
+    filename = tmpdir.join('tune.json').strpath
+    monkeypatch.setenv('PARASAIL_TUNE_FILE', filename)
+    monkeypatch.setattr(parasail.dispatch, '_tables', None)
+    return filename
+
+def test1(tune_file):
+    assert parasail.tuned_table(parasail.blosum62) == parasail.search.DEFAULT_TABLE
+    table = parasail.tune(parasail.blosum62, 'sw', lengths=(8, 32, 128), pairs=2, repeat=1)
+    assert table[-1][0] is None
+    assert [row[0] for row in table[:-1]] == sorted(row[0] for row in table[:-1])
+    assert parasail.tuned_table(parasail.blosum62) == table
+    assert parasail.tuned_table(parasail.blosum62, 'nw') == parasail.search.DEFAULT_TABLE
+    # a new process reads the table back from the tune file
+    parasail.dispatch._tables = None
+    assert parasail.tuned_table(parasail.blosum62) == table
+    # a tune file from another CPU or library is ignored
+    with open(tune_file) as fp:
+        data = json.load(fp)
+    data['cpu']['version'] = '0.0.0'
+    with open(tune_file, 'w') as fp:
+        json.dump(data, fp)
+    parasail.dispatch._tables = None
+    assert parasail.tuned_table(parasail.blosum62) == parasail.search.DEFAULT_TABLE
+
+def test2(tune_file):
+    query = 'HEAGAWGHEE' * 30
+    for mode in ['sw', 'nw', 'sg']:
+        expected = getattr(parasail, mode)(query, query[5:], 10, 1, parasail.blosum62)
+        result = parasail.align(query, query[5:], 10, 1, parasail.blosum62, mode=mode)
+        assert result.score == expected.score
+    # an 8-bit kernel saturates on this pair and is escalated
+    parasail.dispatch._tables[parasail.dispatch._key(parasail.blosum62, 'sw')] = ((None, 'striped', '8'),)
+    result = parasail.align(query, query, 10, 1, parasail.blosum62)
+    assert not result.saturated
+    assert result.score == parasail.sw(query, query, 10, 1, parasail.blosum62).score
+    with pytest.raises(ValueError):
+        parasail.align(query, query, 10, 1, parasail.blosum62, mode='xx')
+
+def test3(tune_file):
+    # fixed widths from a tuned table escalate saturated hits
+    matrix = parasail.blosum62
+    query = 'ARNDCQEGHILKMFPSTWYV' * 15
+    targets = [query, query[:100], 'HEAGAWGHEE' * 5]
+    key = parasail.dispatch._key(matrix, 'sw')
+    parasail.dispatch._get_tables()[key] = ((64, 'diag', '8'), (None, 'striped', '8'))
+    batch = parasail.align_bucketed(query, targets, 10, 1, matrix, table=parasail.tuned_table(matrix))
+    assert list(batch.score) == [parasail.sw_striped_32(query, t, 10, 1, matrix).score for t in targets]
+    assert not batch.saturated.any()
+    assert batch.escalated[16] == 2
+    # past 16 bits as well
+    query = 'W' * 3000
+    batch = parasail.align_bucketed(query, [query], 10, 1, matrix, table=((None, 'scan', '16'),))
+    assert batch.score[0] == 33000
+    assert batch.escalated[32] == 1
+
+def test4(tune_file):
+    # unnamed matrices of the same size keep separate tuned tables
+    a = parasail.matrix_create('ACGT', 2, -1)
+    b = parasail.matrix_create('ACGT', 5, -4)
+    assert parasail.dispatch._key(a, 'sw') != parasail.dispatch._key(b, 'sw')
+    assert parasail.dispatch._key(a, 'sw') == parasail.dispatch._key(a.copy(), 'sw')
+    table_a = parasail.tune(a, 'sw', lengths=(8, 32), pairs=1, repeat=1)
+    table_b = parasail.tune(b, 'sw', lengths=(8,), pairs=1, repeat=1)
+    with open(tune_file) as fp:
+        assert len(json.load(fp)['tables']) == 2
+    parasail.dispatch._tables = None
+    assert parasail.tuned_table(a) == table_a
+    assert parasail.tuned_table(b) == table_b
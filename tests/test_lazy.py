@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+CHECK = """
+import parasail
+from parasail import bindings_v2
+assert 'sw_striped_16' not in vars(bindings_v2)
+assert 'sw_striped_16' not in vars(parasail)
+assert 'sw_striped_16' in dir(parasail)
+func = parasail.sw_striped_16
+assert func is bindings_v2.sw_striped_16
+assert func.__name__ == 'sw_striped_16'
+assert 'sw_striped_16' in vars(parasail)
+assert func('asdf', 'asdf', 10, 1, parasail.blosum62).score == 20
+"""
+
+MATRICES = """
+import gc
+import time
+import numpy
+start = time.time()
+import parasail
+elapsed = time.time() - start
+from parasail import bindings_v2
+assert not [x for x in gc.get_objects() if isinstance(x, bindings_v2.Matrix)]
+assert 'blosum62' not in vars(bindings_v2)
+assert 'pam250' in dir(parasail)
+matrix = parasail.blosum62
+assert matrix is parasail.blosum62 is bindings_v2.blosum62
+assert matrix.name == b'blosum62'
+# generous bound; importing the bindings alone takes tens of milliseconds
+assert elapsed < 1.0, elapsed
+"""
+
+def run(code):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([path, env.get('PYTHONPATH', '')])
+    subprocess.check_call([sys.executable, '-c', code], env=env)
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="module __getattr__ needs Python 3.7")
+def test1():
+    run(CHECK)
+
+def test2():
+    assert parasail.sw_trace_scan_profile_16.__name__ == 'sw_trace_scan_profile_16'
+    with pytest.raises(AttributeError):
+        parasail.sw_striped_17
+    assert not hasattr(parasail, 'sw_no_such_function')
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="module __getattr__ needs Python 3.7")
+def test3():
+    run(MATRICES)
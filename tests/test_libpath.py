@@ -0,0 +1,72 @@
+import ctypes
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+def found_without_search():
+    if os.path.isfile(os.path.join(os.path.dirname(parasail.__file__), parasail._libname)):
+        return True
+    try:
+        ctypes.CDLL(parasail._libname)
+        return True
+    except OSError:
+        return False
+
+pytestmark = pytest.mark.skipif(found_without_search(),
+        reason="library is found before the search")
+
+def import_libpath(tmpdir, libpath):
+    env = dict((k, v) for k, v in os.environ.items()
+            if k not in ('LD_LIBRARY_PATH', 'DYLD_LIBRARY_PATH'))
+    env['PARASAIL_LIBPATH'] = libpath
+    env['PARASAIL_LIBPATH_CACHE'] = tmpdir.join('cache.json').strpath
+    env['PYTHONPATH'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    process = subprocess.Popen([sys.executable, '-c', 'import parasail; print(parasail._libpath)'],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    if process.returncode:
+        return None
+    return out.decode().strip()
+
+def test1(tmpdir):
+    lib = tmpdir.mkdir('prefix').mkdir('lib').join(parasail._libname).strpath
+    shutil.copy(parasail._libpath, lib)
+    assert import_libpath(tmpdir, tmpdir.join('prefix').strpath) == lib
+    with open(tmpdir.join('cache.json').strpath) as fp:
+        cached = json.load(fp)
+    assert cached['path'] == lib
+    assert cached['size'] == os.path.getsize(lib)
+    # later imports use the cached path without searching
+    assert import_libpath(tmpdir, '') == lib
+    # a library that changed since it was cached is not used
+    with open(lib, 'ab') as fp:
+        fp.write(b'\0')
+    assert import_libpath(tmpdir, '') is None
+
+def test2(tmpdir):
+    # the search does not descend into arbitrary subdirectories
+    lib = tmpdir.mkdir('prefix').mkdir('a').mkdir('b').join(parasail._libname).strpath
+    shutil.copy(parasail._libpath, lib)
+    assert import_libpath(tmpdir, tmpdir.join('prefix').strpath) is None
+    assert import_libpath(tmpdir, tmpdir.join('prefix', 'a', 'b').strpath) == lib
+
+def test3(tmpdir):
+    # an explicit PARASAIL_LIBPATH wins over the cached path
+    first = tmpdir.mkdir('first').join(parasail._libname).strpath
+    second = tmpdir.mkdir('second').join(parasail._libname).strpath
+    shutil.copy(parasail._libpath, first)
+    shutil.copy(parasail._libpath, second)
+    assert import_libpath(tmpdir, tmpdir.join('first').strpath) == first
+    assert import_libpath(tmpdir, tmpdir.join('second').strpath) == second
+    assert import_libpath(tmpdir, '') == second
@@ -0,0 +1,135 @@
+import random
+import re
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+alphabet = 'ARNDCQEGHILKMFPSTWYV'
+
+def related_pair(rng, length):
+    query = ''.join(rng.choice(alphabet) for i in range(length))
+    ref = []
+    for c in query:
+        x = rng.random()
+        if x < 0.1:
+            ref.append(rng.choice(alphabet))
+        elif x < 0.15:
+            continue
+        elif x < 0.2:
+            ref.append(c + ''.join(rng.choice(alphabet) for i in range(rng.randint(1, 8))))
+        else:
+            ref.append(c)
+    prefix = ''.join(rng.choice(alphabet) for i in range(rng.randint(0, 30)))
+    return query, prefix + ''.join(ref)
+
+def cigar_score(query, ref, cigar, open, extend, matrix, free_end_gaps=False):
+    # score the cigar independently, returning it with the end positions
+    ops = re.findall(r'(\d+)([=XID])', parasail.bindings_v2.s(cigar.decode))
+    i, j = cigar.beg_query, cigar.beg_ref
+    score = 0
+    for k, (length, op) in enumerate(ops):
+        length = int(length)
+        if op in '=X':
+            for x in range(length):
+                assert (op == '=') == (query[i] == ref[j])
+                score += matrix.matrix[matrix.mapper[ord(query[i])], matrix.mapper[ord(ref[j])]]
+                i, j = i + 1, j + 1
+            continue
+        if not (free_end_gaps and k in (0, len(ops) - 1)):
+            score -= open + (length - 1) * extend
+        if op == 'I':
+            i += length
+        else:
+            j += length
+    return score, i, j
+
+def check(alg, rng, length, max_cells):
+    query, ref = related_pair(rng, length)
+    open, extend = rng.choice([(10, 1), (11, 1), (3, 1), (5, 2)])
+    matrix = parasail.blosum62
+    expected = getattr(parasail, alg + '_trace_scan_32')(query, ref, open, extend, matrix)
+    result = getattr(parasail, alg + '_trace_linear')(query, ref, open, extend, matrix, max_cells)
+    assert result.score == expected.score
+    assert result.end_query == expected.end_query
+    assert result.end_ref == expected.end_ref
+    cigar = result.cigar
+    assert isinstance(cigar, parasail.Cigar)
+    score, i, j = cigar_score(query, ref, cigar, open, extend, matrix, alg == 'sg')
+    assert score == result.score
+    if alg == 'sw':
+        assert (i - 1, j - 1) == (result.end_query, result.end_ref)
+    else:
+        assert (i, j) == (len(query), len(ref))
+    traceback = result.traceback
+    assert isinstance(traceback, parasail.Traceback)
+    assert traceback.query.replace('-', '') == query[cigar.beg_query:i]
+    assert traceback.ref.replace('-', '') == ref[cigar.beg_ref:j]
+    assert len(traceback.comp) == len(traceback.query)
+    assert traceback.comp.count('|') == sum(
+            int(n) for n, op in re.findall(r'(\d+)(=)', parasail.bindings_v2.s(cigar.decode)))
+
+def test1():
+    # small pairs split down to single rows against the library's traceback
+    rng = random.Random(1)
+    for i in range(50):
+        for alg in ('nw', 'sg', 'sw'):
+            check(alg, rng, rng.randint(1, 200), rng.choice([1, 64, 1000]))
+
+def test2():
+    # a pair whose traceback table would hold 25 million cells
+    rng = random.Random(2)
+    for alg in ('nw', 'sg', 'sw'):
+        check(alg, rng, 5000, parasail.linear.DEFAULT_MAX_CELLS)
+
+def test3():
+    # the same strings as the library for a pair small enough to be
+    # aligned directly
+    matrix = parasail.blosum62
+    for alg in ('nw', 'sg', 'sw'):
+        expected = getattr(parasail, alg + '_trace_scan_32')('XXHEAGAWGHEE', 'PAWHEAEYY', 10, 1, matrix)
+        result = getattr(parasail, alg + '_trace_linear')('XXHEAGAWGHEE', 'PAWHEAEYY', 10, 1, matrix)
+        assert result.cigar.decode == expected.cigar.decode
+        assert result.cigar.beg_query == expected.cigar.beg_query
+        assert result.cigar.beg_ref == expected.cigar.beg_ref
+        for attr in ('query', 'comp', 'ref'):
+            assert getattr(result.traceback, attr) == getattr(expected.traceback, attr)
+
+def test4():
+    result = parasail.sw_trace_linear('AAAA', 'WWWW', 10, 1, parasail.blosum62)
+    assert result.score == 0
+    assert result.cigar.len == 0
+    assert result.traceback.query == ''
+
+def test5():
+    # long insertions and deletions crossing every split row
+    rng = random.Random(5)
+    matrix = parasail.matrix_create("ACGT", 2, -1)
+    ref = ''.join(rng.choice('ACGT') for i in range(2000))
+    query = ref[:1000] + ''.join(rng.choice('ACGT') for i in range(6000)) + ref[1000:]
+    for q, r in ((query, ref), (ref, query)):
+        for alg in ('nw', 'sg', 'sw'):
+            result = getattr(parasail, alg + '_trace_linear')(q, r, 5, 1, matrix, 10000)
+            assert result.score == getattr(parasail, alg + '_scan_32')(q, r, 5, 1, matrix).score
+            score, i, j = cigar_score(q, r, result.cigar, 5, 1, matrix, alg == 'sg')
+            assert score == result.score
+    assert b'6000I' in parasail.nw_trace_linear(query, ref, 5, 1, matrix, 10000).cigar.decode
+
+def test6():
+    # the numpy sweep agrees with the last-row kernels, and finds where
+    # the score is first reached
+    rng = random.Random(6)
+    matrix = parasail.blosum62
+    for open, extend in ((10, 1), (3, 1), (4, 4)):
+        query, ref = related_pair(rng, 60)
+        q, r = parasail.search._residues(query), parasail.search._residues(ref)
+        H, E, E_start = parasail.linear._sweep(q, r, open, extend, matrix)
+        assert list(H) == list(parasail.linear._last_row(q, r, open, extend, matrix))
+        score = parasail.nw_scan_32(query[:40], ref[:30], open, extend, matrix).score
+        i, j = parasail.linear._sweep(q, r, open, extend, matrix, score)
+        assert parasail.nw_scan_32(query[:i], ref[:j], open, extend, matrix).score == score
+        assert (i, j) <= (40, 30)
@@ -1,3 +1,6 @@
+import numpy
+import pytest
+
 try:
     import parasail
 except ImportError:
@@ -29,6 +32,51 @@ def test1():
     print(matrix.matrix)
     print(matrix.mapper)
 
+def test2():
+    matrix = parasail.matrix_create("ACGT", 5, -4)
+    expected = matrix.matrix.copy()
+    matrix[1:3, 1:3] = 30
+    expected[1:3, 1:3] = 30
+    matrix[0] = -9
+    expected[0] = -9
+    matrix[:, -1] = 2
+    expected[:, -1] = 2
+    matrix[3, :4] = numpy.array([1, 2, 3, 4])
+    expected[3, :4] = [1, 2, 3, 4]
+    matrix[(2, 1)] = 7
+    expected[2, 1] = 7
+    assert (matrix.matrix == expected).all()
+    assert matrix.max == 30
+    assert matrix.min == -9
+    with pytest.raises(IndexError):
+        matrix[(1,)] = 0
+    with pytest.raises(IndexError):
+        matrix[1, 2, 3] = 0
+
+def test3():
+    scores = numpy.array([[5, -4, -4, -4],
+                          [-4, 5, -4, -4],
+                          [-4, -4, 5, -4],
+                          [-4, -4, -4, 5]]) * 2
+    matrix = parasail.Matrix.from_numpy("ACGT", scores)
+    assert (matrix.matrix[:4, :4] == scores).all()
+    assert (matrix.matrix[4] == 0).all()
+    assert matrix.max == 10
+    assert matrix.min == -8
+    reference = parasail.matrix_create("ACGT", 10, -8)
+    for func in [parasail.sw, parasail.nw_striped_16, parasail.sg_scan_32]:
+        assert (func("ACGTTGCA", "ACGGTCA", 10, 1, matrix).score ==
+                func("ACGTTGCA", "ACGGTCA", 10, 1, reference).score)
+    full = numpy.full((5, 5), -1, numpy.int8)
+    matrix = parasail.Matrix.from_numpy(b"ACGT", full)
+    assert (matrix.matrix == -1).all()
+    with pytest.raises(ValueError):
+        parasail.Matrix.from_numpy("ACGT", numpy.zeros((3, 3), int))
+    with pytest.raises(ValueError):
+        parasail.Matrix.from_numpy("ACGT", numpy.zeros(16, int))
+    with pytest.raises(TypeError):
+        parasail.Matrix.from_numpy("ACGT", numpy.zeros((4, 4)))
+
 if __name__ == '__main__':
     print("running tests")
     test1()
@@ -0,0 +1,58 @@
+import random
+
+import numpy
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+pytest.importorskip("multiprocessing.shared_memory")
+from parasail import parallel
+
+def random_sequences(count, seed=1):
+    rng = random.Random(seed)
+    return [''.join(rng.choice('ARNDCQEGHILKMFPSTWYV') for _ in range(rng.randint(1, 300)))
+            for i in range(count)]
+
+def test1():
+    targets = random_sequences(100)
+    query = targets[7]
+    matrix = parasail.blosum62
+    expected = parasail.align_many(query, targets, 10, 1, matrix, "sw_striped_sat")
+    with parallel.Pool(targets, matrix, processes=2) as pool:
+        assert len(pool) == 100
+        batch = pool.align_many(query, 10, 1, "sw_striped_sat", chunk_size=9)
+        stats = pool.align_many(query, 10, 1, "sw_stats_striped_16")
+    assert (batch.score == expected.score).all()
+    assert (batch.end_query == expected.end_query).all()
+    assert (batch.end_ref == expected.end_ref).all()
+    assert sum(batch.escalated.values()) == sum(expected.escalated.values())
+    expected = parasail.align_many(query, targets, 10, 1, matrix, "sw_stats_striped_16")
+    assert (stats.matches == expected.matches).all()
+    assert (stats.length == expected.length).all()
+
+def test2():
+    # a user matrix and packed residues with offsets
+    targets = random_sequences(30, seed=2)
+    batch = parasail.SequenceBatch.pack(list(range(30)), [t.encode() for t in targets])
+    matrix = parasail.matrix_create("ARNDCQEGHILKMFPSTWYV", 3, -2)
+    queries = targets[:3]
+    with parallel.Pool(batch.residues, matrix, processes=2, offsets=batch.offsets) as pool:
+        results = pool.align_queries(queries, 5, 1, "nw_scan_16")
+    for query, result in zip(queries, results):
+        expected = parasail.align_many(query, targets, 5, 1, matrix, "nw_scan_16")
+        assert (result.score == expected.score).all()
+
+def test3():
+    # a slice of a batch is shared from its first residue
+    targets = random_sequences(30, seed=3)
+    batch = parasail.SequenceBatch.pack(list(range(30)), [t.encode() for t in targets])
+    with parallel.Pool(batch[10:20], parasail.pam50, processes=1) as pool:
+        result = pool.align_many(targets[0], 10, 1)
+    expected = parasail.align_many(targets[0], targets[10:20], 10, 1, parasail.pam50)
+    assert (result.score == expected.score).all()
@@ -0,0 +1,118 @@
+import multiprocessing
+import pickle
+
+import numpy
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+query = "ACGTTGCAAGTCCA"
+ref = "TTACGTAGCAAGTAACCAT"
+
+def roundtrip(x):
+    return pickle.loads(pickle.dumps(x, pickle.HIGHEST_PROTOCOL))
+
+def score(args):
+    result, = args
+    return result.score, result.cigar.decode
+
+def test1():
+    # built-in matrices unpickle to the same object, others by value
+    assert roundtrip(parasail.blosum62) is parasail.blosum62
+    matrix = parasail.matrix_create("ACGT", 2, -1)
+    matrix[1, 2] = 7
+    copy = roundtrip(matrix)
+    assert numpy.array_equal(copy.matrix, matrix.matrix)
+    assert numpy.array_equal(copy.mapper, matrix.mapper)
+    assert copy.max == 7
+    result = parasail.sw_trace(query, ref, 3, 1, matrix)
+    assert parasail.sw_trace(query, ref, 3, 1, copy).cigar.decode == result.cigar.decode
+
+def test2():
+    # profiles are rebuilt with the same width and stats
+    matrix = parasail.blosum62
+    long_query = "ACDE" * 100
+    def widths(profile):
+        return [bool(getattr(profile.pointer[0], "profile" + w).score)
+                for w in ("8", "16", "32", "64")]
+    for width in ("8", "16", "32", "64", "sat"):
+        for stats in ("", "stats_"):
+            profile = getattr(parasail, "profile_create_" + stats + width)(long_query, matrix)
+            copy = roundtrip(profile)
+            assert copy.s1 == profile.s1
+            assert (copy.width, copy.stats) == (width, bool(stats))
+            assert widths(copy) == widths(profile)
+            func = getattr(parasail, "sw_" + stats + "striped_profile_" + width)
+            expected = func(profile, long_query, 10, 1)
+            result = func(copy, long_query, 10, 1)
+            assert result.score == expected.score
+            assert result.saturated == expected.saturated
+            if stats and not expected.saturated:
+                assert result.matches == expected.matches
+    profile = parasail.ssw_init(long_query, matrix, 2)
+    copy = roundtrip(profile)
+    assert parasail.ssw_profile(copy, long_query, 10, 1).score1 == \
+            parasail.ssw_profile(profile, long_query, 10, 1).score1
+
+def test3():
+    # results keep their scores, stats and arrays
+    matrix = parasail.matrix_create("ACGT", 2, -1)
+    result = parasail.sw_stats_rowcol_striped_16(query, ref, 3, 1, matrix)
+    copy = roundtrip(result)
+    assert (copy.score, copy.end_query, copy.end_ref) == (result.score, result.end_query, result.end_ref)
+    assert (copy.matches, copy.similar, copy.length) == (result.matches, result.similar, result.length)
+    for name in ("score_row", "score_col", "length_row", "matches_col"):
+        assert numpy.array_equal(getattr(copy, name), getattr(result, name))
+    result = parasail.nw_table(query, ref, 3, 1, matrix)
+    assert numpy.array_equal(roundtrip(result).score_table, result.score_table)
+    copy = roundtrip(parasail.sw(query, ref, 3, 1, matrix))
+    try:
+        copy.matches
+        assert False
+    except AttributeError:
+        pass
+
+def test4():
+    # traceback results keep their cigar and rebuild the traceback
+    matrix = parasail.matrix_create("ACGT", 2, -1)
+    for name in ("sw_trace_striped_16", "sg_trace_scan_32", "nw_trace"):
+        result = getattr(parasail, name)(query, ref, 3, 1, matrix)
+        copy = roundtrip(result)
+        assert copy.cigar.decode == result.cigar.decode
+        assert copy.cigar.beg_query == result.cigar.beg_query
+        assert copy.cigar.beg_ref == result.cigar.beg_ref
+        for a, b in ((copy.traceback, result.traceback),
+                (roundtrip(copy).traceback, result.traceback)):
+            assert (a.query, a.comp, a.ref) == (b.query, b.comp, b.ref)
+    cigar = roundtrip(result.cigar)
+    assert cigar.decode == result.cigar.decode
+    assert roundtrip(parasail.sw_trace("AAA", "TTT", 3, 1, matrix)).cigar.len == 0
+    result = parasail.sw_trace(query, ref, 3, 1, matrix)
+    linear = roundtrip(parasail.sw_trace_linear(query, ref, 3, 1, matrix))
+    assert linear.score == result.score
+    assert linear.traceback.query == result.traceback.query
+    assert linear.traceback.ref == result.traceback.ref
+
+def test5():
+    # results cross process boundaries
+    matrix = parasail.matrix_create("ACGT", 2, -1)
+    results = [parasail.sw_trace_scan_16(query, ref[i:], 3, 1, matrix) for i in range(3)]
+    pool = multiprocessing.get_context("spawn").Pool(1)
+    try:
+        seen = pool.map(score, [(r,) for r in results])
+    finally:
+        pool.terminate()
+        pool.join()
+    assert seen == [(r.score, r.cigar.decode) for r in results]
+
+if __name__ == '__main__':
+    test1()
+    test2()
+    test3()
+    test4()
+    test5()
@@ -0,0 +1,59 @@
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+def test1():
+    cache = parasail.ProfileCache()
+    p1 = cache.get("asdf", parasail.blosum62, 16)
+    p2 = cache.get("asdf", parasail.blosum62, "16")
+    p3 = cache.get("asdf", parasail.blosum62, 8)
+    p4 = cache.get("asdf", parasail.blosum62, 16, stats=True)
+    assert(p1 is p2)
+    assert(p1 is not p3)
+    assert(p1 is not p4)
+    assert(cache.hits == 1)
+    assert(cache.misses == 3)
+    assert(len(cache) == 3)
+    cache.clear()
+    assert(len(cache) == 0)
+    assert(cache.nbytes == 0)
+
+def test2():
+    cache = parasail.ProfileCache(max_bytes=4*24*2*2)
+    cache.get("asdf", parasail.blosum62, 16)
+    cache.get("qwer", parasail.blosum62, 16)
+    cache.get("asdf", parasail.blosum62, 16)
+    cache.get("zxcv", parasail.blosum62, 16)
+    assert(len(cache) == 2)
+    assert(cache.nbytes <= cache.max_bytes)
+    cache.get("asdf", parasail.blosum62, 16)
+    assert(cache.hits == 2)
+
+def test3():
+    cache = parasail.ProfileCache()
+    parasail.set_profile_cache(cache)
+    try:
+        for i in range(3):
+            result = parasail.sw_striped_16("asdf", "asdf", 10, 1, parasail.blosum62)
+            assert(result.score == 20)
+            result = parasail.sw_stats_striped_16("asdf", "asdf", 10, 1, parasail.blosum62)
+            assert(result.matches == 4)
+            result = parasail.sw_trace_scan_16("asdf", "asdf", 10, 1, parasail.blosum62)
+            assert(result.cigar.len == 1)
+        batch = parasail.align_many("asdf", ["asdf", "qwer"], 10, 1, parasail.blosum62)
+        assert(batch.score[0] == 20)
+    finally:
+        parasail.set_profile_cache(None)
+    # striped and scan functions share the same 16-bit profile
+    assert(cache.misses == 2)
+    assert(cache.hits == 8)
+
+if __name__ == '__main__':
+    print("running tests")
+    test1()
+    test2()
+    test3()
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+def random_sequences(count, lengths, seed=1):
+    rng = random.Random(seed)
+    return [''.join(rng.choice('ARNDCQEGHILKMFPSTWYV') for _ in range(rng.choice(lengths)))
+            for i in range(count)]
+
+def test1():
+    lengths = [5, 100, 64, 3, 9000, 65]
+    buckets = list(parasail.length_buckets(lengths))
+    assert [suffix for suffix, indices in buckets] == ['diag_16', 'striped_sat', 'scan_sat']
+    assert [list(indices) for suffix, indices in buckets] == [[3, 0, 2], [5, 1], [4]]
+    with pytest.raises(ValueError):
+        list(parasail.length_buckets(lengths, ((100, 'striped', '16'),)))
+    with pytest.raises(ValueError):
+        list(parasail.length_buckets(lengths, ((100, 'striped', '16'), (10, 'scan', '16'))))
+
+def test2():
+    targets = random_sequences(40, [10, 50, 100, 500, 5000])
+    query = targets[3]
+    for mode in ['sw', 'nw', 'sg']:
+        expected = [getattr(parasail, mode)(query, t, 10, 1, parasail.blosum62).score
+                    for t in targets]
+        results = parasail.align_bucketed(query, targets, 10, 1, parasail.blosum62, mode)
+        assert list(results.score) == expected
+
+def test3():
+    targets = random_sequences(20, [10, 200])
+    query = targets[0]
+    table = ((64, 'striped', '16'), (None, 'striped', 'sat'))
+    results = parasail.align_bucketed(query, targets, 10, 1, parasail.blosum62, 'sw_stats', table)
+    for i, target in enumerate(targets):
+        expected = parasail.sw_stats(query, target, 10, 1, parasail.blosum62)
+        assert results[i].score == expected.score
+        assert results[i].matches == expected.matches
+
+def test4():
+    targets = random_sequences(300, [20, 80, 200], seed=3)
+    query = targets[7][5:60]
+    expected = sorted((-parasail.sw(query, t, 10, 1, parasail.blosum62).score, i)
+                      for i, t in enumerate(targets))
+    for chunk_size in [1, 64, 10000]:
+        hits = parasail.top_hits(query, targets, 10, 1, parasail.blosum62,
+                                 top_k=5, chunk_size=chunk_size)
+        assert [(h.index, h.score) for h in hits] == [(i, -s) for s, i in expected[:5]]
+        assert all(h.result.score == h.score for h in hits)
+    hits = parasail.top_hits(query, targets, 10, 1, parasail.blosum62, min_score=40)
+    assert [h.index for h in hits] == [i for s, i in expected if -s >= 40]
+    hits = parasail.top_hits(query, targets, 10, 1, parasail.blosum62,
+                             func='sw_scan_sat', top_k=3, min_score=40, trace=True)
+    assert len(hits) == 3
+    for hit in hits:
+        assert hit.result.score == hit.score
+        assert hit.result.cigar.beg_ref >= 0
+
+def test5():
+    targets = random_sequences(10, [20])
+    with pytest.raises(ValueError):
+        parasail.top_hits('ACDE', targets, 10, 1, parasail.blosum62, func='sw_trace_striped_16')
+    with pytest.raises(ValueError):
+        parasail.top_hits('ACDE', targets, 10, 1, parasail.blosum62,
+                          func='sw_stats_striped_16', trace=True)
+    assert parasail.top_hits('ACDE', [], 10, 1, parasail.blosum62, top_k=3) == []
+
+def test6():
+    targets = random_sequences(30, [300, 1000], seed=5)
+    query = targets[4][200:260]
+    full = parasail.score_then_trace(query, targets, 10, 1, parasail.blosum62, min_score=35)
+    restricted = parasail.score_then_trace(query, targets, 10, 1, parasail.blosum62,
+                                           func='sw_striped_sat', min_score=35, restrict=True)
+    assert [h.index for h in full] == [h.index for h in restricted]
+    assert 4 in [h.index for h in full]
+    for f, r in zip(full, restricted):
+        assert f.score == f.result.score == r.score == r.result.score
+        assert r.result.len_query <= len(query)
+        assert r.result.len_ref <= len(targets[r.index])
+        if r.index == 4:
+            assert r.query_begin + r.result.cigar.beg_query == 0
+            assert r.ref_begin + r.result.cigar.beg_ref == 200
+            assert r.result.cigar.decode == b'60='
+    hits = parasail.score_then_trace(query, targets[:3], 10, 1, parasail.blosum62,
+                                     func='nw_scan_16')
+    assert [h.result.score for h in hits] == [
+        parasail.nw_trace_scan_16(query, t, 10, 1, parasail.blosum62).score for t in targets[:3]]
+    with pytest.raises(ValueError):
+        parasail.score_then_trace(query, targets, 10, 1, parasail.blosum62,
+                                  func='nw_scan_16', restrict=True)
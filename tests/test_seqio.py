@@ -0,0 +1,111 @@
+import gzip
+import os
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+fasta = b""">seq1 first sequence
+ACGTACGTAC
+GTACGT
+>seq2
+ACGT
+>seq3 empty
+
+>seq4
+TTTTTTTTTT
+TTTTTTTTTT
+"""
+
+fastq = b"""@read1 comment
+ACGTACGT
++
+IIIIIIII
+@read2
+TTGG
++read2
+ABCD
+"""
+
+def test1(tmpdir):
+    filename = tmpdir.join("input.fa").strpath
+    with open(filename, "wb") as fp:
+        fp.write(fasta)
+    for attempt in range(2):
+        sequences = parasail.SequenceFile(filename)
+        assert(os.path.exists(filename + ".fai"))
+        assert(len(sequences) == 4)
+        assert(sequences.names == ["seq1", "seq2", "seq3", "seq4"])
+        assert(list(sequences.lengths) == [16, 4, 0, 20])
+        assert(bytes(sequences[0].seq) == b"ACGTACGTACGTACGT")
+        assert(isinstance(sequences[1].seq, memoryview))
+        assert(bytes(sequences["seq2"].seq) == b"ACGT")
+        assert(bytes(sequences[2].seq) == b"")
+        assert(bytes(sequences[-1].seq) == b"T"*20)
+        assert(sequences[0].qual == b"")
+        with pytest.raises(IndexError):
+            sequences[4]
+        with pytest.raises(TypeError):
+            sequences[1.0]
+        result = parasail.sw(sequences[1].seq, sequences[0].seq, 10, 1, parasail.nuc44)
+        assert(result.score == 20)
+        del result
+        sequences.close()
+
+def test2(tmpdir):
+    filename = tmpdir.join("input.fq").strpath
+    with open(filename, "wb") as fp:
+        fp.write(fastq.replace(b"\n", b"\r\n"))
+    with parasail.SequenceFile(filename) as sequences:
+        assert(len(sequences) == 2)
+        records = list(sequences)
+        assert(records[0].name == "read1")
+        assert(bytes(records[0].seq) == b"ACGTACGT")
+        assert(bytes(records[0].qual) == b"IIIIIIII")
+        assert(bytes(records[1].seq) == b"TTGG")
+        assert(bytes(records[1].qual) == b"ABCD")
+        del records
+
+def test3(tmpdir):
+    plain = tmpdir.join("input.fa").strpath
+    with open(plain, "wb") as fp:
+        fp.write(fasta)
+    compressed = tmpdir.join("input.fa.gz").strpath
+    with gzip.open(compressed, "wb") as fp:
+        fp.write(fasta)
+    # bgzip output is a series of concatenated gzip members
+    blocked = tmpdir.join("input.fa.bgz").strpath
+    with open(blocked, "wb") as fp:
+        for part in fasta.split(b">seq3"):
+            fp.write(gzip.compress(part) if part.startswith(b">") else gzip.compress(b">seq3"+part))
+    for filename in [plain, compressed, blocked]:
+        batches = list(parasail.iter_sequences(filename, chunk_size=3))
+        assert([len(batch) for batch in batches] == [3, 1])
+        assert(batches[0].names == ["seq1", "seq2", "seq3"])
+        assert(list(batches[0].lengths) == [16, 4, 0])
+        assert(bytes(batches[0][0]) == b"ACGTACGTACGTACGT")
+        assert(bytes(batches[1][-1]) == b"T"*20)
+        assert(batches[0].quals is None)
+        batch = parasail.align_many("ACGT", batches[0][0:2], 10, 1, parasail.nuc44)
+        assert(list(batch.score) == [20, 20])
+        with pytest.raises(ValueError):
+            parasail.align_many("ACGT", batches[0], 10, 1, parasail.nuc44)
+
+def test4(tmpdir):
+    filename = tmpdir.join("input.fq.gz").strpath
+    with gzip.open(filename, "wb") as fp:
+        fp.write(fastq)
+    batches = list(parasail.iter_sequences(filename))
+    assert(len(batches) == 1)
+    assert(bytes(batches[0][1]) == b"TTGG")
+    assert(bytes(batches[0].qual(1)) == b"ABCD")
+
+if __name__ == '__main__':
+    import sys
+    with parasail.SequenceFile(sys.argv[1]) as sequences:
+        print(len(sequences))
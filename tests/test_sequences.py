@@ -0,0 +1,49 @@
+import gc
+
+import numpy
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+def create_input_file(filename):
+    with open(filename, 'w') as fp:
+        fp.write('>one\nACGTACGT\n>two\nAC\nGT\n>three\nTTTTT\n')
+
+def test1(tmpdir):
+    file = tmpdir.join('input.fa')
+    create_input_file(file.strpath)
+    sequences = parasail.sequences_from_file(file.strpath)
+    assert list(sequences.lengths) == [8, 4, 5]
+    assert list(sequences.offsets) == [0, 8, 12, 17]
+    residues = sequences.residues
+    assert residues.dtype == numpy.uint8
+    assert residues.tobytes() == b'ACGTACGTACGTTTTTT'
+    assert sequences.residues is residues
+    for i in range(len(sequences)):
+        seq = residues[sequences.offsets[i]:sequences.offsets[i+1]]
+        assert seq.tobytes() == sequences[i].seq
+
+def test2(tmpdir):
+    file = tmpdir.join('input.fa')
+    create_input_file(file.strpath)
+    sequences = parasail.sequences_from_file(file.strpath)
+    expected = parasail.sw_striped_16(str(sequences[0]), str(sequences[2]), 10, 1, parasail.nuc44)
+    result = parasail.sw_striped_16(sequences[0], sequences[2], 10, 1, parasail.nuc44)
+    assert result.score == expected.score
+    assert str(sequences[1]) == 'ACGT'
+
+def test3(tmpdir):
+    # the bulk arrays outlive the Sequences they came from
+    file = tmpdir.join('input.fa')
+    create_input_file(file.strpath)
+    lengths = parasail.sequences_from_file(file.strpath).lengths
+    offsets = parasail.sequences_from_file(file.strpath).offsets
+    gc.collect()
+    parasail.sequences_from_file(file.strpath)
+    assert list(lengths) == [8, 4, 5]
+    assert list(offsets) == [0, 8, 12, 17]
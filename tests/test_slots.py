@@ -0,0 +1,66 @@
+import gc
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+query = "HEAGAWGHEE"
+ref = "PAWHEAE"
+
+def test1():
+    # the wrappers have no per-instance __dict__
+    matrix = parasail.blosum62
+    result = parasail.sw_trace_striped_16(query, ref, 10, 1, matrix)
+    profile = parasail.profile_create_16(query, matrix)
+    for x in (result, result.cigar, result.traceback, profile,
+            parasail.ssw(query, ref, 10, 1, matrix)):
+        assert not hasattr(x, "__dict__")
+    with pytest.raises(AttributeError):
+        result.extra = 1
+    # cached per arguments, as before
+    assert result.cigar is result.cigar
+    assert result.get_cigar(case_sensitive=True) is result.get_cigar(case_sensitive=True)
+    assert result.traceback is result.traceback
+    assert parasail.sw_striped_profile_16(profile, ref, 10, 1).score == result.score
+
+def test2(tmpdir):
+    # a Sequence keeps the Sequences that owns its memory alive
+    file = tmpdir.join('input.fa')
+    with open(file.strpath, 'w') as fp:
+        fp.write('>one\nACGTACGT\n>two\nTTTTT\n')
+    sequence = parasail.sequences_from_file(file.strpath)[1]
+    gc.collect()
+    assert sequence.seq == b'TTTTT'
+    assert len(sequence) == 5
+
+def test3():
+    # align_score returns the scalars of the Result as a tuple
+    matrix = parasail.blosum62
+    for name in ("sw", "nw_scan", "sg_striped_16", "sw_diag_sat", "sw_scan_32"):
+        result = getattr(parasail, name)(query, ref, 10, 1, matrix)
+        expected = (result.score, result.end_query, result.end_ref)
+        assert parasail.align_score(name, query, ref, 10, 1, matrix) == expected
+    result = parasail.sw_stats_striped_16(query, ref, 10, 1, matrix)
+    assert parasail.align_score(parasail.sw_stats_striped_16, query, ref, 10, 1, matrix) == (
+            result.score, result.end_query, result.end_ref,
+            result.matches, result.similar, result.length)
+    profile = parasail.profile_create_16(query, matrix)
+    assert parasail.align_score("sw_striped_profile_16", profile, ref, 10, 1)[0] == result.score
+    cache = parasail.ProfileCache()
+    with parasail.settings(profile_cache=cache):
+        assert parasail.align_score("sw_striped_16", query, ref, 10, 1, matrix)[0] == result.score
+    assert cache.misses == 1
+    with pytest.raises(ValueError):
+        parasail.align_score("sw_trace", query, ref, 10, 1, matrix)
+    with pytest.raises(ValueError):
+        parasail.align_score("sw_unknown", query, ref, 10, 1, matrix)
+
+if __name__ == '__main__':
+    test1()
+    test3()
@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+try:
+    import parasail
+except ImportError:
+    import sys, os
+    myPath = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, myPath + '/../')
+    import parasail
+
+def cigar(case_sensitive=None):
+    result = parasail.sw_trace_striped_16("HEAGAWGHEE", "heagawghee", 10, 1, parasail.blosum62)
+    return result.get_cigar(case_sensitive).decode
+
+def test1():
+    # settings apply to the current thread only
+    barrier = threading.Barrier(2) if hasattr(threading, "Barrier") else None
+    seen = {}
+    def worker(name, case):
+        with parasail.settings(case_sensitive=case):
+            if barrier:
+                barrier.wait()
+            seen[name] = cigar()
+    threads = [threading.Thread(target=worker, args=(name, case))
+            for name, case in (("sensitive", True), ("insensitive", False))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen["sensitive"] == b'10X'
+    assert seen["insensitive"] == b'10='
+    assert parasail.bindings_v2._setting("case_sensitive") == parasail.bindings_v2._case_sensitive
+
+def test2():
+    # per-call arguments override the settings, including False
+    with parasail.settings(case_sensitive=True):
+        assert cigar() == b'10X'
+        assert cigar(False) == b'10='
+        with parasail.settings(alphabet_aliases="Aa"):
+            assert parasail.bindings_v2._setting("case_sensitive") is True
+        assert parasail.bindings_v2._setting("alphabet_aliases") == parasail.bindings_v2._alphabet_aliases
+    assert cigar(True) == b'10X'
+    with pytest.raises(TypeError):
+        with parasail.settings(case=True):
+            pass
+
+def test3():
+    # alignments run without the GIL, so Python code runs alongside
+    matrix = parasail.blosum62
+    query = "HEAGAWGHEE" * 400
+    done = threading.Event()
+    def worker():
+        parasail.sw_striped_16(query, query, 10, 1, matrix)
+        done.set()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    ticks = 0
+    while not done.is_set():
+        ticks += 1
+    thread.join()
+    assert ticks > 1000
+
+def test4():
+    # a Matrix, Profile and ProfileCache shared by many threads
+    matrix = parasail.blosum62
+    query = "HEAGAWGHEE" * 5
+    targets = ["PAWHEAE" * (i % 9 + 1) for i in range(200)]
+    profile = parasail.profile_create_16(query, matrix)
+    expected = [parasail.sw_striped_16(query, t, 10, 1, matrix).score for t in targets]
+    cache = parasail.ProfileCache()
+    scores = {}
+    def worker(n):
+        with parasail.settings(profile_cache=cache):
+            scores[n] = [(parasail.sw_striped_16(query, t, 10, 1, matrix).score,
+                    parasail.sw_striped_profile_16(profile, t, 10, 1).score) for t in targets]
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for n in range(8):
+        assert scores[n] == list(zip(expected, expected))
+    assert cache.hits > 0
+
+def test5():
+    # align_matrix workers run under the caller's settings
+    matrix = parasail.blosum62
+    queries = ["heagawghee", "pawheae"]
+    targets = ["HEAGAWGHEE", "PAWHEAE"]
+    expected = None
+    for threads in (1, 2):
+        cache = parasail.ProfileCache()
+        with parasail.settings(profile_cache=cache, case_sensitive=False):
+            score = parasail.align_matrix(queries, targets, 10, 1, matrix, threads=threads)
+        assert (cache.misses, cache.hits) == (2, 0)
+        if expected is None:
+            expected = score
+        assert (score == expected).all()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# Measure the cold import time of parasail and the cost of binding every
+# alignment function and loading every built-in matrix, which is what
+# importing the bindings used to do.
+#
+#   python tools/bench_import.py [repeat]
+
+import subprocess
+import sys
+
+IMPORT = """
+import time
+start = time.time()
+import parasail
+print(time.time() - start)
+"""
+
+BIND_ALL = """
+import time
+import parasail
+from parasail import bindings_v2
+start = time.time()
+for name in bindings_v2._binders:
+    getattr(parasail, name)
+print(len(bindings_v2._binders), time.time() - start)
+"""
+
+MATRICES = """
+import time
+import parasail
+from parasail import bindings_v2
+start = time.time()
+for name in bindings_v2._builtin_matrices:
+    getattr(parasail, name)
+print(len(bindings_v2._builtin_matrices), time.time() - start)
+"""
+
+def run(code, repeat):
+    # median of repeat fresh interpreters; returns the last output line
+    runs = []
+    for i in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", code])
+        runs.append(output.decode().split())
+    runs.sort(key=lambda fields: float(fields[-1]))
+    return runs[len(runs) // 2]
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    lazy = float(run(IMPORT, repeat)[0])
+    count, bind = run(BIND_ALL, repeat)
+    bind = float(bind)
+    print("import parasail:           {:8.1f} ms".format(lazy * 1000))
+    print("bind all {:5d} functions:  {:8.1f} ms".format(int(count), bind * 1000))
+    count, load = run(MATRICES, repeat)
+    print("load all {:5d} matrices:   {:8.1f} ms".format(int(count), float(load) * 1000))
+
+if __name__ == "__main__":
+    main()
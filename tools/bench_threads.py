@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# Measure how sw_striped_16 throughput scales with the number of threads
+# in a concurrent.futures.ThreadPoolExecutor.  The C library releases
+# the GIL for each alignment, so on an idle machine the speedup should
+# stay close to the thread count up to the number of cores.
+#
+#   python tools/bench_threads.py [query length] [target count]
+
+import concurrent.futures
+import os
+import random
+import sys
+import time
+
+import parasail
+
+def main():
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(0)
+    alphabet = "ARNDCQEGHILKMFPSTWYV"
+    sequences = ["".join(rng.choice(alphabet) for i in range(length))
+            for j in range(count + 1)]
+    query, targets = sequences[0], sequences[1:]
+    matrix = parasail.blosum62
+    profile = parasail.profile_create_16(query, matrix)
+    def align(target):
+        return parasail.sw_striped_profile_16(profile, target, 10, 1).score
+    cpus = os.cpu_count() if hasattr(os, "cpu_count") else 1
+    threads = sorted(set([1, 2, 4, 8, 16, cpus or 1]))
+    base = None
+    print("threads   alignments/s   speedup")
+    for n in threads:
+        with concurrent.futures.ThreadPoolExecutor(n) as executor:
+            start = time.time()
+            list(executor.map(align, targets, chunksize=16))
+            elapsed = time.time() - start
+        rate = count / elapsed
+        base = base or rate
+        print("{:7d} {:14.0f} {:9.2f}".format(n, rate, rate / base))
+
+if __name__ == "__main__":
+    main()